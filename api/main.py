@@ -1,29 +1,56 @@
+import asyncio
 import base64
+import bisect
+import contextvars
+import functools
+import hashlib
+import importlib.util
 import io
+import itertools
 import json
+import mmap
+import multiprocessing
 import os
+import secrets
+import select
+import sqlite3
+import tempfile
+import threading
+import sys
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
 from datetime import datetime
-from typing import Dict, List, Optional, Union
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
+
+_import_started = time.perf_counter()
 
-import joblib
 import numpy as np
+try:
+    import orjson
+except ImportError:
+    orjson = None
 import pandas as pd
 import psycopg2
+import psycopg2.extensions
 import psycopg2.extras
+import psycopg2.pool
+import psycopg2.sql
 from dotenv import load_dotenv
-from fastapi import APIRouter, FastAPI, File, Form, HTTPException, Request, UploadFile
+from fastapi import APIRouter, FastAPI, File, Form, HTTPException, Request, Response, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
-from sklearn.metrics import (
-    accuracy_score,
-    classification_report,
-    confusion_matrix,
-    f1_score,
-    precision_score,
-    recall_score,
-)
-from sklearn.naive_bayes import CategoricalNB
-from sklearn.preprocessing import LabelEncoder, OrdinalEncoder
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import IdentityResponder
+
+if TYPE_CHECKING:
+    from sklearn.naive_bayes import CategoricalNB
+    from sklearn.preprocessing import LabelEncoder, OrdinalEncoder
 
 load_dotenv()
 
@@ -56,6 +83,14 @@ class ClassificationResult(BaseModel):
 class ClassificationResponse(BaseModel):
     results: List[ClassificationResult]
     metrics: Optional[Dict] = None
+    unknownCategories: List[Dict] = []
+
+
+class PredictRequest(BaseModel):
+    modelName: str
+    records: Union[Dict[str, Optional[Union[str, int, float, bool]]], List[Dict[str, Optional[Union[str, int, float, bool]]]]]
+    probabilities: bool = False
+    topK: Optional[int] = None
 
 
 class HealthResponse(BaseModel):
@@ -68,568 +103,4772 @@ class HealthResponse(BaseModel):
 
 models_metadata = {}
 
+MODEL_BLOB_FIELDS = ("modelData", "encodersData", "labelEncoderData")
+MODEL_PAYLOAD_FIELDS = (*MODEL_BLOB_FIELDS, "modelBundle")
+
+MODEL_CACHE_MAX_BYTES = int(os.getenv('MODEL_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+CLASSIFY_CHUNK_ROWS = int(os.getenv('CLASSIFY_CHUNK_ROWS', '50000'))
+TRAIN_CHUNK_ROWS = int(os.getenv('TRAIN_CHUNK_ROWS', '50000'))
+UPLOAD_SPOOL_BLOCK_BYTES = 1024 * 1024
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv('RESPONSE_COMPRESSION_MIN_BYTES', '4096'))
+RESPONSE_GZIP_LEVEL = int(os.getenv('RESPONSE_GZIP_LEVEL', '6'))
+RESPONSE_BROTLI_QUALITY = int(os.getenv('RESPONSE_BROTLI_QUALITY', '4'))
+INFERENCE_BLOCK_BYTES = int(os.getenv('INFERENCE_BLOCK_BYTES', str(32 * 1024 * 1024)))
+MODEL_TABLE_DTYPE = np.dtype(os.getenv('MODEL_TABLE_DTYPE', 'float32'))
+
+MODEL_FORMAT = os.getenv('MODEL_FORMAT', 'binary')
+MODEL_STORE_DIR = os.getenv('MODEL_STORE_DIR')
+
+RESULT_CACHE_MAX_BYTES = int(os.getenv('RESULT_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+RESULT_CACHE_DIR = os.getenv('RESULT_CACHE_DIR')
+RESULT_CACHE_DISK_MAX_BYTES = int(os.getenv('RESULT_CACHE_DISK_MAX_BYTES', str(1024 * 1024 * 1024)))
+
+EXECUTION_BACKEND = os.getenv('EXECUTION_BACKEND', 'thread')
+EXECUTION_MAX_WORKERS = int(os.getenv('EXECUTION_MAX_WORKERS', str(min(os.cpu_count() or 1, 4))))
+EXECUTION_MAX_QUEUE = int(os.getenv('EXECUTION_MAX_QUEUE', '16'))
+EXECUTION_RETRY_AFTER = int(os.getenv('EXECUTION_RETRY_AFTER', '5'))
+
+PERSIST_BATCH_ROWS = int(os.getenv('PERSIST_BATCH_ROWS', '50000'))
+
+PREDICT_BATCH_WINDOW_MS = float(os.getenv('PREDICT_BATCH_WINDOW_MS', '2'))
+PREDICT_MAX_BATCH_SIZE = int(os.getenv('PREDICT_MAX_BATCH_SIZE', '256'))
+PREDICT_MAX_RECORDS = int(os.getenv('PREDICT_MAX_RECORDS', '1000'))
+MULTI_CLASSIFY_MAX_MODELS = int(os.getenv('MULTI_CLASSIFY_MAX_MODELS', '16'))
+MULTI_CLASSIFY_THREADS = int(os.getenv('MULTI_CLASSIFY_THREADS', str(EXECUTION_MAX_WORKERS)))
+VALIDATION_THREADS = int(os.getenv('VALIDATION_THREADS', str(EXECUTION_MAX_WORKERS)))
+
+JOB_STORE_DIR = os.getenv('JOB_STORE_DIR', os.path.join(tempfile.gettempdir(), 'naive-bayes-jobs'))
+JOB_MAX_CONCURRENCY = int(os.getenv('JOB_MAX_CONCURRENCY', '2'))
+JOB_MAX_PER_MODEL = int(os.getenv('JOB_MAX_PER_MODEL', '1'))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+JOB_POLL_SECONDS = float(os.getenv('JOB_POLL_SECONDS', '1.0'))
+JOB_STALE_SECONDS = float(os.getenv('JOB_STALE_SECONDS', '30'))
+
+SERVER_TIMING = os.getenv('SERVER_TIMING', 'false').lower() in ('1', 'true', 'yes')
+
+MODEL_EVENTS_CHANNEL = os.getenv('MODEL_EVENTS_CHANNEL', 'naive_bayes_model_events')
+MODEL_EVENTS_RETRY_SECONDS = float(os.getenv('MODEL_EVENTS_RETRY_SECONDS', '30'))
+
+# Identifies this server process in model events and job ownership.
+WORKER_ID = f"{os.getpid()}-{secrets.token_hex(4)}"
+
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', '1'))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '10'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+DB_POOL_HEALTH_CHECK_INTERVAL = float(os.getenv('DB_POOL_HEALTH_CHECK_INTERVAL', '30'))
+
+WARMUP_ENABLED = os.getenv('WARMUP_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+WARMUP_MODELS = os.getenv('WARMUP_MODELS', '')
+
+# =============================================================================
+# LAZY IMPORTS
+# =============================================================================
+
+# Seconds each lazily imported module took to import, for /api/ready.
+import_seconds = {}
+
+
+def lazy_import(module_name: str):
+    """Import a heavy module on first use and record how long the import took.
+
+    scikit-learn (with scipy) and joblib are not imported with this module,
+    so the server starts answering quickly; the startup warm-up imports
+    them in the background.
+    """
+    module = sys.modules.get(module_name)
+    if module is None:
+        start = time.perf_counter()
+        module = importlib.import_module(module_name)
+        import_seconds[module_name] = time.perf_counter() - start
+    return module
+
+# =============================================================================
+# INSTRUMENTATION
+# =============================================================================
+
+STAGE_DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+METRIC_HELP = {
+    "nb_operations_total": ("counter", "Completed requests and background operations by status."),
+    "nb_operation_duration_seconds": ("histogram", "Wall time of each request or background operation."),
+    "nb_stage_duration_seconds": ("histogram", "Wall time spent in each stage of an operation."),
+    "nb_rows_processed_total": ("counter", "CSV rows or database records processed."),
+    "nb_bytes_processed_total": ("counter", "Uploaded bytes processed."),
+    "nb_model_cache_hits_total": ("counter", "Model cache hits."),
+    "nb_model_cache_misses_total": ("counter", "Model cache misses."),
+    "nb_model_cache_bytes": ("gauge", "Approximate bytes held by the model cache."),
+    "nb_result_cache_hits_total": ("counter", "Classification result cache hits, memory and disk."),
+    "nb_result_cache_misses_total": ("counter", "Classification result cache misses."),
+    "nb_result_cache_bytes": ("gauge", "Bytes held by the in-memory result cache."),
+    "nb_worker_in_flight": ("gauge", "Jobs running or queued on the worker pool."),
+    "nb_worker_rejected_total": ("counter", "Jobs rejected because the worker pool was full."),
+}
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        position = bisect.bisect_left(self.buckets, value)
+        if position < len(self.buckets):
+            self.counts[position] += 1
+        self.count += 1
+        self.sum += value
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ""
+    escaped = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{key}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+class MetricsRegistry:
+    """In-process counters and histograms rendered in the Prometheus text format."""
+
+    def __init__(self, buckets=STAGE_DURATION_BUCKETS):
+        self.buckets = buckets
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, labels: Dict, value: float = 1.0):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name: str, labels: Dict, value: float):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def render(self, extra: Optional[Dict[str, float]] = None) -> str:
+        series = {}
+        with self._lock:
+            for (name, labels), value in self._counters.items():
+                series.setdefault(name, []).append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+            for (name, labels), histogram in self._histograms.items():
+                lines = series.setdefault(name, [])
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', f'{bound:g}'),))} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum:.6f}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        for name, value in (extra or {}).items():
+            series.setdefault(name, []).append(f"{name} {_format_value(value)}")
+
+        output = []
+        for name in sorted(series):
+            metric_type, help_text = METRIC_HELP.get(name, ("untyped", name))
+            output.append(f"# HELP {name} {help_text}")
+            output.append(f"# TYPE {name} {metric_type}")
+            output.extend(series[name])
+        return "\n".join(output) + "\n"
+
+
+metrics_registry = MetricsRegistry()
+
+_current_timer = contextvars.ContextVar("stage_timer", default=None)
+
+
+class StageTimer:
+    """Per-stage wall time, rows and bytes for one request or background operation.
+
+    Stages with the same name accumulate, so chunked loops report one total
+    per stage. Timings are only published to ``metrics_registry`` by
+    ``finish``; timers used inside workers are merged into the caller's
+    timer instead.
+    """
+
+    def __init__(self, operation: Optional[str] = None):
+        self.operation = operation
+        self.stages = {}
+        self.rows = 0
+        self.bytes = 0
+        self.started = time.perf_counter()
+
+    def record(self, name: str, seconds: float):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def begin(self, name: str):
+        """Called when stage ``name`` starts; a hook for timers that report progress."""
+
+    def count(self, rows: int = 0, bytes: int = 0):
+        self.rows += rows
+        self.bytes += bytes
+
+    def snapshot(self) -> Dict:
+        return {"stages": dict(self.stages), "rows": self.rows, "bytes": self.bytes}
+
+    def merge(self, snapshot: Dict):
+        for name, seconds in snapshot["stages"].items():
+            self.record(name, seconds)
+        self.count(snapshot["rows"], snapshot["bytes"])
+
+    def server_timing(self) -> str:
+        entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.stages.items()]
+        entries.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.2f}")
+        return ", ".join(entries)
+
+    def finish(self, status: str = "ok") -> float:
+        elapsed = time.perf_counter() - self.started
+        labels = {"operation": self.operation or "other"}
+        metrics_registry.inc("nb_operations_total", {**labels, "status": str(status)})
+        metrics_registry.observe("nb_operation_duration_seconds", labels, elapsed)
+        for name, seconds in self.stages.items():
+            metrics_registry.observe("nb_stage_duration_seconds", {**labels, "stage": name}, seconds)
+        if self.rows:
+            metrics_registry.inc("nb_rows_processed_total", labels, self.rows)
+        if self.bytes:
+            metrics_registry.inc("nb_bytes_processed_total", labels, self.bytes)
+        return elapsed
+
+
+@contextmanager
+def timed_stage(name: str):
+    """Time a block as stage ``name`` of the current request or operation, if any."""
+    timer = _current_timer.get()
+    if timer is not None:
+        timer.begin(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timer is not None:
+            timer.record(name, time.perf_counter() - start)
+
+
+def timed_iter(iterable, name: str):
+    """Yield from ``iterable``, timing the production of each item as stage ``name``."""
+    iterator = iter(iterable)
+    while True:
+        with timed_stage(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def count_processed(rows: int = 0, bytes: int = 0):
+    timer = _current_timer.get()
+    if timer is not None:
+        timer.count(rows, bytes)
+
+
+def instrumented(operation: str):
+    """Decorator publishing a function's stages as a standalone operation.
+
+    When called inside another timed operation, its total also shows up there
+    as one stage named after ``operation``.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            parent = _current_timer.get()
+            timer = StageTimer(operation)
+            token = _current_timer.set(timer)
+            status = "ok"
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                status = "error"
+                raise
+            finally:
+                _current_timer.reset(token)
+                elapsed = timer.finish(status)
+                if parent is not None:
+                    parent.record(operation, elapsed)
+        return wrapper
+    return decorator
+
 # =============================================================================
 # DATABASE FUNCTIONS
 # =============================================================================
 
-def load_models_from_db():
+class DatabasePool:
+    """Thread-safe psycopg2 connection pool with blocking checkout and health checks.
+
+    ``ThreadedConnectionPool`` raises as soon as it runs dry, so checkouts
+    are gated by a semaphore sized to the pool and wait up to ``timeout``
+    seconds. Connections idle for longer than ``health_check_interval`` are
+    probed with ``SELECT 1`` and replaced if the probe fails.
+    """
+
+    def __init__(self, dsn: str, min_size: int, max_size: int, timeout: float, health_check_interval: float):
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._pool = psycopg2.pool.ThreadedConnectionPool(min_size, max_size, dsn)
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._last_used = {}
+
+    @contextmanager
+    def connection(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise psycopg2.pool.PoolError(f"Timed out after {self.timeout}s waiting for a database connection")
+        conn = None
+        try:
+            conn = self._checkout()
+            yield conn
+            conn.commit()
+        except Exception:
+            if conn is not None and not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            if conn is not None:
+                self._last_used[id(conn)] = time.monotonic()
+                self._pool.putconn(conn, close=bool(conn.closed))
+            self._slots.release()
+
+    def close(self):
+        self._pool.closeall()
+        self._last_used.clear()
+
+    def _checkout(self):
+        conn = self._pool.getconn()
+        if not conn.closed and time.monotonic() - self._last_used.get(id(conn), 0.0) < self.health_check_interval:
+            return conn
+        if self._is_healthy(conn):
+            return conn
+        self._pool.putconn(conn, close=True)
+        return self._pool.getconn()
+
+    @staticmethod
+    def _is_healthy(conn) -> bool:
+        if conn.closed:
+            return False
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+
+_db_pool = None
+_db_pool_lock = threading.Lock()
+
+
+def get_db_pool() -> DatabasePool:
+    """Return the shared connection pool, creating it on first use."""
+    global _db_pool
+    if _db_pool is None:
+        with _db_pool_lock:
+            if _db_pool is None:
+                database_url = os.getenv('DATABASE_URL')
+                if not database_url:
+                    raise Exception("DATABASE_URL environment variable not found")
+                _db_pool = DatabasePool(
+                    database_url,
+                    min_size=DB_POOL_MIN_SIZE,
+                    max_size=DB_POOL_MAX_SIZE,
+                    timeout=DB_POOL_TIMEOUT,
+                    health_check_interval=DB_POOL_HEALTH_CHECK_INTERVAL
+                )
+    return _db_pool
+
+
+def db_connection():
+    """Check out a pooled connection; commits on success and rolls back on error."""
+    return get_db_pool().connection()
+
+
+@instrumented("load_models")
+def load_models_from_db(model_name: Optional[str] = None, raise_errors: bool = False):
+    """Load the metadata (without payloads) of every model, or only of ``model_name``.
+
+    Database errors are logged and give an empty result unless ``raise_errors`` is set.
+    """
     models_metadata = {}
     
-    database_url = os.getenv('DATABASE_URL')
-    if not database_url:
+    if not os.getenv('DATABASE_URL'):
         print("DATABASE_URL environment variable not found")
         return {}
         
     try:
-        conn = psycopg2.connect(database_url)
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        
-        cursor.execute("""
-            SELECT model_name as "modelName", target_column as "targetColumn", 
-                   feature_columns as "featureColumns", classes, 
-                   accuracy, model_data as "modelData", 
-                   encoders_data as "encodersData", label_encoder_data as "labelEncoderData",
-                   id
-            FROM naive_bayes_app.models
-        """)
-        
-        models = cursor.fetchall()
+        with timed_stage("query"):
+            with db_connection() as conn:
+                with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+                    cursor.execute("""
+                        SELECT m.model_name as "modelName", m.target_column as "targetColumn", 
+                               m.feature_columns as "featureColumns", m.classes, 
+                               m.accuracy, m.id, m.updated_at as "updatedAt",
+                               mm.accuracy as "metricsAccuracy", mm.precision as "metricsPrecision",
+                               mm.recall as "metricsRecall", mm.f1_score as "metricsF1Score",
+                               mm.class_metrics as "classMetrics"
+                        FROM naive_bayes_app.models m
+                        LEFT JOIN LATERAL (
+                            SELECT accuracy, precision, recall, f1_score, class_metrics
+                            FROM naive_bayes_app.model_metrics
+                            WHERE model_id = m.id
+                            ORDER BY created_at DESC
+                            LIMIT 1
+                        ) mm ON TRUE
+                    """ + ("WHERE m.model_name = %s" if model_name else ""), (model_name,) if model_name else None)
+                    models = cursor.fetchall()
+        count_processed(rows=len(models))
         
-        for model in models:
-            try:
-                model_name = model['modelName']
-                
-                cursor.execute("""
-                    SELECT mm.accuracy, mm.precision, mm.recall, mm.f1_score as "f1Score", mm.class_metrics as "classMetrics"
-                    FROM naive_bayes_app.model_metrics mm
-                    JOIN naive_bayes_app.models m ON mm.model_id = m.id
-                    WHERE m.model_name = %s
-                    ORDER BY mm.created_at DESC
-                    LIMIT 1
-                """, (model_name,))
-                
-                metrics_row = cursor.fetchone()
-                metrics = None
+        with timed_stage("decode"):
+            for model in models:
+                try:
+                    name = model['modelName']
+                    metrics = None
                 
-                if metrics_row:
-                    try:
-                        class_metrics = metrics_row['classMetrics']
-                        if isinstance(class_metrics, str):
-                            class_metrics = json.loads(class_metrics)
-                        elif class_metrics is None:
-                            class_metrics = {}
+                    if model['metricsAccuracy'] is not None:
+                        try:
+                            class_metrics = model['classMetrics']
+                            if isinstance(class_metrics, str):
+                                class_metrics = json.loads(class_metrics)
+                            elif class_metrics is None:
+                                class_metrics = {}
                         
-                        metrics = {
-                            "accuracy": metrics_row['accuracy'],
-                            "precision": metrics_row['precision'],
-                            "recall": metrics_row['recall'],
-                            "f1Score": metrics_row['f1Score'],
-                            "classMetrics": class_metrics
-                        }
-                    except (json.JSONDecodeError, TypeError) as e:
-                        print(f"Error parsing metrics for model {model_name}: {e}")
-                        metrics = None
+                            metrics = {
+                                "accuracy": model['metricsAccuracy'],
+                                "precision": model['metricsPrecision'],
+                                "recall": model['metricsRecall'],
+                                "f1Score": model['metricsF1Score'],
+                                "classMetrics": class_metrics
+                            }
+                        except (json.JSONDecodeError, TypeError) as e:
+                            print(f"Error parsing metrics for model {name}: {e}")
+                            metrics = None
                 
-                feature_columns = model['featureColumns']
-                if isinstance(feature_columns, str):
-                    feature_columns = json.loads(feature_columns)
+                    feature_columns = model['featureColumns']
+                    if isinstance(feature_columns, str):
+                        feature_columns = json.loads(feature_columns)
                 
-                classes = model['classes']
-                if isinstance(classes, str):
-                    classes = json.loads(classes)
+                    classes = model['classes']
+                    if isinstance(classes, str):
+                        classes = json.loads(classes)
                 
-                models_metadata[model_name] = {
-                    "modelName": model_name,
-                    "targetColumn": model['targetColumn'],
-                    "featureColumns": feature_columns,
-                    "classes": classes,
-                    "accuracy": model['accuracy'],
-                    "modelData": model['modelData'],
-                    "encodersData": model['encodersData'],
-                    "labelEncoderData": model['labelEncoderData'],
-                    "metrics": metrics,
-                    "id": model['id']
-                }
+                    models_metadata[name] = {
+                        "modelName": name,
+                        "targetColumn": model['targetColumn'],
+                        "featureColumns": feature_columns,
+                        "classes": classes,
+                        "accuracy": model['accuracy'],
+                        "metrics": metrics,
+                        "id": model['id'],
+                        "version": model['updatedAt'].isoformat() if model['updatedAt'] else None
+                    }
                 
-            except Exception as e:
-                print(f"Error processing model {model.get('modelName', 'unknown')}: {e}")
-                continue
+                except Exception as e:
+                    print(f"Error processing model {model.get('modelName', 'unknown')}: {e}")
+                    continue
             
-        cursor.close()
-        conn.close()
-        print(f"Loaded {len(models_metadata)} models from database")
+        if model_name is None:
+            print(f"Loaded {len(models_metadata)} models from database")
         return models_metadata
         
     except psycopg2.Error as e:
         print(f"Database error loading models: {str(e)}")
+        if raise_errors:
+            raise
         return {}
     except Exception as e:
         print(f"Error loading models from database: {str(e)}")
+        if raise_errors:
+            raise
         return {}
 
 
+def fetch_model_blobs(model_ids: List[str]) -> Dict[str, Dict]:
+    """Fetch the serialized model, encoders and label encoder for the given model ids."""
+    if not model_ids:
+        return {}
+
+    with db_connection() as conn:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+            cursor.execute("""
+                SELECT id, model_data as "modelData", encoders_data as "encodersData",
+                       label_encoder_data as "labelEncoderData"
+                FROM naive_bayes_app.models
+                WHERE id = ANY(%s)
+            """, (list(model_ids),))
+            rows = cursor.fetchall()
+
+    return {
+        row['id']: {key: row[key] for key in MODEL_BLOB_FIELDS}
+        for row in rows
+    }
+
+
+def generate_id() -> str:
+    """Random 21-character URL-safe id, matching the nanoid ids the web tier generates."""
+    return secrets.token_urlsafe(16)[:21]
+
+
+def generate_ids(count: int) -> np.ndarray:
+    """``count`` ids in the ``generate_id`` format, built from one random buffer."""
+    # 18 random bytes encode to exactly 24 base64 characters, so rows never straddle.
+    encoded = base64.urlsafe_b64encode(os.urandom(18 * count))
+    return np.frombuffer(encoded, dtype=np.uint8).reshape(count, 24)[:, :21].copy().view('S21').ravel().astype(str)
+
+
+def save_model_version(model_info: Dict, metrics: Optional[Dict] = None) -> Optional[str]:
+    """Write a model's new payloads to its database row and return the new version stamp."""
+    with db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE naive_bayes_app.models
+                SET model_data = %s, encoders_data = %s, label_encoder_data = %s,
+                    accuracy = %s, updated_at = now()
+                WHERE id = %s
+                RETURNING updated_at
+            """, (
+                model_info["modelData"],
+                model_info["encodersData"],
+                model_info["labelEncoderData"],
+                model_info["accuracy"],
+                model_info["id"]
+            ))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+
+            if metrics:
+                cursor.execute("""
+                    INSERT INTO naive_bayes_app.model_metrics
+                        (id, model_id, accuracy, precision, recall, f1_score, class_metrics, confusion_matrix)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                """, (
+                    generate_id(),
+                    model_info["id"],
+                    metrics["accuracy"],
+                    metrics["precision"],
+                    metrics["recall"],
+                    metrics["f1Score"],
+                    json.dumps(metrics["classMetrics"]),
+                    json.dumps(metrics["confusionMatrix"])
+                ))
+
+    return row[0].isoformat()
+
+
+def persist_classification(
+    results: pd.DataFrame,
+    metrics: Optional[Dict],
+    model_name: str,
+    model_info: Dict,
+    file_name: str
+) -> Dict:
+    """Store classification results with COPY and record a classification_history summary.
+
+    Rows are streamed to ``classifications`` in batches of PERSIST_BATCH_ROWS
+    so only one batch is rendered as CSV at a time. The rows, the history
+    entry and the metrics row are committed in one transaction.
+    """
+    with db_connection() as conn:
+        with conn.cursor() as cursor:
+            model_id = model_info.get("id")
+            if not model_id:
+                cursor.execute("SELECT id FROM naive_bayes_app.models WHERE model_name = %s", (model_name,))
+                row = cursor.fetchone()
+                if row is None:
+                    raise HTTPException(status_code=404, detail=f"Model '{model_name}' is not saved in the database")
+                model_id = row[0]
+
+            for start in range(0, len(results), PERSIST_BATCH_ROWS):
+                batch = results.iloc[start:start + PERSIST_BATCH_ROWS].assign(modelId=model_id)
+                rows = pd.DataFrame({
+                    "id": generate_ids(len(batch)),
+                    "model_id": model_id,
+                    "data": json_records(batch),
+                    "predicted_class": batch["predictedClass"].to_numpy(),
+                    "actual_class": batch["actualClass"].to_numpy(),
+                    "confidence": batch["confidence"].to_numpy()
+                })
+                buffer = io.StringIO()
+                rows.to_csv(buffer, index=False, header=False)
+                buffer.seek(0)
+                cursor.copy_expert("""
+                    COPY naive_bayes_app.classifications
+                        (id, model_id, data, predicted_class, actual_class, confidence)
+                    FROM STDIN WITH (FORMAT csv)
+                """, buffer)
+
+            summary = {
+                "historyId": generate_id(),
+                "modelId": model_id,
+                "modelName": model_name,
+                "fileName": file_name,
+                "totalRecords": len(results),
+                "accuracy": metrics["accuracy"] if metrics else None,
+                "metrics": metrics
+            }
+            cursor.execute("""
+                INSERT INTO naive_bayes_app.classification_history
+                    (id, file_name, model_name, total_records, accuracy, results)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                RETURNING created_at
+            """, (
+                summary["historyId"],
+                file_name,
+                model_name,
+                summary["totalRecords"],
+                summary["accuracy"],
+                json.dumps({"results": [], **summary}, default=str)
+            ))
+            summary["createdAt"] = cursor.fetchone()[0].isoformat()
+
+            if metrics:
+                cursor.execute("""
+                    INSERT INTO naive_bayes_app.model_metrics
+                        (id, model_id, accuracy, precision, recall, f1_score, class_metrics, confusion_matrix)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                """, (
+                    generate_id(),
+                    model_id,
+                    metrics["accuracy"],
+                    metrics["precision"],
+                    metrics["recall"],
+                    metrics["f1Score"],
+                    json.dumps(metrics["classMetrics"]),
+                    json.dumps(metrics["confusionMatrix"])
+                ))
+
+    return summary
+
+
 def initialize_models_from_db():
-    """Initialize models from database into global models_metadata."""
+    """Reload the global models_metadata registry from the database.
+
+    Database errors propagate and leave the registry as it was, so a
+    transient failure can't wipe the models this worker holds. Models
+    trained here and not saved yet (no ``id``) are kept, and only models
+    whose version changed or that are gone lose their cached artifacts
+    and results.
+    """
     global models_metadata
-    models_metadata = load_models_from_db()
+    loaded = load_models_from_db(raise_errors=True)
+    for model_name, model_info in models_metadata.items():
+        if model_name not in loaded and not model_info.get("id"):
+            loaded[model_name] = model_info
 
-# =============================================================================
-# APP INITIALIZATION
-# =============================================================================
+    for model_name in set(models_metadata) | set(loaded):
+        current, reloaded = models_metadata.get(model_name), loaded.get(model_name)
+        if current is None or reloaded is None or model_cache_key(model_name, current) != model_cache_key(model_name, reloaded):
+            model_cache.invalidate(model_name)
+            result_cache.invalidate(model_name)
+    models_metadata = loaded
 
-app = FastAPI(title="Naive Bayes Classifier API")
-api_router = APIRouter(prefix="/api")
 
-# Middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=[
-        "http://localhost",
-        "http://localhost:3000",
-        "http://127.0.0.1",
-        "http://127.0.0.1:3000"
-    ],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+_registry_lock = threading.Lock()
+_model_load_locks = [threading.Lock() for _ in range(64)]
 
 
-@app.middleware("http")
-async def no_cache_middleware(request: Request, call_next):
-    """Add no-cache headers to all responses."""
-    response = await call_next(request)
-    response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
-    response.headers["Pragma"] = "no-cache"
-    response.headers["Expires"] = "0"
-    return response
+def ensure_models_loaded():
+    """Load every model when this worker's registry is still empty.
 
-# =============================================================================
-# API ENDPOINTS - HEALTH & UTILITIES
-# =============================================================================
+    Concurrent callers wait for one load instead of each running their own.
+    """
+    if models_metadata:
+        return
+    with _registry_lock:
+        if not models_metadata:
+            print("Models metadata is empty, initializing from database...")
+            initialize_models_from_db()
 
-@app.get("/")
-async def root():
-    """Root endpoint."""
-    return {"message": "Naive Bayes Classifier API"}
 
+def refresh_model_from_db(model_name: str) -> Optional[Dict]:
+    """Reload one model's metadata into the registry, or drop it when the database no longer has it.
 
-@api_router.get("/health")
-async def health_check():
-    """Health check endpoint."""
-    return HealthResponse(status="online", version="0.1.0")
+    Database errors propagate and leave the registry as it was.
+    """
+    model_info = load_models_from_db(model_name, raise_errors=True).get(model_name)
+    if model_info is None:
+        models_metadata.pop(model_name, None)
+    else:
+        models_metadata[model_name] = model_info
+    model_cache.invalidate(model_name)
+    result_cache.invalidate(model_name)
+    return model_info
 
 
-@api_router.post("/initialize")
-async def initialize_models():
-    """Initialize models from database."""
-    try:
-        initialize_models_from_db()
-        return {"message": f"Initialized {len(models_metadata)} models from database"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to initialize models: {str(e)}")
+def load_missing_model(model_name: str) -> Optional[Dict]:
+    """Load a model this worker doesn't know yet, querying once however many requests miss it together."""
+    with _model_load_locks[hash(model_name) % len(_model_load_locks)]:
+        model_info = models_metadata.get(model_name)
+        if model_info is not None or not os.getenv('DATABASE_URL'):
+            return model_info
+        try:
+            return refresh_model_from_db(model_name)
+        except Exception as e:
+            print(f"Error loading model '{model_name}' from database: {str(e)}")
+            return None
 
 # =============================================================================
-# API ENDPOINTS - MODEL MANAGEMENT
+# MODEL EVENTS
 # =============================================================================
 
-@api_router.post("/train")
-async def train_model(
-    file: UploadFile = File(...),
-    model_name: str = Form(...),
-    target_column: str = Form(...),
-    id_column: Optional[str] = Form(None),
-    feature_columns: Optional[str] = Form(None)
-):
-    """Train a new Naive Bayes model."""
+def publish_model_event(event: str, model_name: Optional[str] = None, version: Optional[str] = None):
+    """Tell the other workers that a model changed. Best effort: a failure is only logged.
+
+    ``event`` is ``trained``, ``updated``, ``deleted`` or ``reloaded`` (every model).
+    """
+    if not os.getenv('DATABASE_URL'):
+        return
+    payload = json.dumps({"event": event, "modelName": model_name, "version": version, "origin": WORKER_ID})
     try:
-        content = await file.read()
-        df = pd.read_csv(io.StringIO(content.decode('utf-8')))
-        
-        if target_column not in df.columns:
-            raise HTTPException(status_code=400, detail=f"Target column '{target_column}' not found in the dataset")
-        
-        all_columns = df.columns.tolist()
-        
-        if feature_columns:
-            selected_features = json.loads(feature_columns)
-            
-            for col in selected_features:
-                if col not in all_columns:
-                    raise HTTPException(status_code=400, detail=f"Feature column '{col}' not found in the dataset")
-            
-            feature_columns = selected_features
+        with db_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT pg_notify(%s, %s)", (MODEL_EVENTS_CHANNEL, payload))
+    except Exception as e:
+        print(f"Error publishing model event: {str(e)}")
+
+
+class ModelEventListener:
+    """Applies other workers' model events to this worker's registry, one model at a time.
+
+    A background thread LISTENs on ``channel`` over its own connection.
+    Trained and updated models are reloaded from the database, deleted ones
+    dropped, and a ``reloaded`` event reloads every model. The web tier
+    saves a newly trained model after /train returns, so until it does the
+    database has no row or still the version this worker holds; such a
+    model stays pending and is retried for up to ``retry_seconds``. After
+    a lost connection the whole registry is reloaded, since events may have
+    been missed in between; a reload that fails keeps the registry and is
+    retried on the next connection.
+    """
+
+    def __init__(self, channel: str, retry_seconds: float):
+        self.channel = channel
+        self.retry_seconds = retry_seconds
+        self.listening = False
+        self.received = 0
+        self.applied = 0
+        self.reconnects = 0
+        self._pending = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        dsn = os.getenv('DATABASE_URL')
+        if self._thread is not None or not dsn:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(dsn,), name="nb-model-events", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self, dsn: str):
+        connected = False
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(dsn)
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cursor:
+                    cursor.execute(psycopg2.sql.SQL("LISTEN {}").format(psycopg2.sql.Identifier(self.channel)))
+                self.listening = True
+                if connected:
+                    self.reconnects += 1
+                    initialize_models_from_db()
+                connected = True
+                self._listen(conn)
+            except Exception as e:
+                print(f"Model event listener error: {str(e)}")
+                self._stop.wait(1)
+            finally:
+                self.listening = False
+                if conn is not None:
+                    conn.close()
+
+    def _listen(self, conn):
+        while not self._stop.is_set():
+            if select.select([conn], [], [], 1.0)[0]:
+                conn.poll()
+                while conn.notifies:
+                    self.handle(conn.notifies.pop(0).payload)
+            self._retry_pending()
+
+    def handle(self, payload: str):
+        try:
+            event = json.loads(payload)
+        except json.JSONDecodeError:
+            print(f"Ignoring malformed model event: {payload}")
+            return
+        self.received += 1
+        if event.get("origin") == WORKER_ID:
+            return
+
+        model_name = event.get("modelName")
+        if event.get("event") == "reloaded":
+            self._pending.clear()
+            initialize_models_from_db()
+        elif event.get("event") == "deleted":
+            self._pending.pop(model_name, None)
+            models_metadata.pop(model_name, None)
+            model_cache.invalidate(model_name)
+            result_cache.invalidate(model_name)
+        elif event.get("event") in ("trained", "updated"):
+            current = models_metadata.get(model_name)
+            self._pending[model_name] = {
+                "deadline": time.monotonic() + self.retry_seconds,
+                "staleVersion": current.get("version") if current else None,
+                "version": event.get("version")
+            }
+            self._apply_pending(model_name)
         else:
-            feature_columns = [col for col in all_columns if col != target_column and col != id_column]
-        
-        if not feature_columns:
-            raise HTTPException(status_code=400, detail="No feature columns found")
-        
-        X = df[feature_columns].copy()
-        y = df[target_column].copy()
+            return
+        self.applied += 1
 
-        class_counts = y.value_counts()
-        min_class_count = class_counts.min()
-        
-        if min_class_count < 1:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Not enough samples for training. Minimum class count is {min_class_count}, need at least 1 sample per class."
-            )
-        
-        X_train = X.copy()
-        y_train = y.copy()
+    def _apply_pending(self, model_name: str) -> bool:
+        """Reload a pending model once its database row is newer than the version this worker held.
+
+        A row with no change is the one read before the web tier's save, so the
+        model stays pending rather than being cached under its old version.
+        """
+        pending = self._pending[model_name]
+        model_info = load_models_from_db(model_name, raise_errors=True).get(model_name)
+        if model_info is None:
+            return False
+        version = model_info.get("version")
+        if version == pending["staleVersion"] and version != pending["version"]:
+            return False
 
-        encoders = {}
-        X_train_encoded = X_train.copy()
-        
-        for column in feature_columns:
-            unique_categories = len(X_train[column].unique())
-            encoder = OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=unique_categories)
-            X_train_encoded[column] = encoder.fit_transform(X_train[[column]])
-            encoders[column] = encoder
-        
-        label_encoder = LabelEncoder()
-        y_train_encoded = label_encoder.fit_transform(y_train)
-        
-        model = CategoricalNB()
-        model.fit(X_train_encoded, y_train_encoded)
-        
-        y_pred = model.predict(X_train_encoded)
-        accuracy = accuracy_score(y_train_encoded, y_pred)
-        
-        precision = precision_score(y_train_encoded, y_pred, average='weighted', zero_division=0)
-        recall = recall_score(y_train_encoded, y_pred, average='weighted', zero_division=0)
-        f1 = f1_score(y_train_encoded, y_pred, average='weighted', zero_division=0)
-        report = classification_report(y_train_encoded, y_pred, target_names=label_encoder.classes_.tolist(), output_dict=True)
-        
-        cm = confusion_matrix(y_train_encoded, y_pred)
-        
-        model_buffer = io.BytesIO()
-        joblib.dump(model, model_buffer)
-        model_buffer.seek(0)
-        model_data = base64.b64encode(model_buffer.read()).decode('utf-8')
-        
-        encoders_buffer = io.BytesIO()
-        joblib.dump(encoders, encoders_buffer)
-        encoders_buffer.seek(0)
-        encoders_data = base64.b64encode(encoders_buffer.read()).decode('utf-8')
-        
-        label_encoder_buffer = io.BytesIO()
-        joblib.dump(label_encoder, label_encoder_buffer)
-        label_encoder_buffer.seek(0)
-        label_encoder_data = base64.b64encode(label_encoder_buffer.read()).decode('utf-8')
-        
-        metrics = {
-            "accuracy": float(accuracy),
-            "precision": float(precision),
-            "recall": float(recall),
-            "f1Score": float(f1),
-            "classMetrics": report,
-            "confusionMatrix": cm.tolist()
-        }
-        
-        model_info = {
-            "modelName": model_name,
-            "targetColumn": target_column,
-            "featureColumns": feature_columns,
-            "id_column": id_column,
-            "classes": label_encoder.classes_.tolist(),
-            "accuracy": float(accuracy),
-            "modelData": model_data,
-            "encodersData": encoders_data,
-            "labelEncoderData": label_encoder_data,
-            "metrics": metrics
-        }
-        
         models_metadata[model_name] = model_info
-        
-        return ModelInfo(
-            modelName=model_name,
-            targetColumn=target_column,
-            featureColumns=feature_columns,
-            classes=label_encoder.classes_.tolist(),
-            accuracy=float(accuracy),
-            modelData=model_data,
-            encodersData=encoders_data,
-            labelEncoderData=label_encoder_data,
-            metrics=metrics
-        )
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        model_cache.invalidate(model_name)
+        result_cache.invalidate(model_name)
+        del self._pending[model_name]
+        return True
+
+    def _retry_pending(self):
+        now = time.monotonic()
+        for model_name in list(self._pending):
+            if not self._apply_pending(model_name) and now >= self._pending[model_name]["deadline"]:
+                print(f"Model '{model_name}' was not saved to the database within {self.retry_seconds:g}s of its event")
+                del self._pending[model_name]
+
+    def stats(self) -> Dict:
+        return {
+            "channel": self.channel,
+            "listening": self.listening,
+            "received": self.received,
+            "applied": self.applied,
+            "reconnects": self.reconnects,
+            "pending": len(self._pending)
+        }
 
 
+model_event_listener = ModelEventListener(MODEL_EVENTS_CHANNEL, MODEL_EVENTS_RETRY_SECONDS)
+
 # =============================================================================
-# API ENDPOINTS - CLASSIFICATION
+# FEATURE ENCODING
 # =============================================================================
 
-@api_router.post("/classify")
-async def classify_data(
-    file: UploadFile = File(...),
-    model_name: str = Form(...),
-    id_column: Optional[str] = Form(None),
-    actual_column: Optional[str] = Form(None)
-):
-    """Classify data using a trained model."""
-    try:
-        if not models_metadata:
-            print("Models metadata is empty, initializing from database...")
-            initialize_models_from_db()
-            
-        if model_name not in models_metadata:
-            print(f"Model '{model_name}' not found. Available models: {list(models_metadata.keys())}")
-            initialize_models_from_db()
-            
-        if model_name not in models_metadata:
-            available_models = list(models_metadata.keys())
-            raise HTTPException(
-                status_code=404, 
-                detail=f"Model '{model_name}' not found. Available models: {available_models}"
+class SharedVocabulary:
+    """One read-only category vocabulary and its hash index, shared by every encoder that uses it."""
+
+    __slots__ = ("values", "digest", "index", "_lookup", "_lookup_nbytes", "_nbytes", "__weakref__")
+
+    def __init__(self, values: np.ndarray, digest: str):
+        values.flags.writeable = False
+        self.values = values
+        self.digest = digest
+        self.index = pd.Index(values)
+        self.index.get_indexer(values[:1])
+        self._lookup = None
+        self._lookup_nbytes = 0
+        self._nbytes = None
+
+    @property
+    def has_lookup(self) -> bool:
+        return self._lookup is not None
+
+    @property
+    def lookup(self) -> Dict:
+        """Plain dict from category to code, for encoding a few records without pandas."""
+        if self._lookup is None:
+            keys = self.values.tolist()
+            lookup = dict(zip(keys, range(len(keys))))
+            # The codes, and numeric keys, are int objects owned by the dict; string keys are the values' own.
+            nbytes = sys.getsizeof(lookup) + sum(sys.getsizeof(code) for code in range(257, len(keys)))
+            if self.values.dtype != object:
+                nbytes += sum(sys.getsizeof(key) for key in keys)
+            self._lookup_nbytes = nbytes
+            self._lookup = lookup
+        return self._lookup
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the values, the index with its hash table and the record lookup if built."""
+        if self._nbytes is None:
+            values_bytes = self.values.nbytes
+            if self.values.dtype == object:
+                values_bytes += sum(sys.getsizeof(value) for value in self.values)
+            self._nbytes = values_bytes + int(self.index.memory_usage(deep=True))
+        return self._nbytes + self._lookup_nbytes
+
+
+class VocabularyTable:
+    """Process-wide table of category vocabularies keyed by dtype and content hash.
+
+    Models trained on the same columns usually learn identical vocabularies;
+    interning them keeps one copy of the values and one hash index however
+    many cached models use them. Entries are held weakly and go away with
+    the last encoder that references them.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._entries = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def intern(self, vocabulary: np.ndarray) -> SharedVocabulary:
+        vocabulary = np.asarray(vocabulary)
+        if vocabulary.dtype.kind == 'U':
+            vocabulary = vocabulary.astype(object)
+        digest = hashlib.sha1(pd.util.hash_array(vocabulary).tobytes()).hexdigest()
+        key = (vocabulary.dtype.str, len(vocabulary), digest)
+        with self._lock:
+            shared = self._entries.get(key)
+            if shared is not None:
+                self.hits += 1
+                return shared
+            self.misses += 1
+
+        # Copy arrays that view a larger buffer, such as a decoded model payload, so it can be freed.
+        shared = SharedVocabulary(vocabulary.copy() if vocabulary.base is not None else vocabulary, digest)
+        with self._lock:
+            return self._entries.setdefault(key, shared)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            entries = list(self._entries.values())
+            hits, misses = self.hits, self.misses
+        return {
+            "vocabularies": len(entries),
+            "bytes": sum(shared.nbytes for shared in entries),
+            "hits": hits,
+            "misses": misses
+        }
+
+
+vocabulary_table = VocabularyTable()
+
+
+class CategoricalEncoder:
+    """Encodes all feature columns into one compact integer code matrix.
+
+    Each column keeps its sorted vocabulary (the same categories an
+    OrdinalEncoder would learn) behind a hash-based ``pd.Index``. Values not
+    in the vocabulary get the column's ``unknown_value`` code, which equals
+    the vocabulary size, and are listed in a per-column unknown-value report.
+    Vocabularies are interned in ``vocabulary_table``, so encoders that
+    learned the same categories share them.
+    """
+
+    def __init__(self, feature_columns: List[str], vocabularies: List[np.ndarray]):
+        self.feature_columns = list(feature_columns)
+        self.shared_vocabularies = [vocabulary_table.intern(vocabulary) for vocabulary in vocabularies]
+        self.vocabularies = [shared.values for shared in self.shared_vocabularies]
+        self._indexes = [shared.index for shared in self.shared_vocabularies]
+        self.n_categories = np.array([len(vocabulary) for vocabulary in self.vocabularies], dtype=np.int64)
+        largest_code = int(self.n_categories.max(initial=0))
+        self.dtype = next(
+            np.dtype(dtype) for dtype in (np.int8, np.int16, np.int32, np.int64)
+            if largest_code <= np.iinfo(dtype).max
+        )
+
+    @classmethod
+    def fit(cls, df: pd.DataFrame, feature_columns: List[str]) -> "CategoricalEncoder":
+        vocabularies = []
+        for column in feature_columns:
+            values = pd.unique(df[column])
+            if values.dtype.kind in 'biuf':
+                vocabularies.append(np.sort(np.asarray(values)))
+            else:
+                vocabularies.append(np.array(sorted(values), dtype=object))
+        return cls(feature_columns, vocabularies)
+
+    @classmethod
+    def from_ordinal_encoders(cls, encoders: Dict, feature_columns: List[str]) -> "CategoricalEncoder":
+        return cls(feature_columns, [encoders[column].categories_[0] for column in feature_columns])
+
+    def to_ordinal_encoders(self) -> Dict:
+        return {
+            column: build_ordinal_encoder(column, vocabulary)
+            for column, vocabulary in zip(self.feature_columns, self.vocabularies)
+        }
+
+    def encode_column(self, position: int, values: pd.Series) -> np.ndarray:
+        """Codes for one column, -1 where the value is not in the vocabulary."""
+        index = self._indexes[position]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            category_codes = np.append(index.get_indexer(values.cat.categories), -1)
+            return category_codes[values.cat.codes.to_numpy()]
+        return index.get_indexer(values)
+
+    def encode_records(self, records: List[Dict]) -> np.ndarray:
+        """Encode a few JSON records with dict lookups instead of building a DataFrame."""
+        codes = np.empty((len(records), len(self.feature_columns)), dtype=self.dtype)
+        for position, (column, shared) in enumerate(zip(self.feature_columns, self.shared_vocabularies)):
+            unknown = int(self.n_categories[position])
+            lookup = shared.lookup
+            codes[:, position] = [lookup.get(record[column], unknown) for record in records]
+        return codes
+
+    def vocabulary_key(self, position: int) -> Tuple:
+        """Key identifying a column and its exact vocabulary, shared by encoders that agree on both."""
+        shared = self.shared_vocabularies[position]
+        return (self.feature_columns[position], shared.values.dtype.str, shared.digest)
+
+    @property
+    def has_record_lookups(self) -> bool:
+        return all(shared.has_lookup for shared in self.shared_vocabularies)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the vocabularies, counting those shared with other encoders in full."""
+        return sum(shared.nbytes for shared in self.shared_vocabularies)
+
+    def transform(self, df: pd.DataFrame, cache: Optional[Dict] = None):
+        """Encode all feature columns in one pass.
+
+        Returns the ``(n_rows, n_features)`` code matrix and a list of
+        ``{"column", "unknown_values", "known_values"}`` reports for columns
+        that contained categories unseen at training time. Encoders scoring
+        the same frame can pass a shared ``cache`` so a column is encoded
+        once per distinct vocabulary rather than once per model.
+        """
+        codes = np.empty((len(df), len(self.feature_columns)), dtype=self.dtype)
+        unknown_categories = []
+
+        for position, column in enumerate(self.feature_columns):
+            key = self.vocabulary_key(position) if cache is not None else None
+            if cache is not None and key in cache:
+                column_codes, report = cache[key]
+            else:
+                column_codes = self.encode_column(position, df[column])
+                report = None
+                unknown = column_codes < 0
+                if unknown.any():
+                    column_codes[unknown] = self.n_categories[position]
+                    report = {
+                        "column": column,
+                        "unknown_values": pd.unique(df[column].to_numpy()[unknown]).tolist(),
+                        "known_values": self.vocabularies[position].tolist()
+                    }
+                if cache is not None:
+                    cache[key] = (column_codes, report)
+            if report is not None:
+                unknown_categories.append(report)
+            codes[:, position] = column_codes
+
+        return codes, unknown_categories
+
+# =============================================================================
+# INFERENCE ENGINE
+# =============================================================================
+
+class CompiledCategoricalNB:
+    """CategoricalNB scorer compiled into one flat log-probability lookup table.
+
+    Each feature owns a contiguous block of ``n_categories + 1`` entries in
+    ``table`` (stored class-major, shape ``(n_classes, total_entries)``); the
+    extra last entry is the ``unknown_value`` code emitted by the encoders and
+    is zero, so an unseen category contributes nothing to the joint
+    log-likelihood. A batch of integer codes (each in ``[0, n_categories]``)
+    is scored with a single gather-and-sum over the offset code matrix.
+
+    The table is stored as ``MODEL_TABLE_DTYPE`` (float32 by default, half
+    the memory of the fitted model's float64 log-probabilities) and summed
+    in float64; ``MODEL_TABLE_DTYPE=float64`` reproduces sklearn exactly.
+    """
+
+    def __init__(self, feature_log_prob: List[np.ndarray], class_log_prior: np.ndarray, dtype=None):
+        n_classes = len(class_log_prior)
+        self.n_categories = np.array([log_prob.shape[1] for log_prob in feature_log_prob], dtype=np.int64)
+        block_sizes = self.n_categories + 1
+        self.offsets = np.concatenate([[0], np.cumsum(block_sizes)[:-1]]).astype(np.int64)
+
+        table = np.zeros((n_classes, int(block_sizes.sum())), dtype=dtype or MODEL_TABLE_DTYPE)
+        for offset, log_prob in zip(self.offsets, feature_log_prob):
+            table[:, offset:offset + log_prob.shape[1]] = log_prob
+        self.table = np.ascontiguousarray(table)
+        self.class_log_prior = np.array(class_log_prior, dtype=np.float64)
+
+    @classmethod
+    def from_model(cls, model: "CategoricalNB", dtype=None) -> "CompiledCategoricalNB":
+        return cls(model.feature_log_prob_, model.class_log_prior_, dtype)
+
+    @property
+    def n_features(self) -> int:
+        return len(self.n_categories)
+
+    @property
+    def nbytes(self) -> int:
+        return self.table.nbytes + self.class_log_prior.nbytes + self.offsets.nbytes + self.n_categories.nbytes
+
+    @property
+    def n_classes(self) -> int:
+        return len(self.class_log_prior)
+
+    def joint_log_likelihood(self, codes: np.ndarray) -> np.ndarray:
+        """Joint log-likelihood for an ``(n_rows, n_features)`` matrix of category codes."""
+        codes = np.asarray(codes)
+        if codes.ndim != 2 or codes.shape[1] != self.n_features:
+            raise ValueError(f"Expected a code matrix with {self.n_features} columns, got shape {codes.shape}")
+
+        n_rows = codes.shape[0]
+        jll = np.empty((n_rows, self.n_classes), dtype=np.float64)
+        block_rows = max(INFERENCE_BLOCK_BYTES // max(self.n_features * 8, 1), 1)
+
+        for start in range(0, n_rows, block_rows):
+            index = codes[start:start + block_rows] + self.offsets
+            for class_index in range(self.n_classes):
+                jll[start:start + block_rows, class_index] = self.table[class_index].take(index, mode="clip").sum(axis=1, dtype=np.float64)
+
+        jll += self.class_log_prior
+        return jll
+
+    def predict(self, codes: np.ndarray, top_k: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Score a batch once and return argmax, max-probability and optional top-k."""
+        jll = self.joint_log_likelihood(codes)
+        rows = np.arange(jll.shape[0])
+
+        indices = jll.argmax(axis=1)
+        max_jll = jll[rows, indices]
+        log_norm = max_jll + np.log(np.exp(jll - max_jll[:, None]).sum(axis=1))
+
+        prediction = {
+            "indices": indices,
+            "confidence": np.exp(max_jll - log_norm)
+        }
+
+        if top_k:
+            k = min(int(top_k), self.n_classes)
+            top_indices = np.argsort(-jll, axis=1, kind="stable")[:, :k]
+            prediction["topIndices"] = top_indices
+            prediction["topProbabilities"] = np.exp(jll[rows[:, None], top_indices] - log_norm[:, None])
+
+        return prediction
+
+    def predict_proba(self, codes: np.ndarray) -> np.ndarray:
+        jll = self.joint_log_likelihood(codes)
+        max_jll = jll.max(axis=1, keepdims=True)
+        proba = np.exp(jll - max_jll)
+        proba /= proba.sum(axis=1, keepdims=True)
+        return proba
+
+# =============================================================================
+# MODEL SERIALIZATION
+# =============================================================================
+
+MODEL_FORMAT_MAGIC = b"NBM1"
+MODEL_FORMAT_VERSION = 1
+MODEL_FORMAT_ALIGNMENT = 64
+
+
+def build_categorical_nb(
+    class_count: np.ndarray,
+    category_count: List[np.ndarray],
+    alpha: float = 1.0,
+    fit_prior: bool = True,
+    feature_names: Optional[List[str]] = None,
+    feature_log_prob: Optional[List[np.ndarray]] = None,
+    class_log_prior: Optional[np.ndarray] = None
+) -> "CategoricalNB":
+    """Rebuild a fitted CategoricalNB from its per-class category counts.
+
+    Log probabilities are recomputed from the counts the same way ``fit``
+    does unless precomputed ``feature_log_prob``/``class_log_prior`` arrays
+    are supplied.
+    """
+    model = lazy_import("sklearn.naive_bayes").CategoricalNB(alpha=alpha, fit_prior=fit_prior)
+    model.classes_ = np.arange(len(class_count))
+    model.class_count_ = np.asarray(class_count, dtype=np.float64)
+    model.category_count_ = [np.asarray(counts, dtype=np.float64) for counts in category_count]
+    model.n_categories_ = np.array([counts.shape[1] for counts in model.category_count_], dtype=np.int64)
+    model.n_features_in_ = len(model.category_count_)
+    if feature_names is not None:
+        model.feature_names_in_ = np.asarray(feature_names, dtype=object)
+
+    if feature_log_prob is None:
+        model._update_feature_log_prob(model._check_alpha())
+    else:
+        model.feature_log_prob_ = list(feature_log_prob)
+
+    if class_log_prior is None:
+        model._update_class_log_prior()
+    else:
+        model.class_log_prior_ = class_log_prior
+
+    return model
+
+
+def build_ordinal_encoder(column: str, vocabulary: np.ndarray) -> "OrdinalEncoder":
+    """Fit an OrdinalEncoder whose categories are exactly ``vocabulary`` (sorted, unique)."""
+    if vocabulary.dtype.kind == 'U':
+        vocabulary = vocabulary.astype(object)
+    encoder = lazy_import("sklearn.preprocessing").OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=len(vocabulary))
+    encoder.fit(pd.DataFrame({column: vocabulary}))
+    return encoder
+
+
+def _typed_vocabulary(values: np.ndarray) -> np.ndarray:
+    values = np.asarray(values)
+    if values.dtype.kind in 'biuf':
+        return values
+    if all(isinstance(value, str) for value in values):
+        return values.astype(str)
+    raise ValueError("Only numeric or string categories can be stored in the binary model format")
+
+
+def serialize_model_bundle(model: "CategoricalNB", encoder: CategoricalEncoder, label_encoder: "LabelEncoder") -> bytes:
+    """Serialize a trained model into the versioned NBM binary format.
+
+    Layout: ``NBM1`` magic, little-endian uint32 header length, a JSON header
+    describing every array (dtype, shape, byte offset), then the raw arrays,
+    each aligned to 64 bytes so they can be mapped without copying.
+    """
+    arrays = {
+        "class_count": model.class_count_,
+        "class_log_prior": model.class_log_prior_,
+        "classes": _typed_vocabulary(label_encoder.classes_)
+    }
+    for index, vocabulary in enumerate(encoder.vocabularies):
+        arrays[f"category_count/{index}"] = model.category_count_[index]
+        arrays[f"feature_log_prob/{index}"] = model.feature_log_prob_[index]
+        arrays[f"vocabulary/{index}"] = _typed_vocabulary(vocabulary)
+
+    specs = {}
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[name] = array
+        specs[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += -(-array.nbytes // MODEL_FORMAT_ALIGNMENT) * MODEL_FORMAT_ALIGNMENT
+
+    header = json.dumps({
+        "formatVersion": MODEL_FORMAT_VERSION,
+        "featureColumns": encoder.feature_columns,
+        "alpha": float(model.alpha),
+        "fitPrior": bool(model.fit_prior),
+        "arrays": specs
+    }).encode('utf-8')
+    data_start = -(-(8 + len(header)) // MODEL_FORMAT_ALIGNMENT) * MODEL_FORMAT_ALIGNMENT
+
+    buffer = bytearray(data_start + offset)
+    buffer[:4] = MODEL_FORMAT_MAGIC
+    buffer[4:8] = len(header).to_bytes(4, "little")
+    buffer[8:8 + len(header)] = header
+    for name, array in arrays.items():
+        start = data_start + specs[name]["offset"]
+        buffer[start:start + array.nbytes] = array.tobytes()
+    return bytes(buffer)
+
+
+def is_model_bundle(payload) -> bool:
+    return bytes(memoryview(payload)[:4]) == MODEL_FORMAT_MAGIC
+
+
+def load_model_bundle(payload):
+    """Load (model, encoder, label_encoder) from an NBM buffer without copying its arrays."""
+    view = memoryview(payload)
+    if not is_model_bundle(view):
+        raise ValueError("Payload is not in the binary model format")
+
+    header_length = int.from_bytes(view[4:8], "little")
+    header = json.loads(bytes(view[8:8 + header_length]))
+    if header["formatVersion"] > MODEL_FORMAT_VERSION:
+        raise ValueError(f"Unsupported model format version {header['formatVersion']}")
+    data_start = -(-(8 + header_length) // MODEL_FORMAT_ALIGNMENT) * MODEL_FORMAT_ALIGNMENT
+
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"], dtype=np.int64))
+        arrays[name] = np.frombuffer(view, dtype=dtype, count=count, offset=data_start + spec["offset"]).reshape(spec["shape"])
+
+    feature_columns = header["featureColumns"]
+    feature_indexes = range(len(feature_columns))
+    model = build_categorical_nb(
+        arrays["class_count"],
+        [arrays[f"category_count/{index}"] for index in feature_indexes],
+        alpha=header["alpha"],
+        fit_prior=header["fitPrior"],
+        feature_names=feature_columns,
+        feature_log_prob=[arrays[f"feature_log_prob/{index}"] for index in feature_indexes],
+        class_log_prior=arrays["class_log_prior"]
+    )
+    encoder = CategoricalEncoder(feature_columns, [arrays[f"vocabulary/{index}"] for index in feature_indexes])
+    classes = arrays["classes"]
+    label_encoder = lazy_import("sklearn.preprocessing").LabelEncoder()
+    label_encoder.classes_ = classes.astype(object) if classes.dtype.kind == 'U' else classes
+
+    return model, encoder, label_encoder
+
+
+def _payload_bytes(value) -> bytes:
+    """Raw bytes of a stored payload: bytea values as-is, text columns base64-decoded."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return value
+    return base64.b64decode(value)
+
+
+def load_model_payloads(blobs: Dict, feature_columns: List[str]):
+    """Load (model, encoder, label_encoder, payload_size) from stored payloads in either format."""
+    model_bytes = _payload_bytes(blobs["modelData"])
+    if is_model_bundle(model_bytes):
+        return (*load_model_bundle(model_bytes), len(model_bytes))
+
+    encoders_bytes = _payload_bytes(blobs["encodersData"])
+    label_encoder_bytes = _payload_bytes(blobs["labelEncoderData"])
+
+    joblib = lazy_import("joblib")
+    model = joblib.load(io.BytesIO(model_bytes))
+    encoders = joblib.load(io.BytesIO(encoders_bytes))
+    label_encoder = joblib.load(io.BytesIO(label_encoder_bytes))
+
+    size = len(model_bytes) + len(encoders_bytes) + len(label_encoder_bytes)
+    return model, CategoricalEncoder.from_ordinal_encoders(encoders, feature_columns), label_encoder, size
+
+
+def dump_model_payloads(model: "CategoricalNB", encoder: CategoricalEncoder, label_encoder: "LabelEncoder") -> Dict:
+    """Serialize a model into the modelData/encodersData/labelEncoderData text fields.
+
+    The binary format is written to ``modelData`` with the other two fields
+    left empty; ``MODEL_FORMAT=joblib`` keeps the three legacy pickles.
+    Models whose categories can't be stored as typed arrays fall back to joblib.
+    """
+    if MODEL_FORMAT == "binary":
+        try:
+            bundle = serialize_model_bundle(model, encoder, label_encoder)
+            return {
+                "modelData": base64.b64encode(bundle).decode('utf-8'),
+                "encodersData": "",
+                "labelEncoderData": ""
+            }
+        except ValueError as e:
+            print(f"Falling back to joblib model format: {e}")
+
+    payloads = {}
+    encoders = encoder.to_ordinal_encoders()
+    for field, value in (("modelData", model), ("encodersData", encoders), ("labelEncoderData", label_encoder)):
+        buffer = io.BytesIO()
+        lazy_import("joblib").dump(value, buffer)
+        payloads[field] = base64.b64encode(buffer.getvalue()).decode('utf-8')
+    return payloads
+
+
+def model_store_path(model_name: str, key: tuple) -> Optional[str]:
+    """Local model store file for a model version, or None when the store is disabled."""
+    if not MODEL_STORE_DIR:
+        return None
+    model_hash = hashlib.sha1(str(key[0] or model_name).encode('utf-8')).hexdigest()[:16]
+    version_hash = hashlib.sha1(str(key[1]).encode('utf-8')).hexdigest()[:12]
+    return os.path.join(MODEL_STORE_DIR, f"{model_hash}-{version_hash}.nbm")
+
+
+def read_model_store(path: str):
+    """Memory-map a stored model bundle read-only."""
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def write_model_store(path: str, bundle: bytes):
+    """Atomically write a model bundle and drop older versions of the same model."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(bundle)
+    os.replace(temp_path, path)
+
+    model_prefix = os.path.basename(path).split("-")[0] + "-"
+    for name in os.listdir(os.path.dirname(path)):
+        if name.startswith(model_prefix) and name.endswith(".nbm") and os.path.join(os.path.dirname(path), name) != path:
+            try:
+                os.remove(os.path.join(os.path.dirname(path), name))
+            except OSError:
+                pass
+
+
+def migrate_model_payloads() -> Dict:
+    """Convert legacy joblib model rows in the database to the binary format."""
+    with db_connection() as conn:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+            cursor.execute("""
+                SELECT id, model_name as "modelName", feature_columns as "featureColumns"
+                FROM naive_bayes_app.models
+                WHERE encoders_data <> ''
+            """)
+            rows = cursor.fetchall()
+
+    migrated, failed = [], []
+    for row in rows:
+        try:
+            blobs = fetch_model_blobs([row['id']])[row['id']]
+            feature_columns = row['featureColumns']
+            if isinstance(feature_columns, str):
+                feature_columns = json.loads(feature_columns)
+            model, encoder, label_encoder, _ = load_model_payloads(blobs, feature_columns)
+            bundle = serialize_model_bundle(model, encoder, label_encoder)
+
+            with db_connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("""
+                        UPDATE naive_bayes_app.models
+                        SET model_data = %s, encoders_data = '', label_encoder_data = '', updated_at = now()
+                        WHERE id = %s
+                    """, (base64.b64encode(bundle).decode('utf-8'), row['id']))
+            migrated.append(row['modelName'])
+        except Exception as e:
+            print(f"Error migrating model {row['modelName']}: {e}")
+            failed.append({"model": row['modelName'], "error": str(e)})
+
+    return {"migrated": migrated, "failed": failed}
+
+# =============================================================================
+# MODEL CACHE
+# =============================================================================
+
+class ModelCache:
+    """LRU cache of deserialized model artifacts bounded by a memory budget.
+
+    Entries are stored per model name and tagged with a (model id, version)
+    key, so a retrained or reloaded model never serves stale artifacts.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, model_name: str, key: tuple):
+        with self._lock:
+            entry = self._entries.get(model_name)
+            if entry is None or entry["key"] != key:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(model_name)
+            self.hits += 1
+            return entry["artifacts"]
+
+    def put(self, model_name: str, key: tuple, artifacts: tuple, size: int):
+        with self._lock:
+            self._discard(model_name)
+            if size > self.max_bytes:
+                return
+            while self._entries and self.current_bytes + size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= evicted["size"]
+                self.evictions += 1
+            self._entries[model_name] = {"key": key, "artifacts": artifacts, "size": size}
+            self.current_bytes += size
+
+    def recharge(self, measure):
+        """Re-measure every entry with ``measure(artifacts)`` and evict least recently used ones while over budget.
+
+        Entries grow after insertion when scoring builds lazy structures,
+        such as the record lookups /predict adds to shared vocabularies.
+        """
+        with self._lock:
+            for entry in self._entries.values():
+                size = measure(entry["artifacts"])
+                self.current_bytes += size - entry["size"]
+                entry["size"] = size
+            while self._entries and self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= evicted["size"]
+                self.evictions += 1
+
+    def snapshot(self) -> List[Tuple]:
+        """(model_name, key, artifacts, size) of every entry, least recently used first."""
+        with self._lock:
+            return [(name, entry["key"], entry["artifacts"], entry["size"]) for name, entry in self._entries.items()]
+
+    def invalidate(self, model_name: str):
+        with self._lock:
+            if self._discard(model_name):
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "currentBytes": self.current_bytes,
+                "maxBytes": self.max_bytes,
+                "models": list(self._entries.keys())
+            }
+
+    def _discard(self, model_name: str) -> bool:
+        entry = self._entries.pop(model_name, None)
+        if entry is None:
+            return False
+        self.current_bytes -= entry["size"]
+        return True
+
+
+model_cache = ModelCache(MODEL_CACHE_MAX_BYTES)
+
+
+def model_cache_key(model_name: str, model_info: Dict) -> tuple:
+    return (model_info.get("id") or model_name, model_info.get("version"))
+
+
+def load_model(model_name: str, model_info: Dict):
+    """Decode the full (model, encoder, label_encoder) of a model, bypassing the model cache.
+
+    Reads the local model store when it has the version, otherwise the
+    payloads held in ``model_info`` or fetched from the database.
+    """
+    store_path = model_store_path(model_name, model_cache_key(model_name, model_info))
+    if store_path and os.path.exists(store_path):
+        with timed_stage("model_decode"):
+            return load_model_bundle(read_model_store(store_path))
+
+    if model_info.get("modelData"):
+        blobs = model_info
+    elif model_info.get("modelBundle") is not None:
+        blobs = {"modelData": model_info["modelBundle"]}
+    elif model_info.get("id"):
+        with timed_stage("model_fetch"):
+            blobs = fetch_model_blobs([model_info["id"]]).get(model_info["id"])
+        if blobs is None:
+            raise HTTPException(status_code=404, detail=f"Model '{model_name}' no longer exists in the database")
+    else:
+        raise HTTPException(status_code=404, detail=f"Model '{model_name}' is no longer available on this worker")
+
+    with timed_stage("model_decode"):
+        model, encoder, label_encoder, _ = load_model_payloads(blobs, model_info["featureColumns"])
+    if store_path:
+        try:
+            write_model_store(store_path, serialize_model_bundle(model, encoder, label_encoder))
+        except (OSError, ValueError) as e:
+            print(f"Could not write model '{model_name}' to the model store: {e}")
+    return model, encoder, label_encoder
+
+
+def get_model_artifacts(model_name: str, model_info: Dict):
+    """Return the compact (encoder, label_encoder, predictor) of a model, decoding it on cache miss.
+
+    Only what scoring needs is cached: the compiled log-probability table,
+    the encoder over shared vocabularies and the classes. The fitted model's
+    count arrays, and the payload buffer they point into, are dropped once
+    the predictor is built; ``load_model`` decodes them again when needed.
+    """
+    key = model_cache_key(model_name, model_info)
+    artifacts = model_cache.get(model_name, key)
+    if artifacts is not None:
+        return artifacts
+
+    model, encoder, label_encoder = load_model(model_name, model_info)
+    with timed_stage("model_decode"):
+        predictor = CompiledCategoricalNB.from_model(model)
+        label_encoder.classes_ = np.array(label_encoder.classes_)
+
+    artifacts = (encoder, label_encoder, predictor)
+    model_cache.put(model_name, key, artifacts, model_footprint(*artifacts)["bytes"])
+    return artifacts
+
+
+def model_footprint(encoder: CategoricalEncoder, label_encoder: "LabelEncoder", predictor: CompiledCategoricalNB) -> Dict:
+    """Bytes held by a cached model, with shared vocabularies counted in full."""
+    classes = label_encoder.classes_
+    class_bytes = classes.nbytes
+    if classes.dtype == object:
+        class_bytes += sum(sys.getsizeof(value) for value in classes)
+    vocabulary_bytes = encoder.nbytes
+    table_bytes = predictor.nbytes
+    return {
+        "bytes": table_bytes + vocabulary_bytes + class_bytes,
+        "tableBytes": table_bytes,
+        "vocabularyBytes": vocabulary_bytes,
+        "classBytes": class_bytes
+    }
+
+
+def retain_trained_model(model_name: str, model_info: Dict) -> Dict:
+    """Registry entry for a model trained or updated in this worker, without its base64 payloads.
+
+    Models that are not in the database yet can only be reloaded from their
+    own payloads. The binary bundle is written to the local model store when
+    it is enabled, otherwise kept once as raw bytes under ``modelBundle``;
+    legacy joblib payloads are kept as they are.
+    """
+    bundle = base64.b64decode(model_info["modelData"])
+    if not is_model_bundle(bundle):
+        return model_info
+
+    retained = {key: value for key, value in model_info.items() if key not in MODEL_PAYLOAD_FIELDS}
+    store_path = model_store_path(model_name, model_cache_key(model_name, model_info))
+    if store_path:
+        try:
+            write_model_store(store_path, bundle)
+            return retained
+        except OSError as e:
+            print(f"Could not write model '{model_name}' to the model store: {e}")
+    retained["modelBundle"] = bundle
+    return retained
+
+
+def local_model_payloads(model_name: str, model_info: Dict) -> Optional[Dict]:
+    """Text payload fields of a registry entry held by this worker, or None when they live in the database."""
+    if model_info.get("modelData"):
+        return {key: model_info.get(key) for key in MODEL_BLOB_FIELDS}
+
+    bundle = model_info.get("modelBundle")
+    if bundle is None and not model_info.get("id"):
+        store_path = model_store_path(model_name, model_cache_key(model_name, model_info))
+        if store_path and os.path.exists(store_path):
+            with open(store_path, "rb") as f:
+                bundle = f.read()
+    if bundle is None:
+        return None
+    return {"modelData": base64.b64encode(bundle).decode('utf-8'), "encodersData": "", "labelEncoderData": ""}
+
+
+def registry_payload_bytes() -> int:
+    """Bytes of model payloads retained in the registry rather than the model cache."""
+    total = 0
+    for model_info in list(models_metadata.values()):
+        total += len(model_info.get("modelBundle") or b"")
+        total += sum(len(model_info.get(key) or "") for key in MODEL_BLOB_FIELDS)
+    return total
+
+# =============================================================================
+# RESULT CACHE
+# =============================================================================
+
+class ResultCache:
+    """Serialized /classify results keyed by upload content, model version and request options.
+
+    A byte-bounded LRU in memory, optionally backed by a directory of result
+    files bounded by ``disk_max_bytes`` and trimmed least recently used first
+    (hits bump a file's mtime). Keys include the model's (id, version), so a
+    retrained model never serves old results; ``invalidate`` also drops a
+    model's entries right away. File names start with a hash of the model
+    name, which makes that a prefix match on disk.
+    """
+
+    def __init__(self, max_bytes: int, directory: Optional[str] = None, disk_max_bytes: int = 0):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.disk_max_bytes = disk_max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 or bool(self.directory)
+
+    @staticmethod
+    def key(content: bytes, model_name: str, model_info: Dict, options: Dict) -> str:
+        """Cache key for classifying ``content`` with a model version and the given request options."""
+        content_hash = hashlib.sha256(content).hexdigest()
+        identity = [content_hash, model_name, list(model_cache_key(model_name, model_info)), options]
+        return hashlib.sha256(json.dumps(identity, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    def get(self, model_name: str, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+        path = self._path(model_name, key)
+        body = None
+        if path:
+            try:
+                with open(path, "rb") as f:
+                    body = f.read()
+                os.utime(path)
+            except OSError:
+                body = None
+
+        with self._lock:
+            if body is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        self._remember(model_name, key, body)
+        return body
+
+    def put(self, model_name: str, key: str, body: bytes):
+        self._remember(model_name, key, body)
+
+        path = self._path(model_name, key)
+        if path and len(body) <= self.disk_max_bytes:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                temp_path = f"{path}.{os.getpid()}.tmp"
+                with open(temp_path, "wb") as f:
+                    f.write(body)
+                os.replace(temp_path, path)
+                self._trim_disk()
+            except OSError as e:
+                print(f"Could not write classification result to the result cache: {e}")
+
+    def invalidate(self, model_name: str):
+        with self._lock:
+            keys = [key for key, (name, _) in self._entries.items() if name == model_name]
+            for key in keys:
+                self.current_bytes -= len(self._entries.pop(key)[1])
+            if keys:
+                self.invalidations += len(keys)
+
+        prefix = self._model_prefix(model_name)
+        for name, _ in self._disk_files():
+            if name.startswith(prefix):
+                self._remove_file(name)
+
+    def clear(self):
+        """Drop the memory tier. Result files stay, since their keys carry the model version, and age out."""
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict:
+        files = self._disk_files()
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "diskHits": self.disk_hits,
+                "misses": self.misses,
+                "hitRate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "currentBytes": self.current_bytes,
+                "maxBytes": self.max_bytes,
+                "disk": {
+                    "directory": self.directory,
+                    "files": len(files),
+                    "bytes": sum(stat.st_size for _, stat in files),
+                    "maxBytes": self.disk_max_bytes if self.directory else 0
+                }
+            }
+
+    def _remember(self, model_name: str, key: str, body: bytes):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= len(previous[1])
+            if len(body) > self.max_bytes:
+                return
+            while self._entries and self.current_bytes + len(body) > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.current_bytes -= len(evicted)
+                self.evictions += 1
+            self._entries[key] = (model_name, body)
+            self.current_bytes += len(body)
+
+    @staticmethod
+    def _model_prefix(model_name: str) -> str:
+        return hashlib.sha1(model_name.encode('utf-8')).hexdigest()[:16] + "-"
+
+    def _path(self, model_name: str, key: str) -> Optional[str]:
+        if not self.directory:
+            return None
+        return os.path.join(self.directory, f"{self._model_prefix(model_name)}{key}.result")
+
+    def _disk_files(self) -> List[Tuple]:
+        """(file name, stat) of every result file, oldest first."""
+        if not self.directory:
+            return []
+        files = []
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".result"):
+                        try:
+                            files.append((entry.name, entry.stat()))
+                        except OSError:
+                            pass
+        except OSError:
+            return []
+        return sorted(files, key=lambda file: file[1].st_mtime)
+
+    def _trim_disk(self):
+        files = self._disk_files()
+        total = sum(stat.st_size for _, stat in files)
+        for name, stat in files:
+            if total <= self.disk_max_bytes:
+                break
+            self._remove_file(name)
+            total -= stat.st_size
+            with self._lock:
+                self.evictions += 1
+
+    def _remove_file(self, name: str):
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except OSError:
+            pass
+
+
+result_cache = ResultCache(RESULT_CACHE_MAX_BYTES, RESULT_CACHE_DIR, RESULT_CACHE_DISK_MAX_BYTES)
+
+# =============================================================================
+# METRICS
+# =============================================================================
+
+class ConfusionMatrixAccumulator:
+    """Confusion matrix over all model classes, the single source of all metrics.
+
+    Rows are actual classes and columns predicted classes, both as label
+    encoder codes. Rows whose actual label is not a known class (code -1)
+    are ignored, matching the in-memory /classify path. Accumulators built
+    over separate chunks or shards can be merged, and every score is derived
+    from the matrix with the same formulas as ``sklearn.metrics``, so the
+    figures match ``classification_report`` and the ``*_score`` functions.
+    """
+
+    def __init__(self, n_classes: int):
+        self.n_classes = n_classes
+        self.matrix = np.zeros((n_classes, n_classes), dtype=np.int64)
+
+    @property
+    def total(self) -> int:
+        return int(self.matrix.sum())
+
+    @staticmethod
+    def label_codes(values, classes) -> np.ndarray:
+        """Map labels to class codes in one hash lookup, -1 for labels that are not classes."""
+        return pd.Index(classes).get_indexer(values)
+
+    def update(self, y_true: np.ndarray, y_pred: np.ndarray):
+        y_true = np.asarray(y_true, dtype=np.int64)
+        y_pred = np.asarray(y_pred, dtype=np.int64)
+        valid = y_true >= 0
+        flat = y_true[valid] * self.n_classes + y_pred[valid]
+        self.matrix += np.bincount(flat, minlength=self.n_classes ** 2).reshape(self.n_classes, self.n_classes)
+        return self
+
+    def update_labels(self, actual, y_pred: np.ndarray, classes):
+        """Accumulate rows given actual labels rather than codes."""
+        return self.update(self.label_codes(actual, classes), y_pred)
+
+    def merge(self, other: "ConfusionMatrixAccumulator"):
+        if other.n_classes != self.n_classes:
+            raise ValueError("Cannot merge confusion matrices over different classes")
+        self.matrix += other.matrix
+        return self
+
+    def metrics(self, class_names: List[str]) -> Dict:
+        """Accuracy, weighted scores and a classification_report-style dict for the present classes."""
+        support = self.matrix.sum(axis=1)
+        predicted = self.matrix.sum(axis=0)
+        present = np.flatnonzero((support + predicted) > 0)
+
+        cm = self.matrix[np.ix_(present, present)]
+        true_positives = np.diag(cm).astype(np.float64)
+        support = cm.sum(axis=1).astype(np.float64)
+        predicted = cm.sum(axis=0).astype(np.float64)
+        total = support.sum()
+
+        def divide(numerator, denominator):
+            return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator > 0)
+
+        precision = divide(true_positives, predicted)
+        recall = divide(true_positives, support)
+        f1 = divide(2 * true_positives, support + predicted)
+        accuracy = float(true_positives.sum() / total) if total else 0.0
+
+        def weighted(scores):
+            return float(np.average(scores, weights=support)) if total else 0.0
+
+        report = {}
+        for position, class_index in enumerate(present):
+            report[str(class_names[class_index])] = {
+                "precision": float(precision[position]),
+                "recall": float(recall[position]),
+                "f1-score": float(f1[position]),
+                "support": float(support[position])
+            }
+        report["accuracy"] = accuracy
+        report["macro avg"] = {
+            "precision": float(np.average(precision)),
+            "recall": float(np.average(recall)),
+            "f1-score": float(np.average(f1)),
+            "support": float(total)
+        }
+        report["weighted avg"] = {
+            "precision": weighted(precision),
+            "recall": weighted(recall),
+            "f1-score": weighted(f1),
+            "support": float(total)
+        }
+
+        return {
+            "accuracy": accuracy,
+            "precision": report["weighted avg"]["precision"],
+            "recall": report["weighted avg"]["recall"],
+            "f1Score": report["weighted avg"]["f1-score"],
+            "classMetrics": report,
+            "confusionMatrix": cm.tolist()
+        }
+
+# =============================================================================
+# CROSS-VALIDATION
+# =============================================================================
+
+VALIDATION_METHODS = ("kfold", "holdout")
+# Rows of a class are shuffled in consecutive blocks of this many rows per fold.
+VALIDATION_BLOCK_ROWS = 16
+
+
+def _mix64(values: np.ndarray) -> np.ndarray:
+    """SplitMix64 finalizer: a fast, well-mixed hash of each uint64."""
+    values = values ^ (values >> np.uint64(30))
+    values = values * np.uint64(0xBF58476D1CE4E5B9)
+    values = values ^ (values >> np.uint64(27))
+    values = values * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+class CrossValidator:
+    """Stratified k-fold or hold-out evaluation built from category counts.
+
+    A row's fold depends only on the seed and its rank among the rows of
+    its class in file order, so the in-memory trainer (one batch) and the
+    chunked trainer (one batch per chunk) assign the same folds. Ranks are
+    shuffled within consecutive blocks by a seeded permutation per block;
+    within each class the shuffled ranks then take turns across folds (or,
+    for hold-out, every ``1 / holdout_fraction``-th one is held out). The
+    chunked trainer calls ``replay`` before its evaluation pass so the same
+    assignment comes out again.
+
+    Only the class and category counts of each fold's held-out rows are
+    kept. A fold model is the full model's counts minus those, which is
+    what fitting on the other folds would count, so no fold is refit from
+    the data. Folds are scored in parallel threads over the shared code
+    matrix.
+    """
+
+    def __init__(self, method: str, folds: int = 5, holdout_fraction: float = 0.2, seed: int = 0):
+        self.method = method
+        self.folds = folds if method == "kfold" else 1
+        self.holdout_fraction = holdout_fraction
+        self.seed = seed
+        self.fold_class_count = np.zeros((self.folds, 0), dtype=np.int64)
+        self.fold_category_count = None
+        self.accumulators = None
+        self._seen = np.zeros(0, dtype=np.int64)
+
+    @classmethod
+    def from_form(
+        cls, method: Optional[str], folds: int, holdout_fraction: float, seed: int
+    ) -> Optional["CrossValidator"]:
+        """Validate the /train validation fields; None when no validation was requested."""
+        if not method:
+            return None
+        if method not in VALIDATION_METHODS:
+            raise HTTPException(status_code=400, detail=f"validation must be one of {list(VALIDATION_METHODS)}")
+        if method == "kfold" and folds < 2:
+            raise HTTPException(status_code=400, detail="folds must be at least 2")
+        if method == "holdout" and not 0 < holdout_fraction < 1:
+            raise HTTPException(status_code=400, detail="holdout_fraction must be between 0 and 1")
+        return cls(method, folds, holdout_fraction, seed)
+
+    def replay(self):
+        """Restart the fold assignment so a second pass over the batches sees the same folds."""
+        self._seen[:] = 0
+
+    def assign(self, y: np.ndarray, n_classes: int) -> np.ndarray:
+        """Fold of each row in the next batch of class codes ``y``; -1 marks rows that are never held out."""
+        self._seen = _grow(self._seen, (n_classes,))
+
+        # Rank of each row among the rows of its class, counted from the start of the upload.
+        class_rows = np.bincount(y, minlength=n_classes)
+        by_class = np.argsort(y, kind="stable")
+        rank = np.empty(len(y), dtype=np.int64)
+        rank[by_class] = np.arange(len(y)) - np.repeat(np.cumsum(class_rows) - class_rows, class_rows)
+        rank += self._seen[y]
+        self._seen += class_rows
+
+        # Shuffle ranks within blocks with a permutation drawn from (seed, block) alone, so it
+        # doesn't depend on which rows share a batch. Every full block holds each fold equally.
+        block_size = VALIDATION_BLOCK_ROWS * self.folds
+        block, offset = np.divmod(rank, block_size)
+        blocks, block_index = np.unique(block, return_inverse=True)
+        block_keys = _mix64(np.uint64(self.seed & 0xFFFFFFFFFFFFFFFF) ^ _mix64(blocks.astype(np.uint64) + np.uint64(1)))
+        keys = _mix64(block_keys[:, None] ^ _mix64(np.arange(block_size, dtype=np.uint64) + np.uint64(1))[None, :])
+        permutation = np.argsort(np.argsort(keys, axis=1, kind="stable"), axis=1)
+        rank = block * block_size + permutation[block_index, offset]
+
+        if self.method == "kfold":
+            return rank % self.folds
+        held_out = np.floor((rank + 1) * self.holdout_fraction) > np.floor(rank * self.holdout_fraction)
+        return np.where(held_out, 0, -1)
+
+    def count(self, fold: np.ndarray, y: np.ndarray, n_classes: int, columns: List[Tuple[np.ndarray, int]]):
+        """Add a batch's held-out rows to the per-fold counts; ``columns`` holds (codes, n_categories) per feature."""
+        held_out = fold >= 0
+        fold, y = fold[held_out], y[held_out]
+        if self.fold_category_count is None:
+            self.fold_category_count = [np.zeros((self.folds, 0, 0), dtype=np.int64) for _ in columns]
+
+        self.fold_class_count = _grow(self.fold_class_count, (self.folds, n_classes)) + np.bincount(
+            fold * n_classes + y, minlength=self.folds * n_classes
+        ).reshape(self.folds, n_classes)
+        for position, (x, n_categories) in enumerate(columns):
+            shape = (self.folds, n_classes, n_categories)
+            flat = (fold * n_classes + y) * n_categories + x[held_out]
+            counts = np.bincount(flat, minlength=int(np.prod(shape))).reshape(shape)
+            self.fold_category_count[position] = _grow(self.fold_category_count[position], shape) + counts
+
+    def reorder(self, class_positions: np.ndarray, category_positions: List[np.ndarray]):
+        """Move counts kept in first-seen order to the sorted class and category order of the final model."""
+        folds = np.arange(self.folds)
+        class_count = np.zeros_like(self.fold_class_count)
+        class_count[np.ix_(folds, class_positions)] = self.fold_class_count
+        self.fold_class_count = class_count
+        for position, positions in enumerate(category_positions):
+            counts = np.zeros_like(self.fold_category_count[position])
+            counts[np.ix_(folds, class_positions, positions)] = self.fold_category_count[position]
+            self.fold_category_count[position] = counts
+
+    def predictors(self, model: "CategoricalNB") -> List["CompiledCategoricalNB"]:
+        """One compiled predictor per fold, fitted on every row outside the fold."""
+        predictors = []
+        for fold in range(self.folds):
+            # A class whose rows all fall in this fold gets a zero count and a -inf prior.
+            with np.errstate(divide="ignore"):
+                fold_model = build_categorical_nb(
+                    model.class_count_ - self.fold_class_count[fold],
+                    [
+                        counts - fold_counts[fold]
+                        for counts, fold_counts in zip(model.category_count_, self.fold_category_count)
+                    ],
+                    alpha=model.alpha,
+                    fit_prior=model.fit_prior
+                )
+            predictors.append(CompiledCategoricalNB.from_model(fold_model))
+        return predictors
+
+    def score(self, predictors: List["CompiledCategoricalNB"], codes: np.ndarray, y: np.ndarray, fold: np.ndarray):
+        """Score each fold's held-out rows of a batch with that fold's predictor."""
+        if self.accumulators is None:
+            self.accumulators = [ConfusionMatrixAccumulator(predictors[0].n_classes) for _ in predictors]
+
+        def score_fold(index: int):
+            rows = np.flatnonzero(fold == index)
+            if len(rows):
+                y_pred = predictors[index].predict(codes[rows])["indices"]
+                self.accumulators[index].update(y[rows], y_pred)
+
+        with ThreadPoolExecutor(max_workers=max(min(VALIDATION_THREADS, self.folds), 1)) as pool:
+            list(pool.map(score_fold, range(self.folds)))
+
+    def metrics(self, class_names: List[str], training_metrics: Dict) -> Dict:
+        """Pooled held-out metrics in the usual metrics shape, with per-fold metrics under ``validation``."""
+        pooled = ConfusionMatrixAccumulator(len(class_names))
+        fold_metrics = []
+        for index, accumulator in enumerate(self.accumulators or []):
+            if not accumulator.total:
+                continue
+            pooled.merge(accumulator)
+            fold_metrics.append({"fold": index, "rows": accumulator.total, **accumulator.metrics(class_names)})
+        if not pooled.total:
+            raise HTTPException(status_code=400, detail="Not enough rows to hold any out for validation")
+
+        accuracies = np.array([metrics["accuracy"] for metrics in fold_metrics])
+        f1_scores = np.array([metrics["f1Score"] for metrics in fold_metrics])
+        return {
+            **pooled.metrics(class_names),
+            "validation": {
+                "method": self.method,
+                "folds": self.folds,
+                "holdoutFraction": self.holdout_fraction if self.method == "holdout" else None,
+                "seed": self.seed,
+                "meanAccuracy": float(accuracies.mean()),
+                "stdAccuracy": float(accuracies.std()),
+                "meanF1Score": float(f1_scores.mean()),
+                "stdF1Score": float(f1_scores.std()),
+                "trainingAccuracy": training_metrics["accuracy"],
+                "foldMetrics": fold_metrics
+            }
+        }
+
+# =============================================================================
+# RESULT ASSEMBLY
+# =============================================================================
+
+RESULT_FIELDS = ["id", "actualClass", "predictedClass", "confidence", "data", "modelId", "createdAt"]
+
+
+def frame_records(df: pd.DataFrame) -> List[Dict]:
+    """Rows of ``df`` as dicts of native Python values, with missing values as None.
+
+    Built from column lists, which is several times faster than
+    ``to_dict(orient="records")``.
+    """
+    columns = []
+    for column in df.columns:
+        values = df[column]
+        if values.isna().any():
+            values = values.astype(object).where(values.notna(), None)
+        columns.append(values.tolist())
+    keys = [str(column) for column in df.columns]
+    return [dict(zip(keys, row)) for row in zip(*columns)]
+
+
+def json_records(df: pd.DataFrame) -> List[str]:
+    """Each row of ``df`` as a JSON object string.
+
+    Goes through ``dumps_json`` rather than ``DataFrame.to_json``, which
+    rounds floats to at most 15 significant digits (8.05 comes out as
+    8.050000000000001); floats keep their shortest round-trip repr here.
+    """
+    return [dumps_json(record).decode('utf-8') for record in frame_records(df)]
+
+
+def row_data_payloads(df: pd.DataFrame, data_columns: Optional[List[str]] = None):
+    """Each row as a JSON string (all columns, or ``data_columns``), or nulls for an empty list."""
+    if data_columns == []:
+        return np.full(len(df), None, dtype=object)
+    return json_records(df if data_columns is None else df[data_columns])
+
+
+def build_classification_results(
+    df: pd.DataFrame,
+    predictions: np.ndarray,
+    confidences: np.ndarray,
+    id_column: Optional[str] = None,
+    actual_column: Optional[str] = None,
+    row_offset: int = 0,
+    data_columns: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """Assemble per-row classification results as columns instead of one object per row.
+
+    ``data`` echoes each input row as a JSON string: every column by default,
+    only ``data_columns`` when given, and null when that list is empty.
+    """
+    n_rows = len(df)
+
+    if id_column and id_column in df.columns:
+        ids = df[id_column].to_numpy().astype(str)
+    else:
+        ids = np.arange(row_offset + 1, row_offset + n_rows + 1).astype(str)
+
+    if actual_column and actual_column in df.columns:
+        actual_classes = df[actual_column].to_numpy().astype(str)
+    else:
+        actual_classes = np.full(n_rows, None, dtype=object)
+
+    return pd.DataFrame({
+        "id": ids,
+        "actualClass": actual_classes,
+        "predictedClass": np.asarray(predictions).astype(str),
+        "confidence": np.asarray(confidences, dtype=np.float64),
+        "data": row_data_payloads(df, data_columns),
+        "modelId": np.full(n_rows, None, dtype=object),
+        "createdAt": np.full(n_rows, None, dtype=object)
+    }, columns=RESULT_FIELDS)
+
+
+def serialize_classification_response(
+    results: pd.DataFrame, metrics: Optional[Dict], unknown_categories: Optional[List[Dict]] = None
+) -> bytes:
+    """Serialize results in bulk into the ClassificationResponse JSON shape."""
+    return dumps_json({
+        "results": frame_records(results),
+        "metrics": metrics,
+        "unknownCategories": unknown_categories or []
+    })
+
+
+def serialize_classification_csv(
+    results: pd.DataFrame, metrics: Optional[Dict], unknown_categories: Optional[List[Dict]] = None
+) -> bytes:
+    """Results as CSV rows followed by a ``#``-prefixed summary line, as /classify/stream writes them."""
+    summary = {
+        "type": "summary",
+        "totalRecords": len(results),
+        "metrics": metrics,
+        "unknownCategories": unknown_categories or []
+    }
+    return results.to_csv(index=False).encode() + b"# " + dumps_json(summary) + b"\n"
+
+
+def serialize_classification_arrow(
+    results: pd.DataFrame, metrics: Optional[Dict], unknown_categories: Optional[List[Dict]] = None
+) -> bytes:
+    """Results as an Arrow IPC stream; metrics and unknown categories travel as JSON in the schema metadata."""
+    pa = _import_pyarrow()
+    table = pa.Table.from_pandas(results, preserve_index=False)
+    table = table.replace_schema_metadata({
+        "metrics": dumps_json(metrics),
+        "unknownCategories": dumps_json(unknown_categories or [])
+    })
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def serialize_multi_classification(model_names: List[str], scored: List[Tuple], row_payloads) -> bytes:
+    """Serialize multi-model results column-wise so each model adds a few arrays, not per-row objects.
+
+    ``ids`` and ``data`` are shared by all models; under ``models`` each model
+    has ``predictedClass``, ``confidence`` and ``actualClass`` arrays aligned
+    with ``ids``, plus its ``metrics`` and ``unknownCategories``.
+    """
+    ids = scored[0][0]["id"]
+    parts = [
+        b'{"modelNames":' + dumps_json(model_names),
+        b',"totalRecords":' + str(len(ids)).encode(),
+        b',"ids":' + dumps_json(ids.tolist()),
+        b',"data":' + dumps_json(list(row_payloads)),
+        b',"models":{'
+    ]
+    for position, (model_name, (results, metrics, unknown_categories)) in enumerate(zip(model_names, scored)):
+        columns = b",".join(
+            dumps_json(field) + b":" + dumps_json(results[field].tolist())
+            for field in ("predictedClass", "confidence", "actualClass")
+        )
+        parts.append(
+            (b"," if position else b"") + dumps_json(model_name) + b':{' + columns
+            + b',"metrics":' + dumps_json(metrics) + b',"unknownCategories":' + dumps_json(unknown_categories) + b'}'
+        )
+    parts.append(b'}}')
+    return b"".join(parts)
+
+
+RESULT_SERIALIZERS = {
+    "json": serialize_classification_response,
+    "csv": serialize_classification_csv,
+    "arrow": serialize_classification_arrow
+}
+
+# =============================================================================
+# UPLOAD FORMATS
+# =============================================================================
+
+UPLOAD_FORMAT_EXTENSIONS = (
+    (".csv.gz", "csv.gz"),
+    (".gz", "csv.gz"),
+    (".csv.zst", "csv.zst"),
+    (".zst", "csv.zst"),
+    (".parquet", "parquet"),
+    (".pq", "parquet"),
+    (".arrow", "arrow"),
+    (".arrows", "arrow"),
+    (".feather", "arrow"),
+    (".ipc", "arrow"),
+    (".csv", "csv")
+)
+UPLOAD_FORMAT_CONTENT_TYPES = {
+    "application/vnd.apache.parquet": "parquet",
+    "application/x-parquet": "parquet",
+    "application/vnd.apache.arrow.file": "arrow",
+    "application/vnd.apache.arrow.stream": "arrow",
+    "application/gzip": "csv.gz",
+    "application/x-gzip": "csv.gz",
+    "application/zstd": "csv.zst",
+    "text/csv": "csv"
+}
+# Leading bytes of each format. Compressed CSV is also sniffed when the
+# upload claims to be plain CSV, since clients often keep the .csv name.
+UPLOAD_FORMAT_MAGIC = (
+    (b"\x1f\x8b", "csv.gz"),
+    (b"\x28\xb5\x2f\xfd", "csv.zst"),
+    (b"PAR1", "parquet"),
+    (b"ARROW1", "arrow"),
+    (b"\xff\xff\xff\xff", "arrow")
+)
+CSV_COMPRESSION = {"csv": None, "csv.gz": "gzip", "csv.zst": "zstd"}
+
+
+def detect_upload_format(file_name: str = "", content_type: str = "", head: bytes = b"") -> str:
+    """Upload format from the file extension or content type, falling back to the leading bytes."""
+    name = (file_name or "").lower()
+    declared = next((fmt for extension, fmt in UPLOAD_FORMAT_EXTENSIONS if name.endswith(extension)), None)
+    if declared is None:
+        declared = UPLOAD_FORMAT_CONTENT_TYPES.get((content_type or "").split(";")[0].strip().lower())
+    if declared and declared != "csv":
+        return declared
+    for magic, fmt in UPLOAD_FORMAT_MAGIC:
+        if head.startswith(magic) and (declared is None or fmt in CSV_COMPRESSION):
+            return fmt
+    return "csv"
+
+
+def upload_format_of(file: UploadFile) -> str:
+    """Detect an UploadFile's format from its name, content type and first bytes."""
+    position = file.file.tell()
+    file.file.seek(0)
+    head = file.file.read(8)
+    file.file.seek(position)
+    return detect_upload_format(file.filename, file.content_type, head)
+
+
+def _import_pyarrow():
+    """Import pyarrow on first use; it is only needed for Parquet and Arrow uploads."""
+    try:
+        pyarrow = lazy_import("pyarrow")
+        lazy_import("pyarrow.ipc")
+        lazy_import("pyarrow.parquet")
+    except ImportError:
+        raise HTTPException(status_code=415, detail="Parquet and Arrow uploads need pyarrow installed on the API server")
+    return pyarrow
+
+
+def _arrow_source(source: Union[bytes, str, io.IOBase]):
+    """Wrap bytes without copying and memory-map paths so pyarrow reads them lazily."""
+    pa = _import_pyarrow()
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return pa.BufferReader(source)
+    if isinstance(source, str):
+        return pa.memory_map(source)
+    source.seek(0)
+    return source
+
+
+def _string_columns(schema) -> List[str]:
+    pa = _import_pyarrow()
+    return [
+        field.name for field in schema
+        if pa.types.is_string(field.type) or pa.types.is_large_string(field.type)
+    ]
+
+
+def _open_arrow(source):
+    """Open an Arrow IPC file (Feather v2) or stream and return its record batches lazily."""
+    pa = _import_pyarrow()
+    handle = _arrow_source(source)
+    if bytes(handle.read(6)) == b"ARROW1":
+        handle.seek(0)
+        reader = pa.ipc.open_file(handle)
+        return reader.schema, (reader.get_batch(index) for index in range(reader.num_record_batches))
+    handle.seek(0)
+    reader = pa.ipc.open_stream(handle)
+    return reader.schema, iter(reader)
+
+
+def _arrow_to_frame(table, usecols: Optional[List[str]] = None) -> pd.DataFrame:
+    """Project an Arrow table and convert it with string columns as pandas categoricals."""
+    pa = _import_pyarrow()
+    if usecols is not None:
+        table = table.select(usecols)
+    for name in _string_columns(table.schema):
+        position = table.schema.get_field_index(name)
+        table = table.set_column(position, name, table.column(position).dictionary_encode())
+    return table.to_pandas()
+
+
+def _read_csv(source, upload_format: str, **kwargs) -> pd.DataFrame:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    elif not isinstance(source, str):
+        source.seek(0)
+    try:
+        return pd.read_csv(source, compression=CSV_COMPRESSION[upload_format], **kwargs)
+    except ImportError as e:
+        raise HTTPException(status_code=415, detail=f"Cannot read {upload_format} uploads: {e}")
+
+
+def upload_columns(source: Union[bytes, str, io.IOBase], upload_format: str = "csv") -> List[str]:
+    """Column names of an upload, read from its header or schema only."""
+    if upload_format == "parquet":
+        return _import_pyarrow().parquet.read_schema(_arrow_source(source)).names
+    if upload_format == "arrow":
+        schema, _ = _open_arrow(source)
+        return schema.names
+    return _read_csv(source, upload_format, nrows=0).columns.tolist()
+
+
+def read_upload(
+    source: Union[bytes, str, io.IOBase],
+    upload_format: str = "csv",
+    usecols: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """Read an upload into a DataFrame, loading only ``usecols`` when given.
+
+    Parquet and Arrow string columns arrive dictionary-encoded as pandas
+    categoricals, so each distinct value is materialized once rather than
+    once per row; the encoder maps categories to codes directly.
+    """
+    if usecols is not None:
+        usecols = list(dict.fromkeys(usecols))
+    if upload_format == "parquet":
+        pa = _import_pyarrow()
+        schema = pa.parquet.read_schema(_arrow_source(source))
+        table = pa.parquet.read_table(
+            _arrow_source(source), columns=usecols, read_dictionary=_string_columns(schema)
+        )
+        return _arrow_to_frame(table)
+    if upload_format == "arrow":
+        pa = _import_pyarrow()
+        schema, batches = _open_arrow(source)
+        return _arrow_to_frame(pa.Table.from_batches(list(batches), schema=schema), usecols)
+    return _read_csv(source, upload_format, usecols=usecols)
+
+
+def iter_upload_chunks(
+    source: Union[bytes, str, io.IOBase],
+    upload_format: str = "csv",
+    chunk_size: int = 50000,
+    usecols: Optional[List[str]] = None
+):
+    """Yield an upload as DataFrames of at most ``chunk_size`` rows."""
+    if usecols is not None:
+        usecols = list(dict.fromkeys(usecols))
+    if upload_format == "parquet":
+        pa = _import_pyarrow()
+        schema = pa.parquet.read_schema(_arrow_source(source))
+        parquet_file = pa.parquet.ParquetFile(_arrow_source(source), read_dictionary=_string_columns(schema))
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=usecols):
+            yield _arrow_to_frame(pa.Table.from_batches([batch]))
+    elif upload_format == "arrow":
+        pa = _import_pyarrow()
+        _, batches = _open_arrow(source)
+        for batch in batches:
+            for offset in range(0, batch.num_rows, chunk_size):
+                yield _arrow_to_frame(pa.Table.from_batches([batch.slice(offset, chunk_size)]), usecols)
+    else:
+        yield from _read_csv(source, upload_format, usecols=usecols, chunksize=chunk_size)
+
+# =============================================================================
+# RESPONSE ENCODING
+# =============================================================================
+
+RESULT_MEDIA_TYPES = {
+    "json": "application/json",
+    "csv": "text/csv; charset=utf-8",
+    "arrow": "application/vnd.apache.arrow.stream"
+}
+ACCEPT_RESULT_FORMATS = {
+    "application/json": "json",
+    "text/csv": "csv",
+    "application/vnd.apache.arrow.stream": "arrow",
+    "application/vnd.apache.arrow.file": "arrow",
+    "*/*": "json",
+    "application/*": "json",
+    "text/*": "csv"
+}
+
+
+def dumps_json(content) -> bytes:
+    """Serialize with orjson when it is installed, falling back to the json module.
+
+    Datetimes and other unknown types go through ``str`` in both cases so the
+    output does not depend on which library is present.
+    """
+    if orjson is not None:
+        return orjson.dumps(
+            content,
+            default=str,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        )
+    return json.dumps(content, default=str).encode('utf-8')
+
+
+class ORJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps_json(content)
+
+
+def negotiate_result_format(accept: Optional[str]) -> str:
+    """Pick json, csv or arrow from an Accept header, honouring q-values; 406 if none fits."""
+    if not accept:
+        return "json"
+    ranked = []
+    for position, item in enumerate(accept.split(",")):
+        media_type, *params = [part.strip() for part in item.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        result_format = ACCEPT_RESULT_FORMATS.get(media_type.lower())
+        if result_format == "arrow" and importlib.util.find_spec("pyarrow") is None:
+            continue
+        if result_format and quality > 0:
+            ranked.append((-quality, position, result_format))
+    if not ranked:
+        raise HTTPException(
+            status_code=406,
+            detail="Acceptable result types are application/json, text/csv and application/vnd.apache.arrow.stream"
+        )
+    return min(ranked)[2]
+
+
+class BrotliResponder(IdentityResponder):
+    """Brotli counterpart of Starlette's GZipResponder, streaming-safe via per-chunk flushes."""
+
+    content_encoding = "br"
+
+    def __init__(self, app, minimum_size: int, quality: int, thread_minimum_size: int, **kwargs):
+        super().__init__(app, minimum_size, **kwargs)
+        self.quality = quality
+        self.thread_minimum_size = thread_minimum_size
+        self._compressor = None
+
+    async def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        if len(body) >= self.thread_minimum_size:
+            return await run_in_threadpool(self._compress_body, body, more_body)
+        return self._compress_body(body, more_body)
+
+    def _compress_body(self, body: bytes, more_body: bool) -> bytes:
+        if self._compressor is None:
+            import brotli
+
+            self._compressor = brotli.Compressor(quality=self.quality)
+        compressed = self._compressor.process(body)
+        return compressed + (self._compressor.flush() if more_body else self._compressor.finish())
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """Compress responses above ``minimum_size`` with brotli or gzip, per Accept-Encoding.
+
+    Brotli is preferred when the client accepts it and the ``brotli`` package
+    is installed; everything else falls through to Starlette's gzip handling,
+    which also streams NDJSON/CSV chunk by chunk.
+    """
+
+    def __init__(self, app, minimum_size: int, compresslevel: int, brotli_quality: int):
+        super().__init__(app, minimum_size=minimum_size, compresslevel=compresslevel)
+        self.brotli_quality = brotli_quality
+        self.brotli_available = importlib.util.find_spec("brotli") is not None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and self.brotli_available:
+            accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+            if "br" in [part.split(";")[0].strip() for part in accept_encoding.split(",")]:
+                responder = BrotliResponder(
+                    self.app, self.minimum_size, self.brotli_quality, self.thread_minimum_size,
+                    exclude_content_types=self.exclude_content_types
+                )
+                await responder(scope, receive, send)
+                return
+        await super().__call__(scope, receive, send)
+
+# =============================================================================
+# EXECUTION BACKEND
+# =============================================================================
+
+async def spool_upload(file: UploadFile, directory: Optional[str] = None) -> str:
+    """Copy an upload to a temporary file in bounded chunks and return its path."""
+    with tempfile.NamedTemporaryFile(prefix="nb-upload-", suffix=".csv", dir=directory, delete=False) as spooled:
+        while True:
+            block = await file.read(UPLOAD_SPOOL_BLOCK_BYTES)
+            if not block:
+                break
+            spooled.write(block)
+    return spooled.name
+
+
+def _call_in_worker(fn, args: tuple):
+    """Run ``fn`` in a worker, returning HTTPExceptions as data since they don't pickle.
+
+    Stage timings recorded in the worker are returned alongside the result so
+    the caller can merge them into its own request timer.
+    """
+    timer = StageTimer()
+    token = _current_timer.set(timer)
+    try:
+        return True, fn(*args), timer.snapshot()
+    except HTTPException as e:
+        return False, (e.status_code, e.detail, e.headers), timer.snapshot()
+    finally:
+        _current_timer.reset(token)
+
+
+class WorkerPool:
+    """Runs CPU-bound request stages off the event loop with a bounded queue.
+
+    ``backend`` is ``thread`` or ``process``. At most ``max_workers`` jobs run
+    at once and up to ``max_queue`` more wait; beyond that ``run`` rejects the
+    request with 503 and a Retry-After header instead of queueing without bound.
+    """
+
+    def __init__(self, backend: str, max_workers: int, max_queue: int, retry_after: int):
+        if backend not in ("thread", "process"):
+            raise ValueError(f"Unknown execution backend '{backend}'")
+        self.backend = backend
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.rejected = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                if self.backend == "process":
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn")
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="nb-worker")
+            return self._executor
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self.in_flight >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail="Server is busy processing other jobs, please retry later",
+                    headers={"Retry-After": str(self.retry_after)}
+                )
+            self.in_flight += 1
+
+        try:
+            loop = asyncio.get_running_loop()
+            ok, value, timings = await loop.run_in_executor(self.executor, _call_in_worker, fn, args)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+        timer = _current_timer.get()
+        if timer is not None:
+            timer.merge(timings)
+
+        if not ok:
+            status_code, detail, headers = value
+            raise HTTPException(status_code=status_code, detail=detail, headers=headers)
+        return value
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "backend": self.backend,
+                "maxWorkers": self.max_workers,
+                "maxQueue": self.max_queue,
+                "inFlight": self.in_flight,
+                "rejected": self.rejected
+            }
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+
+worker_pool = WorkerPool(
+    EXECUTION_BACKEND,
+    max_workers=EXECUTION_MAX_WORKERS,
+    max_queue=EXECUTION_MAX_QUEUE,
+    retry_after=EXECUTION_RETRY_AFTER
+)
+
+# =============================================================================
+# PREDICTION BATCHING
+# =============================================================================
+
+def score_record_batch(model_name: str, model_info: Dict, records: List[Dict], requests: List[Tuple]) -> List[List[Dict]]:
+    """Score the records of several /predict calls at once.
+
+    ``requests`` holds ``(start, count, probabilities, top_k)`` per call and
+    one list of predictions is returned for each of them.
+    """
+    encoder, label_encoder, predictor = get_model_artifacts(model_name, model_info)
+    classes = label_encoder.classes_.astype(str)
+
+    builds_lookups = not encoder.has_record_lookups
+    codes = encoder.encode_records(records)
+    if builds_lookups:
+        model_cache.recharge(lambda artifacts: model_footprint(*artifacts)["bytes"])
+
+    top_k = max((top_k or 0 for _, _, _, top_k in requests), default=0)
+    if any(probabilities for _, _, probabilities, _ in requests):
+        top_k = len(classes)
+    prediction = predictor.predict(codes, top_k=top_k or None)
+
+    predicted = classes[prediction["indices"]].tolist()
+    confidence = prediction["confidence"].tolist()
+    if top_k:
+        top_classes = classes[prediction["topIndices"]].tolist()
+        top_probabilities = prediction["topProbabilities"].tolist()
+
+    responses = []
+    for start, count, probabilities, request_top_k in requests:
+        predictions = []
+        for row in range(start, start + count):
+            item = {"predictedClass": predicted[row], "confidence": confidence[row]}
+            if probabilities:
+                item["probabilities"] = dict(zip(top_classes[row], top_probabilities[row]))
+            if request_top_k:
+                item["topClasses"] = [
+                    {"class": name, "probability": probability}
+                    for name, probability in zip(top_classes[row][:request_top_k], top_probabilities[row][:request_top_k])
+                ]
+            predictions.append(item)
+        responses.append(predictions)
+    return responses
+
+
+class PendingBatch:
+    def __init__(self, model_name: str, model_info: Dict):
+        self.model_name = model_name
+        self.model_info = model_info
+        self.records = []
+        self.requests = []
+        self.futures = []
+        self.timer = None
+
+
+class PredictBatcher:
+    """Coalesces concurrent /predict calls for the same model into one scoring pass.
+
+    The first call for a model version opens a batch that other calls join
+    for up to ``window_ms`` milliseconds. The batch is scored as soon as the
+    window closes or it holds ``max_batch_size`` records, in the threadpool
+    so the event loop keeps collecting the next batch meanwhile. If scoring
+    the batch fails, each call is scored again on its own, so only the
+    calls that fail by themselves get an error.
+    """
+
+    def __init__(self, window_ms: float, max_batch_size: int):
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.batches = 0
+        self.records = 0
+        self.requests = 0
+        self.isolated = 0
+        self._pending = {}
+        self._tasks = set()
+
+    async def predict(self, model_name: str, model_info: Dict, records: List[Dict], probabilities: bool, top_k: Optional[int]):
+        loop = asyncio.get_running_loop()
+        key = (model_name, model_info.get("version"))
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = self._pending[key] = PendingBatch(model_name, model_info)
+            batch.timer = loop.call_later(self.window, self._flush, key)
+
+        future = loop.create_future()
+        batch.requests.append((len(batch.records), len(records), probabilities, top_k))
+        batch.records.extend(records)
+        batch.futures.append(future)
+        if len(batch.records) >= self.max_batch_size:
+            batch.timer.cancel()
+            self._flush(key)
+        return await future
+
+    def _flush(self, key):
+        batch = self._pending.pop(key, None)
+        if batch is None:
+            return
+        self.batches += 1
+        self.records += len(batch.records)
+        self.requests += len(batch.requests)
+        task = asyncio.get_running_loop().create_task(self._score(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _score(self, batch: PendingBatch):
+        try:
+            responses = await run_in_threadpool(
+                score_record_batch, batch.model_name, batch.model_info, batch.records, batch.requests
+            )
+        except Exception as e:
+            if len(batch.futures) == 1:
+                if not batch.futures[0].done():
+                    batch.futures[0].set_exception(e)
+                return
+            # One bad call must not fail the calls that joined its batch, so score each on its own.
+            self.isolated += 1
+            await asyncio.gather(*(
+                self._score_alone(batch, request, future) for request, future in zip(batch.requests, batch.futures)
+            ))
+            return
+        for future, predictions in zip(batch.futures, responses):
+            if not future.done():
+                future.set_result(predictions)
+
+    async def _score_alone(self, batch: PendingBatch, request: Tuple, future: asyncio.Future):
+        start, count, probabilities, top_k = request
+        try:
+            (predictions,) = await run_in_threadpool(
+                score_record_batch, batch.model_name, batch.model_info, batch.records[start:start + count],
+                [(0, count, probabilities, top_k)]
+            )
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(predictions)
+
+    def stats(self) -> Dict:
+        return {
+            "windowMs": self.window * 1000,
+            "maxBatchSize": self.max_batch_size,
+            "batches": self.batches,
+            "requests": self.requests,
+            "records": self.records,
+            "isolatedBatches": self.isolated,
+            "averageBatchSize": self.records / self.batches if self.batches else 0.0
+        }
+
+
+predict_batcher = PredictBatcher(PREDICT_BATCH_WINDOW_MS, PREDICT_MAX_BATCH_SIZE)
+
+# =============================================================================
+# BACKGROUND JOBS
+# =============================================================================
+
+JOB_STATUSES = ("queued", "running", "succeeded", "failed", "cancelled")
+JOB_FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+
+# cancel_requested values: a client cancel ends the job, a shutdown interrupt
+# stops the worker early and leaves the job to be requeued on the next start.
+JOB_CANCEL_REQUESTED = 1
+JOB_INTERRUPTED = 2
+
+JOB_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    model_name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    input_path TEXT,
+    file_name TEXT,
+    stage TEXT,
+    rows_processed INTEGER NOT NULL DEFAULT 0,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    owner TEXT,
+    heartbeat_at REAL,
+    result_path TEXT,
+    result_media_type TEXT,
+    error TEXT,
+    error_status INTEGER,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT
+)
+"""
+
+
+class JobCancelled(Exception):
+    """Raised inside a job's worker when the job was cancelled or interrupted."""
+
+
+class JobStore:
+    """Job records in a SQLite file, with uploads and results stored next to it.
+
+    Each call opens its own connection, so the store can be handed to
+    process workers, and WAL mode lets workers write progress while the API
+    reads job status.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = os.path.join(directory, "jobs.sqlite3")
+        self.uploads_dir = os.path.join(directory, "uploads")
+        self.results_dir = os.path.join(directory, "results")
+
+    def initialize(self):
+        os.makedirs(self.uploads_dir, exist_ok=True)
+        os.makedirs(self.results_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(JOB_SCHEMA)
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_idx ON jobs (status, created_at)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def create(self, kind: str, model_name: str, params: Dict, input_path: str, file_name: str) -> Dict:
+        job_id = generate_id()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, model_name, status, params, input_path, file_name, created_at) "
+                "VALUES (?, ?, ?, 'queued', ?, ?, ?, ?)",
+                (job_id, kind, model_name, json.dumps(params), input_path, file_name, datetime.now().isoformat())
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list(self, status: Optional[str] = None, model_name: Optional[str] = None, limit: int = 100) -> List[Dict]:
+        query = "SELECT * FROM jobs WHERE (? IS NULL OR status = ?) AND (? IS NULL OR model_name = ?) ORDER BY created_at DESC LIMIT ?"
+        with self._connect() as conn:
+            rows = conn.execute(query, (status, status, model_name, model_name, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    def transition(self, job_id: str, from_statuses: Tuple[str, ...], **fields) -> bool:
+        """Update a job only while its status is one of ``from_statuses``; True if it was updated."""
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        placeholders = ", ".join("?" for _ in from_statuses)
+        with self._connect() as conn:
+            cursor = conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ? AND status IN ({placeholders})",
+                (*fields.values(), job_id, *from_statuses)
+            )
+        return cursor.rowcount == 1
+
+    def claim(self, job_id: str, owner: str) -> bool:
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'running', owner = ?, heartbeat_at = ?, started_at = ?, "
+                "attempts = attempts + 1, stage = NULL, rows_processed = 0 WHERE id = ? AND status = 'queued'",
+                (owner, time.time(), datetime.now().isoformat(), job_id)
+            )
+        return cursor.rowcount == 1
+
+    def report_progress(self, job_id: str, stage: Optional[str], rows: int) -> int:
+        """Record a running job's stage and row count and return its cancel_requested flag."""
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET stage = ?, rows_processed = ? WHERE id = ?", (stage, rows, job_id))
+            row = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row["cancel_requested"] if row else JOB_CANCEL_REQUESTED
+
+    def request_cancel(self, job_ids: List[str], flag: int = JOB_CANCEL_REQUESTED):
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE jobs SET cancel_requested = ? WHERE id = ? AND status = 'running'",
+                [(flag, job_id) for job_id in job_ids]
+            )
+
+    def heartbeat(self, owner: str):
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE owner = ? AND status = 'running'", (time.time(), owner))
+
+    def queued(self, limit: int) -> List[Dict]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT ?", (limit,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def running_per_model(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT model_name, COUNT(*) AS running FROM jobs WHERE status = 'running' GROUP BY model_name"
+            ).fetchall()
+        return {row["model_name"]: row["running"] for row in rows}
+
+    def stale(self, owner: str, older_than: float) -> List[Dict]:
+        """Running jobs of other owners whose heartbeat stopped, i.e. whose server died."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'running' AND owner != ? AND COALESCE(heartbeat_at, 0) < ?",
+                (owner, time.time() - older_than)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS jobs FROM jobs GROUP BY status").fetchall()
+        counts = {status: 0 for status in JOB_STATUSES}
+        counts.update({row["status"]: row["jobs"] for row in rows})
+        return counts
+
+    def delete(self, job_id: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+
+def job_payload(job: Dict) -> Dict:
+    """The API representation of a job record."""
+    error = job["error"]
+    if error is not None:
+        try:
+            error = json.loads(error)
+        except json.JSONDecodeError:
+            pass
+    return {
+        "jobId": job["id"],
+        "kind": job["kind"],
+        "modelName": job["model_name"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "rowsProcessed": job["rows_processed"],
+        "attempts": job["attempts"],
+        "fileName": job["file_name"],
+        "cancelRequested": bool(job["cancel_requested"]),
+        "error": error,
+        "createdAt": job["created_at"],
+        "startedAt": job["started_at"],
+        "finishedAt": job["finished_at"]
+    }
+
+
+def _remove_file(path: Optional[str]):
+    if path:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class JobProgressTimer(StageTimer):
+    """Stage timer that mirrors a job's current stage and row count into the job store.
+
+    Writes are throttled to one per ``interval`` seconds. Each write also
+    reads the job's cancel flag and raises JobCancelled when it is set, so
+    work stops at the next stage or chunk boundary.
+    """
+
+    def __init__(self, store: JobStore, job_id: str, interval: float = 0.5):
+        super().__init__()
+        self.store = store
+        self.job_id = job_id
+        self.interval = interval
+        self.stage = None
+        self._reported = 0.0
+
+    def begin(self, name: str):
+        self.stage = name
+        self._report()
+
+    def count(self, rows: int = 0, bytes: int = 0):
+        super().count(rows, bytes)
+        self._report()
+
+    def _report(self):
+        now = time.monotonic()
+        if now - self._reported < self.interval:
+            return
+        self._reported = now
+        if self.store.report_progress(self.job_id, self.stage, self.rows):
+            raise JobCancelled(self.job_id)
+
+
+def run_job(store: JobStore, job_id: str, kind: str, params: Dict, input_path: str, model_info: Optional[Dict]):
+    """Run one job in a worker; returns a model_info record for train jobs and the result body for classify jobs."""
+    parent = _current_timer.get()
+    timer = JobProgressTimer(store, job_id)
+    token = _current_timer.set(timer)
+    try:
+        timer.begin("start")
+        validator = CrossValidator.from_form(*params["validation"]) if kind == "train" else None
+        if kind == "train" and params["chunked"]:
+            return fit_model_from_csv_chunks(
+                input_path, params["modelName"], params["targetColumn"], params["idColumn"], params["featureColumns"],
+                params["chunkSize"], params["uploadFormat"], validator
             )
+        with timed_stage("upload"):
+            with open(input_path, "rb") as f:
+                content = f.read()
+        if kind == "train":
+            return fit_model_from_csv(
+                content, params["modelName"], params["targetColumn"], params["idColumn"], params["featureColumns"],
+                params["uploadFormat"], validator
+            )
+        return classify_csv(
+            content, params["modelName"], model_info, params["idColumn"], params["actualColumn"], params["persist"],
+            params["fileName"], params["uploadFormat"], params["dataColumns"], params["resultFormat"]
+        )
+    finally:
+        _current_timer.reset(token)
+        if parent is not None:
+            parent.merge(timer.snapshot())
+
+
+class JobQueue:
+    """Runs submitted train and classify jobs in the background.
+
+    Jobs are recorded in ``store`` and picked up oldest first by a dispatcher
+    task. At most ``max_concurrency`` jobs run at once on ``pool`` and at most
+    ``max_per_model`` for the same model, counted across every server sharing
+    the store. Running jobs are heartbeated; jobs whose server stopped
+    heartbeating are requeued up to ``max_attempts`` times.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        pool: WorkerPool,
+        max_concurrency: int,
+        max_per_model: int,
+        max_attempts: int,
+        poll_seconds: float,
+        stale_seconds: float
+    ):
+        self.store = store
+        self.pool = pool
+        self.max_concurrency = max_concurrency
+        self.max_per_model = max_per_model
+        self.max_attempts = max_attempts
+        self.poll_seconds = poll_seconds
+        self.stale_seconds = stale_seconds
+        self.owner = WORKER_ID
+        self._running = {}
+        self._wakeup = None
+        self._dispatcher = None
+
+    async def start(self):
+        await run_in_threadpool(self.store.initialize)
+        self._wakeup = asyncio.Event()
+        self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch())
+
+    async def stop(self):
+        """Stop dispatching and interrupt running jobs so they are requeued on the next start."""
+        if self._dispatcher is None:
+            return
+        self._dispatcher.cancel()
+        tasks = list(self._running.values())
+        if self._running:
+            await run_in_threadpool(self.store.request_cancel, list(self._running), JOB_INTERRUPTED)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(self._dispatcher, *tasks, return_exceptions=True)
+        self._dispatcher = None
+
+    def wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def submit(self, kind: str, model_name: str, params: Dict, file: UploadFile) -> Dict:
+        with timed_stage("upload"):
+            input_path = await spool_upload(file, self.store.uploads_dir)
+        try:
+            job = await run_in_threadpool(self.store.create, kind, model_name, params, input_path, file.filename or "")
+        except Exception:
+            _remove_file(input_path)
+            raise
+        print(f"Queued {kind} job {job['id']} for model '{model_name}'")
+        self.wake()
+        return job
+
+    async def cancel(self, job_id: str) -> Optional[Dict]:
+        """Cancel a queued job or ask a running one to stop; finished jobs are left as they are."""
+        cancelled = await run_in_threadpool(
+            self.store.transition, job_id, ("queued",), status="cancelled", finished_at=datetime.now().isoformat()
+        )
+        if cancelled:
+            job = await run_in_threadpool(self.store.get, job_id)
+            _remove_file(job["input_path"])
+            return job
+        await run_in_threadpool(self.store.request_cancel, [job_id])
+        return await run_in_threadpool(self.store.get, job_id)
+
+    def recover(self):
+        """Requeue running jobs whose server died, or fail them once they run out of attempts."""
+        for job in self.store.stale(self.owner, self.stale_seconds):
+            if job["cancel_requested"] == JOB_CANCEL_REQUESTED:
+                self.store.transition(job["id"], ("running",), status="cancelled", finished_at=datetime.now().isoformat())
+                _remove_file(job["input_path"])
+            elif job["attempts"] < self.max_attempts and job["input_path"] and os.path.exists(job["input_path"]):
+                print(f"Requeueing job {job['id']} after its server stopped (attempt {job['attempts']})")
+                self.store.transition(job["id"], ("running",), status="queued", owner=None, cancel_requested=0)
+            else:
+                self.store.transition(
+                    job["id"], ("running",), status="failed", error="Job was interrupted too many times",
+                    error_status=500, finished_at=datetime.now().isoformat()
+                )
+                _remove_file(job["input_path"])
+
+    async def _dispatch(self):
+        while True:
+            try:
+                await run_in_threadpool(self.store.heartbeat, self.owner)
+                await run_in_threadpool(self.recover)
+                await self._start_jobs()
+            except Exception as e:
+                print(f"Job dispatcher error: {str(e)}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _start_jobs(self):
+        free = self.max_concurrency - len(self._running)
+        if free <= 0:
+            return
+        queued = await run_in_threadpool(self.store.queued, free + 100)
+        running = await run_in_threadpool(self.store.running_per_model)
+        for job in queued:
+            if free <= 0:
+                break
+            if running.get(job["model_name"], 0) >= self.max_per_model:
+                continue
+            if not await run_in_threadpool(self.store.claim, job["id"], self.owner):
+                continue
+            running[job["model_name"]] = running.get(job["model_name"], 0) + 1
+            free -= 1
+            task = asyncio.get_running_loop().create_task(self._run(job))
+            self._running[job["id"]] = task
+            task.add_done_callback(lambda _, job_id=job["id"]: self._finished(job_id))
+
+    def _finished(self, job_id: str):
+        self._running.pop(job_id, None)
+        self.wake()
+
+    async def _run(self, job: Dict):
+        job_id = job["id"]
+        timer = StageTimer(f"job:{job['kind']}")
+        _current_timer.set(timer)
+        params = json.loads(job["params"])
+        status = "failed"
+        try:
+            model_info = None
+            if job["kind"] == "classify":
+                model_info = await run_in_threadpool(resolve_model_info, job["model_name"])
+            value = await self.pool.run(run_job, self.store, job_id, job["kind"], params, job["input_path"], model_info)
+            if job["kind"] == "train":
+                models_metadata[job["model_name"]] = retain_trained_model(job["model_name"], value)
+                model_cache.invalidate(job["model_name"])
+                result_cache.invalidate(job["model_name"])
+                await run_in_threadpool(publish_model_event, "trained", job["model_name"], value["version"])
+                body = dumps_json(ModelInfo(**{**value, "modelName": job["model_name"]}).model_dump())
+                media_type = "application/json"
+            else:
+                body = value
+                media_type = RESULT_MEDIA_TYPES[params["resultFormat"]]
+            result_path = os.path.join(self.store.results_dir, job_id)
+            await run_in_threadpool(_write_file, result_path, body)
+            await run_in_threadpool(
+                self.store.transition, job_id, ("running",), status="succeeded", stage=None, rows_processed=timer.rows,
+                result_path=result_path, result_media_type=media_type, finished_at=datetime.now().isoformat()
+            )
+            status = "succeeded"
+        except asyncio.CancelledError:
+            # Server shutdown: the job stays running and is requeued once its heartbeat goes stale.
+            status = "interrupted"
+            raise
+        except JobCancelled:
+            current = await run_in_threadpool(self.store.get, job_id)
+            if current and current["cancel_requested"] == JOB_INTERRUPTED:
+                status = "interrupted"
+                return
+            status = "cancelled"
+            await run_in_threadpool(
+                self.store.transition, job_id, ("running",), status="cancelled", finished_at=datetime.now().isoformat()
+            )
+        except Exception as e:
+            error_status, error = (e.status_code, e.detail) if isinstance(e, HTTPException) else (500, str(e))
+            print(f"Job {job_id} failed: {error}")
+            await run_in_threadpool(
+                self.store.transition, job_id, ("running",), status="failed", error=json.dumps(error),
+                error_status=error_status, finished_at=datetime.now().isoformat()
+            )
+        finally:
+            timer.finish(status)
+            if status != "interrupted":
+                _remove_file(job["input_path"])
+
+    def stats(self) -> Dict:
+        return {
+            "maxConcurrency": self.max_concurrency,
+            "maxPerModel": self.max_per_model,
+            "running": len(self._running),
+            "jobs": self.store.counts() if self._dispatcher is not None else {}
+        }
+
+
+def _write_file(path: str, content: bytes):
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+job_queue = JobQueue(
+    JobStore(JOB_STORE_DIR),
+    WorkerPool(EXECUTION_BACKEND, max_workers=JOB_MAX_CONCURRENCY, max_queue=0, retry_after=EXECUTION_RETRY_AFTER),
+    max_concurrency=JOB_MAX_CONCURRENCY,
+    max_per_model=JOB_MAX_PER_MODEL,
+    max_attempts=JOB_MAX_ATTEMPTS,
+    poll_seconds=JOB_POLL_SECONDS,
+    stale_seconds=JOB_STALE_SECONDS
+)
+
+# =============================================================================
+# STARTUP WARM-UP
+# =============================================================================
+
+WARMUP_IMPORTS = ("sklearn.naive_bayes", "sklearn.preprocessing")
+
+
+def warm_up_worker() -> float:
+    """Import the training and scoring dependencies in a worker process; returns the import time."""
+    start = time.perf_counter()
+    for module_name in WARMUP_IMPORTS:
+        lazy_import(module_name)
+    return time.perf_counter() - start
+
+
+class WarmUp:
+    """Background startup work that /api/ready reports on.
+
+    Imports the modules left out of the module import, starts process
+    workers, loads the model registry and decodes the ``model_names`` hot
+    models (``*`` for every model) into the model cache, so the first
+    requests don't pay for them. A model that fails to load is reported and
+    skipped; it is loaded again on first use.
+    """
+
+    def __init__(self, model_names: List[str], enabled: bool = True):
+        self.model_names = model_names
+        self.enabled = enabled
+        self.status = "pending" if enabled else "disabled"
+        self.stage = None
+        self.stages = {}
+        self.models = {}
+        self.started_at = None
+        self.finished_at = None
+        self._task = None
+
+    def start(self):
+        if not self.enabled:
+            return
+        self.status = "warming"
+        self.started_at = datetime.now().isoformat()
+        self._task = asyncio.get_running_loop().create_task(run_in_threadpool(self.run))
+
+    @contextmanager
+    def _stage(self, name: str):
+        self.stage = name
+        start = time.perf_counter()
+        try:
+            with timed_stage(name):
+                yield
+        finally:
+            self.stages[name] = time.perf_counter() - start
+
+    @instrumented("warm_up")
+    def run(self):
+        try:
+            with self._stage("imports"):
+                warm_up_worker()
+
+            if worker_pool.backend == "process":
+                with self._stage("workers"):
+                    futures = [worker_pool.executor.submit(warm_up_worker) for _ in range(worker_pool.max_workers)]
+                    for future in futures:
+                        future.result()
+
+            if os.getenv('DATABASE_URL'):
+                with self._stage("registry"):
+                    ensure_models_loaded()
+
+            model_names = sorted(models_metadata) if "*" in self.model_names else self.model_names
+            with self._stage("models"):
+                for model_name in model_names:
+                    start = time.perf_counter()
+                    try:
+                        get_model_artifacts(model_name, resolve_model_info(model_name))
+                        self.models[model_name] = {"status": "loaded", "seconds": time.perf_counter() - start}
+                    except Exception as e:
+                        detail = e.detail if isinstance(e, HTTPException) else str(e)
+                        print(f"Warm-up could not load model '{model_name}': {detail}")
+                        self.models[model_name] = {"status": "failed", "seconds": time.perf_counter() - start, "error": detail}
+            self.status = "ready"
+        except Exception as e:
+            print(f"Warm-up failed: {str(e)}")
+            self.status = "failed"
+            self.stages["error"] = str(e)
+            raise
+        finally:
+            self.stage = None
+            self.finished_at = datetime.now().isoformat()
+
+    async def stop(self):
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def snapshot(self) -> Dict:
+        return {
+            "status": self.status,
+            "ready": self.status in ("ready", "failed", "disabled"),
+            "stage": self.stage,
+            "stageSeconds": dict(self.stages),
+            "moduleImportSeconds": MODULE_IMPORT_SECONDS,
+            "importSeconds": dict(import_seconds),
+            "models": dict(self.models),
+            "modelsLoaded": sum(1 for model in self.models.values() if model["status"] == "loaded"),
+            "startedAt": self.started_at,
+            "finishedAt": self.finished_at
+        }
+
+
+warm_up = WarmUp([name.strip() for name in WARMUP_MODELS.split(",") if name.strip()], WARMUP_ENABLED)
+
+# =============================================================================
+# APP INITIALIZATION
+# =============================================================================
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the model event listener, job dispatcher and warm-up, and release background resources on shutdown."""
+    model_event_listener.start()
+    await job_queue.start()
+    warm_up.start()
+    yield
+    await warm_up.stop()
+    await job_queue.stop()
+    model_event_listener.stop()
+    job_queue.pool.shutdown()
+    worker_pool.shutdown()
+
+
+app = FastAPI(title="Naive Bayes Classifier API", lifespan=lifespan, default_response_class=ORJSONResponse)
+api_router = APIRouter(prefix="/api")
+
+# Middleware
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=[
+        "http://localhost",
+        "http://localhost:3000",
+        "http://127.0.0.1",
+        "http://127.0.0.1:3000"
+    ],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+
+@app.middleware("http")
+async def timing_middleware(request: Request, call_next):
+    """Time every request, publish its stages to /api/metrics and optionally send Server-Timing.
+
+    The header is added when SERVER_TIMING is enabled or the request sends
+    ``X-Server-Timing: 1``.
+    """
+    timer = StageTimer()
+    token = _current_timer.set(timer)
+    try:
+        response = await call_next(request)
+    except Exception:
+        timer.operation = getattr(request.scope.get("route"), "path", None)
+        timer.finish(500)
+        raise
+    finally:
+        _current_timer.reset(token)
+
+    timer.operation = getattr(request.scope.get("route"), "path", None)
+    timer.finish(response.status_code)
+    if SERVER_TIMING or request.headers.get("x-server-timing") == "1":
+        response.headers["Server-Timing"] = timer.server_timing()
+    return response
+
+
+@app.middleware("http")
+async def no_cache_middleware(request: Request, call_next):
+    """Add no-cache headers to responses that don't set their own caching policy."""
+    response = await call_next(request)
+    if "Cache-Control" not in response.headers:
+        response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
+        response.headers["Pragma"] = "no-cache"
+        response.headers["Expires"] = "0"
+    return response
+
+
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=RESPONSE_COMPRESSION_MIN_BYTES,
+    compresslevel=RESPONSE_GZIP_LEVEL,
+    brotli_quality=RESPONSE_BROTLI_QUALITY
+)
+
+# =============================================================================
+# API ENDPOINTS - HEALTH & UTILITIES
+# =============================================================================
+
+@app.get("/")
+async def root():
+    """Root endpoint."""
+    return {"message": "Naive Bayes Classifier API"}
+
+
+@api_router.get("/health")
+async def health_check():
+    """Health check endpoint."""
+    return HealthResponse(status="online", version="0.1.0")
+
+
+@api_router.get("/ready")
+async def readiness_check(response: Response):
+    """Readiness probe: 503 until the startup warm-up has finished, with its progress and timings.
+
+    Unlike /health, which only says the process is up, this reports which
+    warm-up stage is running, how long the module import, lazy imports and
+    each stage took, and which hot models are loaded.
+    """
+    state = warm_up.snapshot()
+    if not state["ready"]:
+        response.status_code = 503
+    return state
+
+
+@api_router.post("/initialize")
+async def initialize_models():
+    """Initialize models from database."""
+    try:
+        await run_in_threadpool(initialize_models_from_db)
+        await run_in_threadpool(publish_model_event, "reloaded")
+        return {"message": f"Initialized {len(models_metadata)} models from database"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to initialize models: {str(e)}")
+
+
+@api_router.post("/models/migrate")
+async def migrate_models():
+    """Convert legacy joblib model payloads in the database to the binary format."""
+    try:
+        result = await run_in_threadpool(migrate_model_payloads)
+        await run_in_threadpool(initialize_models_from_db)
+        await run_in_threadpool(publish_model_event, "reloaded")
+        return result
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to migrate models: {str(e)}")
+
+
+@api_router.get("/cache/stats")
+async def cache_stats():
+    """Model cache hit/miss counters and memory usage."""
+    return {
+        "models": model_cache.stats(),
+        "workers": worker_pool.stats(),
+        "predict": predict_batcher.stats(),
+        "jobs": await run_in_threadpool(job_queue.stats),
+        "events": model_event_listener.stats(),
+        "results": await run_in_threadpool(result_cache.stats)
+    }
+
+
+def process_rss_bytes() -> Optional[int]:
+    """Resident set size of this process, or None where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+@api_router.get("/models/memory")
+async def model_memory():
+    """Memory held by the models loaded in this worker process, per model and against the budget.
+
+    Vocabularies shared between models are charged to each of them, so
+    ``usedBytes`` is an upper bound; ``vocabularies.bytes`` counts them once.
+    """
+    models = []
+    for model_name, key, (encoder, label_encoder, predictor), size in model_cache.snapshot():
+        models.append({
+            "modelName": model_name,
+            "version": key[1],
+            "chargedBytes": size,
+            **model_footprint(encoder, label_encoder, predictor),
+            "tableDtype": predictor.table.dtype.name,
+            "features": predictor.n_features,
+            "categories": int(predictor.n_categories.sum()),
+            "classes": predictor.n_classes
+        })
+
+    cache = model_cache.stats()
+    return {
+        "pid": os.getpid(),
+        "budgetBytes": cache["maxBytes"],
+        "usedBytes": cache["currentBytes"],
+        "availableBytes": max(cache["maxBytes"] - cache["currentBytes"], 0),
+        "evictions": cache["evictions"],
+        "models": models,
+        "vocabularies": vocabulary_table.stats(),
+        "registryPayloadBytes": registry_payload_bytes(),
+        "processRssBytes": process_rss_bytes()
+    }
+
+
+@api_router.get("/metrics")
+async def prometheus_metrics():
+    """Request, stage, row and byte metrics in the Prometheus text format."""
+    cache = model_cache.stats()
+    results = result_cache.stats()
+    workers = worker_pool.stats()
+    body = metrics_registry.render({
+        "nb_model_cache_hits_total": cache["hits"],
+        "nb_model_cache_misses_total": cache["misses"],
+        "nb_model_cache_bytes": cache["currentBytes"],
+        "nb_result_cache_hits_total": results["hits"] + results["diskHits"],
+        "nb_result_cache_misses_total": results["misses"],
+        "nb_result_cache_bytes": results["currentBytes"],
+        "nb_worker_in_flight": workers["inFlight"],
+        "nb_worker_rejected_total": workers["rejected"]
+    })
+    return Response(content=body, media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# =============================================================================
+# API ENDPOINTS - MODEL MANAGEMENT
+# =============================================================================
+
+def fit_model_from_csv(
+    content: bytes,
+    model_name: str,
+    target_column: str,
+    id_column: Optional[str] = None,
+    feature_columns: Optional[str] = None,
+    upload_format: str = "csv",
+    validator: Optional[CrossValidator] = None
+) -> Dict:
+    """Parse a training upload, fit the model and return its model_info record.
+
+    Only the feature and target columns are read from the upload. With a
+    ``validator`` the returned accuracy and metrics are its held-out ones.
+    """
+    all_columns = upload_columns(content, upload_format)
+    
+    if target_column not in all_columns:
+        raise HTTPException(status_code=400, detail=f"Target column '{target_column}' not found in the dataset")
+    
+    if feature_columns:
+        selected_features = json.loads(feature_columns)
         
-        model_info = models_metadata[model_name]
-        
-        model_data = io.BytesIO(base64.b64decode(model_info["modelData"]))
-        encoders_data = io.BytesIO(base64.b64decode(model_info["encodersData"]))
-        label_encoder_data = io.BytesIO(base64.b64decode(model_info["labelEncoderData"]))
-        
-        model = joblib.load(model_data)
-        encoders = joblib.load(encoders_data)
-        label_encoder = joblib.load(label_encoder_data)
-        
-        content = await file.read()
-        df = pd.read_csv(io.StringIO(content.decode('utf-8')))
+        for col in selected_features:
+            if col not in all_columns:
+                raise HTTPException(status_code=400, detail=f"Feature column '{col}' not found in the dataset")
         
-        if not id_column:
-            common_id_columns = ['id', 'ID', 'Id', 'index', 'Index', 'PassengerId', 'passenger_id']
-            for col in common_id_columns:
-                if col in df.columns:
-                    id_column = col
-                    break
-                    
-        if not actual_column and model_info["targetColumn"] in df.columns:
-            actual_column = model_info["targetColumn"]
+        feature_columns = selected_features
+    else:
+        feature_columns = [col for col in all_columns if col != target_column and col != id_column]
+    
+    if not feature_columns:
+        raise HTTPException(status_code=400, detail="No feature columns found")
+    
+    with timed_stage("parse"):
+        df = read_upload(content, upload_format, usecols=feature_columns + [target_column])
+    count_processed(rows=len(df), bytes=len(content))
+    
+    if df[feature_columns + [target_column]].isna().any().any():
+        raise HTTPException(status_code=400, detail="Missing values found in feature or target columns")
+
+    y = df[target_column]
+
+    class_counts = y.value_counts()
+    min_class_count = class_counts.min()
+    
+    if min_class_count < 1:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Not enough samples for training. Minimum class count is {min_class_count}, need at least 1 sample per class."
+        )
+    
+    with timed_stage("encode"):
+        encoder = CategoricalEncoder.fit(df, feature_columns)
+        X_train_encoded, _ = encoder.transform(df)
         
-        missing_columns = []
-        for column in model_info["featureColumns"]:
-            if column not in df.columns:
-                missing_columns.append(column)
-                
-        if missing_columns:
-            raise HTTPException(
-                status_code=400, 
-                detail={
-                    "message": "Missing required feature columns in the dataset",
-                    "missing_columns": missing_columns,
-                    "required_columns": model_info["featureColumns"]
-                }
+        label_encoder = lazy_import("sklearn.preprocessing").LabelEncoder()
+        y_train_encoded = label_encoder.fit_transform(y)
+    
+    with timed_stage("fit"):
+        model = lazy_import("sklearn.naive_bayes").CategoricalNB()
+        model.fit(X_train_encoded, y_train_encoded)
+    
+    with timed_stage("predict"):
+        y_pred = CompiledCategoricalNB.from_model(model).predict(X_train_encoded)["indices"]
+    with timed_stage("metrics"):
+        metrics = (
+            ConfusionMatrixAccumulator(len(label_encoder.classes_))
+            .update(y_train_encoded, y_pred)
+            .metrics(label_encoder.classes_.tolist())
+        )
+
+    if validator is not None:
+        with timed_stage("validate"):
+            n_classes = len(label_encoder.classes_)
+            fold = validator.assign(y_train_encoded, n_classes)
+            validator.count(
+                fold, y_train_encoded, n_classes,
+                [(X_train_encoded[:, position], int(n_categories)) for position, n_categories in enumerate(encoder.n_categories)]
             )
+            validator.score(validator.predictors(model), X_train_encoded, y_train_encoded, fold)
+            metrics = validator.metrics(label_encoder.classes_.tolist(), metrics)
+    
+    with timed_stage("serialize"):
+        payloads = dump_model_payloads(model, encoder, label_encoder)
+    model_data = payloads["modelData"]
+    encoders_data = payloads["encodersData"]
+    label_encoder_data = payloads["labelEncoderData"]
+    
+    model_info = {
+        "modelName": model_name,
+        "targetColumn": target_column,
+        "featureColumns": feature_columns,
+        "id_column": id_column,
+        "classes": label_encoder.classes_.tolist(),
+        "accuracy": metrics["accuracy"],
+        "modelData": model_data,
+        "encodersData": encoders_data,
+        "labelEncoderData": label_encoder_data,
+        "metrics": metrics,
+        "version": datetime.now().isoformat()
+    }
+    
+    return model_info
+
+
+def _grow(array: np.ndarray, shape: tuple) -> np.ndarray:
+    """Zero-pad a count array up to ``shape``."""
+    if array.shape == shape:
+        return array
+    grown = np.zeros(shape, dtype=array.dtype)
+    grown[tuple(slice(0, size) for size in array.shape)] = array
+    return grown
+
+
+def _sorted_vocabulary(index: Dict, column: str):
+    """Sort a first-seen vocabulary the way OrdinalEncoder/LabelEncoder would.
+
+    Returns the sorted categories and, for each first-seen position, its
+    position in the sorted order.
+    """
+    values = list(index.keys())
+    if len({type(value) for value in values}) > 1 and not all(isinstance(value, (int, float, np.number)) for value in values):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Column '{column}' mixes value types across chunks; train it without chunked mode"
+        )
+    vocabulary = np.array(values)
+    if vocabulary.dtype.kind == 'U':
+        vocabulary = vocabulary.astype(object)
+    order = np.argsort(vocabulary, kind="stable")
+    positions = np.empty(len(order), dtype=np.int64)
+    positions[order] = np.arange(len(order))
+    return vocabulary[order], positions
+
+
+def fit_model_from_csv_chunks(
+    path: str,
+    model_name: str,
+    target_column: str,
+    id_column: Optional[str] = None,
+    feature_columns: Optional[str] = None,
+    chunk_size: int = 50000,
+    upload_format: str = "csv",
+    validator: Optional[CrossValidator] = None
+) -> Dict:
+    """Fit a model by streaming an upload in chunks and accumulating category counts.
+
+    Only the per-class, per-feature category counts are kept between chunks,
+    so peak memory depends on chunk size and vocabulary sizes, not row count.
+    The model and encoders are rebuilt from the counts and are identical to
+    the ones ``fit_model_from_csv`` produces for the same data. A second pass
+    over the file computes the training metrics, and the held-out metrics
+    when a ``validator`` is given.
+    """
+    all_columns = upload_columns(path, upload_format)
+    
+    if target_column not in all_columns:
+        raise HTTPException(status_code=400, detail=f"Target column '{target_column}' not found in the dataset")
+    
+    if feature_columns:
+        selected_features = json.loads(feature_columns)
         
-        X = df[model_info["featureColumns"]].copy()
-        X_encoded = X.copy()
-        
-        unknown_categories_found = []
-        for column in model_info["featureColumns"]:
-            encoder = encoders[column]
-            
-            training_categories = set(encoder.categories_[0])
-            data_categories = set(X[column].unique())
-            unknown_cats = data_categories - training_categories
-            
-            if unknown_cats:
-                unknown_categories_found.append({
-                    "column": column,
-                    "unknown_values": list(unknown_cats),
-                    "known_values": list(training_categories)
-                })
-            
-            try:
-                X_encoded[column] = encoder.transform(X[[column]])
-            except Exception as e:
-                raise HTTPException(
-                    status_code=400,
-                    detail={
-                        "message": f"Error encoding column '{column}': {str(e)}",
-                        "unknown_categories": unknown_categories_found
-                    }
-                )
+        for col in selected_features:
+            if col not in all_columns:
+                raise HTTPException(status_code=400, detail=f"Feature column '{col}' not found in the dataset")
         
-        if (X_encoded < 0).any().any():
-            negative_columns = [col for col in X_encoded.columns if (X_encoded[col] < 0).any()]
-            raise HTTPException(
-                status_code=400,
-                detail={
-                    "message": "Negative values detected in encoded features",
-                    "affected_columns": negative_columns,
-                    "unknown_categories": unknown_categories_found
-                }
+        feature_columns = selected_features
+    else:
+        feature_columns = [col for col in all_columns if col != target_column and col != id_column]
+    
+    if not feature_columns:
+        raise HTTPException(status_code=400, detail="No feature columns found")
+
+    usecols = list(dict.fromkeys(feature_columns + [target_column]))
+    class_index = {}
+    vocab_index = [{} for _ in feature_columns]
+    class_count = np.zeros(0, dtype=np.int64)
+    category_count = [np.zeros((0, 0), dtype=np.int64) for _ in feature_columns]
+    count_processed(bytes=os.path.getsize(path))
+
+    for chunk in timed_iter(iter_upload_chunks(path, upload_format, chunk_size, usecols), "parse"):
+        count_processed(rows=len(chunk))
+        if chunk[usecols].isna().any().any():
+            raise HTTPException(status_code=400, detail="Missing values found in feature or target columns")
+
+        with timed_stage("fit"):
+            y_codes, y_uniques = pd.factorize(chunk[target_column])
+            y_lookup = np.array([class_index.setdefault(value, len(class_index)) for value in y_uniques], dtype=np.int64)
+            y = y_lookup[y_codes]
+            n_classes = len(class_index)
+            class_count = _grow(class_count, (n_classes,)) + np.bincount(y, minlength=n_classes)
+
+            columns = []
+            for position, column in enumerate(feature_columns):
+                x_codes, x_uniques = pd.factorize(chunk[column])
+                index = vocab_index[position]
+                x_lookup = np.array([index.setdefault(value, len(index)) for value in x_uniques], dtype=np.int64)
+                x = x_lookup[x_codes]
+                n_categories = len(index)
+                counts = np.bincount(y * n_categories + x, minlength=n_classes * n_categories).reshape(n_classes, n_categories)
+                category_count[position] = _grow(category_count[position], (n_classes, n_categories)) + counts
+                columns.append((x, n_categories))
+
+        if validator is not None:
+            with timed_stage("validate"):
+                validator.count(validator.assign(y, n_classes), y, n_classes, columns)
+
+    if not class_index:
+        raise HTTPException(status_code=400, detail="Uploaded file contains no rows")
+
+    with timed_stage("fit"):
+        classes, class_positions = _sorted_vocabulary(class_index, target_column)
+        sorted_class_count = np.zeros(len(classes), dtype=np.float64)
+        sorted_class_count[class_positions] = class_count
+
+        vocabularies = []
+        sorted_category_count = []
+        sorted_positions = []
+        for position, column in enumerate(feature_columns):
+            vocabulary, category_positions = _sorted_vocabulary(vocab_index[position], column)
+            counts = np.zeros((len(classes), len(vocabulary)), dtype=np.float64)
+            counts[np.ix_(class_positions, category_positions)] = category_count[position]
+            sorted_category_count.append(counts)
+            sorted_positions.append(category_positions)
+            vocabularies.append(vocabulary)
+        encoder = CategoricalEncoder(feature_columns, vocabularies)
+
+        model = build_categorical_nb(sorted_class_count, sorted_category_count, feature_names=feature_columns)
+        label_encoder = lazy_import("sklearn.preprocessing").LabelEncoder()
+        label_encoder.classes_ = classes
+
+    predictor = CompiledCategoricalNB.from_model(model)
+    accumulator = ConfusionMatrixAccumulator(len(classes))
+    if validator is not None:
+        with timed_stage("validate"):
+            validator.reorder(class_positions, sorted_positions)
+            validator.replay()
+            fold_predictors = validator.predictors(model)
+            first_seen_class = np.argsort(class_positions)
+    for chunk in timed_iter(iter_upload_chunks(path, upload_format, chunk_size, usecols), "parse"):
+        with timed_stage("encode"):
+            codes, _ = encoder.transform(chunk)
+        with timed_stage("predict"):
+            y_pred = predictor.predict(codes)["indices"]
+        with timed_stage("metrics"):
+            y_true = accumulator.label_codes(chunk[target_column], classes)
+            accumulator.update(y_true, y_pred)
+        if validator is not None:
+            with timed_stage("validate"):
+                fold = validator.assign(first_seen_class[y_true], len(classes))
+                validator.score(fold_predictors, codes, y_true, fold)
+    with timed_stage("metrics"):
+        metrics = accumulator.metrics(classes.tolist())
+    if validator is not None:
+        with timed_stage("validate"):
+            metrics = validator.metrics(classes.tolist(), metrics)
+
+    with timed_stage("serialize"):
+        payloads = dump_model_payloads(model, encoder, label_encoder)
+    
+    return {
+        "modelName": model_name,
+        "targetColumn": target_column,
+        "featureColumns": feature_columns,
+        "id_column": id_column,
+        "classes": classes.tolist(),
+        "accuracy": metrics["accuracy"],
+        **payloads,
+        "metrics": metrics,
+        "version": datetime.now().isoformat()
+    }
+
+
+def grow_vocabulary(column: str, vocabulary: np.ndarray, values: pd.Series, category_count: np.ndarray):
+    """Add categories from ``values`` that are not in ``vocabulary``.
+
+    Returns the merged sorted vocabulary, the category count table re-laid
+    out for it, and the list of added categories. Existing counts are moved,
+    not recomputed, so the cost is proportional to the vocabulary size rather
+    than the training history.
+    """
+    batch_values = pd.unique(values)
+    added = batch_values[pd.Index(vocabulary).get_indexer(batch_values) < 0]
+    if len(added) == 0:
+        return vocabulary, category_count, []
+
+    try:
+        merged = np.unique(np.concatenate([vocabulary, np.asarray(added, dtype=vocabulary.dtype)]))
+    except (TypeError, ValueError) as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"New values in column '{column}' are not compatible with the trained categories: {e}"
+        )
+
+    grown = np.zeros((category_count.shape[0], len(merged)), dtype=np.float64)
+    grown[:, pd.Index(merged).get_indexer(vocabulary)] = category_count
+    return merged, grown, added.tolist()
+
+
+def update_model_from_csv(content: bytes, model_name: str, model_info: Dict, upload_format: str = "csv") -> Dict:
+    """Apply CategoricalNB.partial_fit to a new labelled batch and return the updated model_info.
+
+    Categories that were unseen at training time grow the per-feature
+    vocabularies and count tables; labels outside the trained classes are
+    rejected because CategoricalNB fixes its classes at the first fit.
+    """
+    model, encoder, label_encoder = load_model(model_name, model_info)
+    feature_columns = model_info["featureColumns"]
+    target_column = model_info["targetColumn"]
+
+    all_columns = upload_columns(content, upload_format)
+    missing_columns = [col for col in feature_columns + [target_column] if col not in all_columns]
+    if missing_columns:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "message": "Missing required columns in the dataset",
+                "missing_columns": missing_columns,
+                "required_columns": feature_columns + [target_column]
+            }
+        )
+    df = read_upload(content, upload_format, usecols=feature_columns + [target_column])
+    if df.empty:
+        raise HTTPException(status_code=400, detail="Uploaded file contains no rows")
+
+    y_batch = pd.Index(label_encoder.classes_).get_indexer(df[target_column])
+    if (y_batch < 0).any():
+        unknown_labels = pd.unique(df[target_column][y_batch < 0]).tolist()
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "message": "Target values not seen at training time; retrain the model to add classes",
+                "unknown_classes": unknown_labels,
+                "known_classes": label_encoder.classes_.tolist()
+            }
+        )
+
+    vocabularies = []
+    category_count = []
+    new_categories = {}
+    for index, column in enumerate(feature_columns):
+        vocabulary, counts, added = grow_vocabulary(
+            column, encoder.vocabularies[index], df[column], np.array(model.category_count_[index])
+        )
+        vocabularies.append(vocabulary)
+        category_count.append(counts)
+        if added:
+            new_categories[column] = added
+    new_encoder = CategoricalEncoder(feature_columns, vocabularies)
+
+    updated = build_categorical_nb(
+        np.array(model.class_count_),
+        category_count,
+        alpha=model.alpha,
+        fit_prior=model.fit_prior,
+        feature_names=feature_columns
+    )
+    updated.min_categories = updated.n_categories_.copy()
+
+    codes, _ = new_encoder.transform(df)
+    updated.partial_fit(pd.DataFrame(codes, columns=feature_columns), y_batch)
+
+    y_pred = CompiledCategoricalNB.from_model(updated).predict(codes)["indices"]
+    accumulator = ConfusionMatrixAccumulator(len(label_encoder.classes_))
+    accumulator.update(y_batch, y_pred)
+    metrics = accumulator.metrics(label_encoder.classes_.tolist())
+
+    payloads = dump_model_payloads(updated, new_encoder, label_encoder)
+    return {
+        **model_info,
+        **payloads,
+        "accuracy": metrics["accuracy"],
+        "metrics": metrics,
+        "version": datetime.now().isoformat(),
+        "rowsAdded": len(df),
+        "newCategories": new_categories
+    }
+
+
+@api_router.post("/train")
+async def train_model(
+    file: UploadFile = File(...),
+    model_name: str = Form(...),
+    target_column: str = Form(...),
+    id_column: Optional[str] = Form(None),
+    feature_columns: Optional[str] = Form(None),
+    chunked: bool = Form(False),
+    chunk_size: int = Form(TRAIN_CHUNK_ROWS),
+    validation: Optional[str] = Form(None),
+    folds: int = Form(5),
+    holdout_fraction: float = Form(0.2),
+    validation_seed: int = Form(0)
+):
+    """Train a new Naive Bayes model.
+
+    With ``chunked`` the upload is spooled to disk and streamed through the
+    count-accumulating trainer, so memory no longer grows with row count.
+    ``validation`` (``kfold`` or ``holdout``) reports stratified held-out
+    accuracy and metrics instead of scores on the training rows, with
+    per-fold metrics under ``metrics.validation``.
+    """
+    if chunk_size < 1:
+        raise HTTPException(status_code=400, detail="chunk_size must be a positive integer")
+    validator = CrossValidator.from_form(validation, folds, holdout_fraction, validation_seed)
+
+    upload_path = None
+    try:
+        upload_format = upload_format_of(file)
+        if chunked:
+            with timed_stage("upload"):
+                upload_path = await spool_upload(file)
+            model_info = await worker_pool.run(
+                fit_model_from_csv_chunks, upload_path, model_name, target_column, id_column, feature_columns, chunk_size,
+                upload_format, validator
+            )
+        else:
+            with timed_stage("upload"):
+                content = await file.read()
+            model_info = await worker_pool.run(
+                fit_model_from_csv, content, model_name, target_column, id_column, feature_columns, upload_format, validator
             )
         
-        y_pred_proba = model.predict_proba(X_encoded)
-        y_pred = model.predict(X_encoded)
+        models_metadata[model_name] = retain_trained_model(model_name, model_info)
+        model_cache.invalidate(model_name)
+        result_cache.invalidate(model_name)
+        await run_in_threadpool(publish_model_event, "trained", model_name, model_info["version"])
         
-        predictions = label_encoder.inverse_transform(y_pred)
+        return ModelInfo(
+            modelName=model_name,
+            targetColumn=model_info["targetColumn"],
+            featureColumns=model_info["featureColumns"],
+            classes=model_info["classes"],
+            accuracy=model_info["accuracy"],
+            modelData=model_info["modelData"],
+            encodersData=model_info["encodersData"],
+            labelEncoderData=model_info["labelEncoderData"],
+            metrics=model_info["metrics"]
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if upload_path:
+            os.remove(upload_path)
+
+
+@api_router.post("/models/{model_name}/update")
+async def update_model(model_name: str, file: UploadFile = File(...)):
+    """Incrementally train an existing model on a new labelled batch.
+
+    The updated payloads are saved as a new version of the model's database
+    row (with the batch metrics) when the model came from the database.
+    """
+    try:
+        model_info = await run_in_threadpool(resolve_model_info, model_name)
+        with timed_stage("upload"):
+            content = await file.read()
+        updated_info = await worker_pool.run(update_model_from_csv, content, model_name, model_info, upload_format_of(file))
+
+        rows_added = updated_info.pop("rowsAdded")
+        new_categories = updated_info.pop("newCategories")
+        persisted = False
+        if updated_info.get("id"):
+            version = await run_in_threadpool(save_model_version, updated_info, updated_info["metrics"])
+            if version is None:
+                raise HTTPException(status_code=404, detail=f"Model '{model_name}' not found in database")
+            updated_info["version"] = version
+            persisted = True
+
+        response = {
+            **ModelInfo(
+                modelName=model_name,
+                targetColumn=updated_info["targetColumn"],
+                featureColumns=updated_info["featureColumns"],
+                classes=updated_info["classes"],
+                accuracy=updated_info["accuracy"],
+                modelData=updated_info["modelData"],
+                encodersData=updated_info["encodersData"],
+                labelEncoderData=updated_info["labelEncoderData"],
+                metrics=updated_info["metrics"]
+            ).model_dump(),
+            "version": updated_info["version"],
+            "rowsAdded": rows_added,
+            "newCategories": new_categories,
+            "persisted": persisted
+        }
+
+        if persisted:
+            updated_info = {key: value for key, value in updated_info.items() if key not in MODEL_PAYLOAD_FIELDS}
+        else:
+            updated_info = retain_trained_model(model_name, updated_info)
+        models_metadata[model_name] = updated_info
+        model_cache.invalidate(model_name)
+        result_cache.invalidate(model_name)
+        await run_in_threadpool(publish_model_event, "updated", model_name, updated_info["version"])
+
+        return response
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in update_model endpoint: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to update model: {str(e)}")
+
+
+# =============================================================================
+# API ENDPOINTS - CLASSIFICATION
+# =============================================================================
+
+def resolve_model_info(model_name: str) -> Dict:
+    """Look up model metadata, loading just that model from the database when it is missing."""
+    ensure_models_loaded()
         
-        results = []
+    model_info = models_metadata.get(model_name)
+    if model_info is None:
+        print(f"Model '{model_name}' not found. Available models: {list(models_metadata.keys())}")
+        model_info = load_missing_model(model_name)
         
-        for i in range(len(df)):
+    if model_info is None:
+        available_models = list(models_metadata.keys())
+        raise HTTPException(
+            status_code=404, 
+            detail=f"Model '{model_name}' not found. Available models: {available_models}"
+        )
+    
+    return model_info
 
-            if id_column and id_column in df.columns:
-                id_value = str(df.iloc[i][id_column])
-            else:
-                id_value = str(i + 1)
+
+def resolve_classify_columns(
+    columns: List[str],
+    model_info: Dict,
+    id_column: Optional[str] = None,
+    actual_column: Optional[str] = None
+):
+    """Pick the id/actual columns for an upload and check the feature columns are present."""
+    if not id_column:
+        common_id_columns = ['id', 'ID', 'Id', 'index', 'Index', 'PassengerId', 'passenger_id']
+        for col in common_id_columns:
+            if col in columns:
+                id_column = col
+                break
                 
-            actual_class = str(df.iloc[i][actual_column]) if actual_column and actual_column in df.columns else None
-            predicted_class = str(predictions[i])
-            confidence = float(np.max(y_pred_proba[i]))
-            
-            row_data = df.iloc[i].to_dict()
-            
-            results.append(ClassificationResult(
-                id=id_value,
-                actualClass=actual_class,
-                predictedClass=predicted_class,
-                confidence=confidence,
-                data=json.dumps(row_data, default=str),
-                modelId=None,
-                createdAt=None
-            ))
-            
-        metrics = None
-        if actual_column and actual_column in df.columns:
-            actuals = df[actual_column].tolist()
-            valid_actuals = [a for a in actuals if a in label_encoder.classes_]
+    if not actual_column and model_info["targetColumn"] in columns:
+        actual_column = model_info["targetColumn"]
+    
+    missing_columns = []
+    for column in model_info["featureColumns"]:
+        if column not in columns:
+            missing_columns.append(column)
             
-            if len(valid_actuals) > 0:
-                y_true = label_encoder.transform(valid_actuals)
-                valid_indices = [i for i, a in enumerate(actuals) if a in label_encoder.classes_]
-                valid_preds = y_pred[valid_indices]
-                
-                unique_true_classes = np.unique(y_true)
-                unique_pred_classes = np.unique(valid_preds)
-                unique_classes = np.unique(np.concatenate([unique_true_classes, unique_pred_classes]))
-                
-                present_class_names = [label_encoder.classes_[i] for i in unique_classes]
-                
-                try:
-                    report = classification_report(
-                        y_true, 
-                        valid_preds, 
-                        labels=unique_classes,
-                        target_names=present_class_names, 
-                        output_dict=True,
-                        zero_division=0
-                    )
-                    cm = confusion_matrix(y_true, valid_preds, labels=unique_classes)
+    if missing_columns:
+        raise HTTPException(
+            status_code=400, 
+            detail={
+                "message": "Missing required feature columns in the dataset",
+                "missing_columns": missing_columns,
+                "required_columns": model_info["featureColumns"]
+            }
+        )
+    
+    return id_column, actual_column
+
+
+def classify_usecols(columns: List[str], required_columns: List[str], data_columns: List[str]) -> List[str]:
+    """Columns to read when ``data`` echoes only ``data_columns``, in upload order."""
+    missing_columns = [column for column in data_columns if column not in columns]
+    if missing_columns:
+        raise HTTPException(
+            status_code=400,
+            detail={"message": "Data columns not found in the dataset", "missing_columns": missing_columns}
+        )
+    needed = set(required_columns) | set(data_columns)
+    return [column for column in columns if column in needed]
+
+
+def parse_data_columns(include_data: bool, data_columns: Optional[str]) -> Optional[List[str]]:
+    """Map the include_data/data_columns form fields to build_classification_results' ``data_columns``."""
+    if not include_data:
+        return []
+    if not data_columns:
+        return None
+    try:
+        columns = json.loads(data_columns)
+    except json.JSONDecodeError:
+        columns = None
+    if not isinstance(columns, list) or not all(isinstance(column, str) for column in columns):
+        raise HTTPException(status_code=400, detail="data_columns must be a JSON list of column names")
+    return columns
+
+
+def classify_csv(
+    content: bytes,
+    model_name: str,
+    model_info: Dict,
+    id_column: Optional[str] = None,
+    actual_column: Optional[str] = None,
+    persist: bool = False,
+    file_name: str = "",
+    upload_format: str = "csv",
+    data_columns: Optional[List[str]] = None,
+    result_format: str = "json"
+) -> bytes:
+    """Parse and classify an upload, returning the serialized ClassificationResponse.
+
+    ``result_format`` selects a JSON, CSV or Arrow IPC body. When
+    ``data_columns`` limits the echoed row data, only those columns plus the
+    feature, id and actual columns are read from the upload. With ``persist``
+    the results are written to the database instead and only the persisted
+    summary is returned.
+    """
+    encoder, label_encoder, predictor = get_model_artifacts(model_name, model_info)
+    
+    usecols = None
+    if data_columns is not None:
+        all_columns = upload_columns(content, upload_format)
+        id_column, actual_column = resolve_classify_columns(all_columns, model_info, id_column, actual_column)
+        usecols = classify_usecols(all_columns, model_info["featureColumns"] + [id_column, actual_column], data_columns)
+    with timed_stage("parse"):
+        df = read_upload(content, upload_format, usecols)
+    count_processed(rows=len(df), bytes=len(content))
+    
+    id_column, actual_column = resolve_classify_columns(df.columns, model_info, id_column, actual_column)
+    with timed_stage("encode"):
+        codes, unknown_categories = encoder.transform(df)
+    for report in unknown_categories:
+        print(f"Unknown categories in column '{report['column']}' for model '{model_name}': {len(report['unknown_values'])}")
+    
+    with timed_stage("predict"):
+        prediction = predictor.predict(codes)
+        y_pred = prediction["indices"]
+        confidences = prediction["confidence"]
         
-                except Exception as e:
-                    print(f"Error generating classification report: {str(e)}")
-                    report = classification_report(
-                        y_true, 
-                        valid_preds, 
-                        output_dict=True,
-                        zero_division=0
-                    )
-                    cm = confusion_matrix(y_true, valid_preds)
-                
+        predictions = label_encoder.inverse_transform(y_pred)
+    
+    with timed_stage("results"):
+        results = build_classification_results(
+            df,
+            predictions,
+            confidences,
+            id_column=id_column,
+            actual_column=actual_column,
+            data_columns=data_columns
+        )
+        
+    metrics = None
+    if actual_column and actual_column in df.columns:
+        with timed_stage("metrics"):
+            accumulator = ConfusionMatrixAccumulator(len(label_encoder.classes_))
+            accumulator.update_labels(df[actual_column], y_pred, label_encoder.classes_)
+            if accumulator.total:
                 metrics = {
                     "id": None,
                     "modelId": model_info.get('id'),
-                    "accuracy": float(accuracy_score(y_true, valid_preds)),
-                    "precision": float(precision_score(y_true, valid_preds, average='weighted', zero_division=0)),
-                    "recall": float(recall_score(y_true, valid_preds, average='weighted', zero_division=0)),
-                    "f1Score": float(f1_score(y_true, valid_preds, average='weighted', zero_division=0)),
-                    "classMetrics": report,
-                    "confusionMatrix": cm.tolist(),
+                    **accumulator.metrics(label_encoder.classes_.tolist()),
                     "createdAt": datetime.now().isoformat()
                 }
+    
+    if persist:
+        with timed_stage("persist"):
+            summary = persist_classification(results, metrics, model_name, model_info, file_name)
+        return dumps_json({**summary, "unknownCategories": unknown_categories})
+    with timed_stage("serialize"):
+        return RESULT_SERIALIZERS[result_format](results, metrics, unknown_categories)
+
+
+@api_router.post("/classify")
+async def classify_data(
+    request: Request,
+    file: UploadFile = File(...),
+    model_name: str = Form(...),
+    id_column: Optional[str] = Form(None),
+    actual_column: Optional[str] = Form(None),
+    persist: bool = Form(False),
+    include_data: bool = Form(True),
+    data_columns: Optional[str] = Form(None)
+):
+    """Classify data using a trained model.
+
+    The Accept header selects a JSON (default), ``text/csv`` or Arrow IPC
+    stream body. ``include_data=false`` leaves out the echoed row ``data``
+    and ``data_columns`` (a JSON list) echoes only those columns. With
+    ``persist`` the results are copied into the classifications table and
+    only a summary with the classification_history id is returned.
+
+    Feature values the model never saw contribute nothing to the scores and
+    are listed per column under ``unknownCategories`` (in the CSV summary
+    line and Arrow metadata for those formats).
+
+    Results that are not persisted are cached by upload content, model
+    version and options; the X-Result-Cache header says whether one was hit.
+    """
+    try:
+        result_format = "json" if persist else negotiate_result_format(request.headers.get("accept"))
+        echoed_columns = parse_data_columns(include_data, data_columns)
+        model_info = await run_in_threadpool(resolve_model_info, model_name)
+        upload_format = upload_format_of(file)
+        with timed_stage("upload"):
+            content = await file.read()
+
+        cache_key = None
+        if not persist and result_cache.enabled:
+            with timed_stage("result_cache"):
+                cache_key = await run_in_threadpool(result_cache.key, content, model_name, model_info, {
+                    "idColumn": id_column,
+                    "actualColumn": actual_column,
+                    "uploadFormat": upload_format,
+                    "dataColumns": echoed_columns,
+                    "resultFormat": result_format
+                })
+                body = await run_in_threadpool(result_cache.get, model_name, cache_key)
+            if body is not None:
+                return Response(
+                    content=body, media_type=RESULT_MEDIA_TYPES[result_format], headers={"X-Result-Cache": "hit"}
+                )
+
+        body = await worker_pool.run(
+            classify_csv, content, model_name, model_info, id_column, actual_column, persist, file.filename or "",
+            upload_format, echoed_columns, result_format
+        )
+        headers = {}
+        if cache_key is not None:
+            await run_in_threadpool(result_cache.put, model_name, cache_key, body)
+            headers["X-Result-Cache"] = "miss"
+        return Response(content=body, media_type=RESULT_MEDIA_TYPES[result_format], headers=headers)
         
-        return ClassificationResponse(
-            results=results,
-            metrics=metrics
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Classification error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def classify_multi(
+    content: bytes,
+    model_names: List[str],
+    model_infos: List[Dict],
+    id_column: Optional[str] = None,
+    actual_column: Optional[str] = None,
+    upload_format: str = "csv",
+    data_columns: Optional[List[str]] = None
+) -> bytes:
+    """Classify one upload with several models, parsing it once.
+
+    Feature columns are encoded once per distinct column vocabulary and the
+    codes are shared by every model that has that vocabulary. The models are
+    then scored in parallel threads. Each model gets its own actual column,
+    defaulting to its target column, and its own metrics.
+    """
+    artifacts = [get_model_artifacts(name, info) for name, info in zip(model_names, model_infos)]
+
+    all_columns = upload_columns(content, upload_format)
+    resolved = [resolve_classify_columns(all_columns, info, id_column, actual_column) for info in model_infos]
+    usecols = None
+    if data_columns is not None:
+        required_columns = [
+            column
+            for info, columns in zip(model_infos, resolved)
+            for column in info["featureColumns"] + list(columns)
+        ]
+        usecols = classify_usecols(all_columns, required_columns, data_columns)
+    with timed_stage("parse"):
+        df = read_upload(content, upload_format, usecols)
+    count_processed(rows=len(df), bytes=len(content))
+
+    with timed_stage("encode"):
+        cache = {}
+        encoded = [encoder.transform(df, cache) for encoder, _, _ in artifacts]
+    for model_name, (_, unknown_categories) in zip(model_names, encoded):
+        for report in unknown_categories:
+            print(f"Unknown categories in column '{report['column']}' for model '{model_name}': {len(report['unknown_values'])}")
+
+    def score(position: int):
+        _, label_encoder, predictor = artifacts[position]
+        model_id_column, model_actual_column = resolved[position]
+        prediction = predictor.predict(encoded[position][0])
+        results = build_classification_results(
+            df,
+            label_encoder.classes_[prediction["indices"]],
+            prediction["confidence"],
+            id_column=model_id_column,
+            actual_column=model_actual_column,
+            data_columns=[]
+        )
+        metrics = None
+        if model_actual_column and model_actual_column in df.columns:
+            accumulator = ConfusionMatrixAccumulator(len(label_encoder.classes_))
+            accumulator.update_labels(df[model_actual_column], prediction["indices"], label_encoder.classes_)
+            if accumulator.total:
+                metrics = {
+                    "id": None,
+                    "modelId": model_infos[position].get('id'),
+                    **accumulator.metrics(label_encoder.classes_.tolist()),
+                    "createdAt": datetime.now().isoformat()
+                }
+        return results, metrics, encoded[position][1]
+
+    with timed_stage("predict"):
+        with ThreadPoolExecutor(max_workers=max(1, min(len(artifacts), MULTI_CLASSIFY_THREADS))) as executor:
+            scored = list(executor.map(score, range(len(artifacts))))
+
+    with timed_stage("serialize"):
+        return serialize_multi_classification(model_names, scored, row_data_payloads(df, data_columns))
+
+
+def parse_model_names(model_names: str) -> List[str]:
+    """Parse the model_names form field (a JSON list) into distinct names in request order."""
+    try:
+        names = json.loads(model_names)
+    except json.JSONDecodeError:
+        names = None
+    if not isinstance(names, list) or not names or not all(isinstance(name, str) for name in names):
+        raise HTTPException(status_code=400, detail="model_names must be a non-empty JSON list of model names")
+    names = list(dict.fromkeys(names))
+    if len(names) > MULTI_CLASSIFY_MAX_MODELS:
+        raise HTTPException(status_code=400, detail=f"At most {MULTI_CLASSIFY_MAX_MODELS} models can be scored per request")
+    return names
+
+
+@api_router.post("/classify/multi")
+async def classify_data_multi(
+    file: UploadFile = File(...),
+    model_names: str = Form(...),
+    id_column: Optional[str] = Form(None),
+    actual_column: Optional[str] = Form(None),
+    include_data: bool = Form(True),
+    data_columns: Optional[str] = Form(None)
+):
+    """Classify one upload with several models (``model_names`` is a JSON list) and compare them.
+
+    The upload is parsed once and shared feature encodings are reused. The
+    response carries the row ``ids`` and echoed ``data`` once, and under
+    ``models`` every model's prediction arrays (aligned with ``ids``),
+    metrics and unknown categories side by side.
+    """
+    try:
+        names = parse_model_names(model_names)
+        echoed_columns = parse_data_columns(include_data, data_columns)
+        model_infos = [await run_in_threadpool(resolve_model_info, name) for name in names]
+        with timed_stage("upload"):
+            content = await file.read()
+        body = await worker_pool.run(
+            classify_multi, content, names, model_infos, id_column, actual_column, upload_format_of(file), echoed_columns
         )
+        return Response(content=body, media_type="application/json")
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Classification error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@api_router.post("/classify/stream")
+async def classify_data_stream(
+    file: UploadFile = File(...),
+    model_name: str = Form(...),
+    id_column: Optional[str] = Form(None),
+    actual_column: Optional[str] = Form(None),
+    output_format: str = Form("ndjson"),
+    chunk_size: int = Form(CLASSIFY_CHUNK_ROWS),
+    include_data: bool = Form(True),
+    data_columns: Optional[str] = Form(None)
+):
+    """Classify an upload chunk by chunk and stream results as NDJSON or CSV.
+
+    Each NDJSON line is one result in the ClassificationResult shape and the
+    last line is a ``{"type": "summary", ...}`` record carrying the metrics
+    and ``unknownCategories`` accumulated over all chunks. CSV output streams
+    result rows with a header and ends with the same summary as a
+    ``#``-prefixed comment line.
+    ``include_data`` and ``data_columns`` trim the echoed row data as in /classify.
+    """
+    if output_format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="output_format must be 'ndjson' or 'csv'")
+    if chunk_size < 1:
+        raise HTTPException(status_code=400, detail="chunk_size must be a positive integer")
+
+    try:
+        echoed_columns = parse_data_columns(include_data, data_columns)
+        model_info = await run_in_threadpool(resolve_model_info, model_name)
+        encoder, label_encoder, predictor = await run_in_threadpool(get_model_artifacts, model_name, model_info)
+
+        upload_format = upload_format_of(file)
+        usecols = None
+        if echoed_columns is not None:
+            all_columns = await run_in_threadpool(upload_columns, file.file, upload_format)
+            id_column, actual_column = resolve_classify_columns(all_columns, model_info, id_column, actual_column)
+            usecols = classify_usecols(
+                all_columns, model_info["featureColumns"] + [id_column, actual_column], echoed_columns
+            )
+        reader = iter_upload_chunks(file.file, upload_format, chunk_size, usecols)
+        first_chunk = await run_in_threadpool(next, reader, None)
+        if first_chunk is None:
+            raise HTTPException(status_code=400, detail="Uploaded file contains no rows")
+
+        id_column, actual_column = resolve_classify_columns(first_chunk.columns, model_info, id_column, actual_column)
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Classification error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+    def generate():
+        accumulator = ConfusionMatrixAccumulator(len(label_encoder.classes_))
+        unknown_categories = {}
+        total_records = 0
+        try:
+            for chunk in itertools.chain([first_chunk], reader):
+                codes, reports = encoder.transform(chunk)
+                for report in reports:
+                    merged = unknown_categories.setdefault(report["column"], {**report, "unknown_values": []})
+                    merged["unknown_values"] = list(dict.fromkeys(merged["unknown_values"] + report["unknown_values"]))
+                prediction = predictor.predict(codes)
+                predictions = label_encoder.classes_[prediction["indices"]]
+
+                results = build_classification_results(
+                    chunk,
+                    predictions,
+                    prediction["confidence"],
+                    id_column=id_column,
+                    actual_column=actual_column,
+                    row_offset=total_records,
+                    data_columns=echoed_columns
+                )
+                if actual_column and actual_column in chunk.columns:
+                    accumulator.update_labels(chunk[actual_column], prediction["indices"], label_encoder.classes_)
+                
+                if output_format == "csv":
+                    yield results.to_csv(index=False, header=total_records == 0)
+                else:
+                    yield "".join(line + "\n" for line in json_records(results))
+                total_records += len(chunk)
+
+            summary = {
+                "type": "summary",
+                "totalRecords": total_records,
+                "metrics": None,
+                "unknownCategories": list(unknown_categories.values())
+            }
+            if accumulator.total:
+                summary["metrics"] = {
+                    "id": None,
+                    "modelId": model_info.get('id'),
+                    **accumulator.metrics(label_encoder.classes_.tolist()),
+                    "createdAt": datetime.now().isoformat()
+                }
+        except HTTPException as e:
+            summary = {"type": "error", "status": e.status_code, "detail": e.detail, "totalRecords": total_records}
+        except Exception as e:
+            print(f"Classification error: {str(e)}")
+            summary = {"type": "error", "status": 500, "detail": str(e), "totalRecords": total_records}
+
+        line = json.dumps(summary, default=str) + "\n"
+        yield "# " + line if output_format == "csv" else line
+
+    media_type = "text/csv" if output_format == "csv" else "application/x-ndjson"
+    return StreamingResponse(generate(), media_type=media_type)
+
+
+@api_router.post("/predict")
+async def predict_records(request: PredictRequest):
+    """Classify one record or a small list of records sent as JSON.
+
+    Concurrent calls for the same model are scored together in micro-batches.
+    """
+    try:
+        records = request.records if isinstance(request.records, list) else [request.records]
+        if not records:
+            raise HTTPException(status_code=400, detail="No records to classify")
+        if len(records) > PREDICT_MAX_RECORDS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"At most {PREDICT_MAX_RECORDS} records per request, use /api/classify for larger batches"
+            )
+        if request.topK is not None and request.topK < 1:
+            raise HTTPException(status_code=400, detail="topK must be a positive integer")
+
+        model_info = models_metadata.get(request.modelName)
+        if model_info is None:
+            model_info = await run_in_threadpool(resolve_model_info, request.modelName)
+
+        feature_columns = model_info["featureColumns"]
+        for position, record in enumerate(records):
+            missing = [column for column in feature_columns if column not in record]
+            if missing:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Record {position} is missing feature columns: {missing}"
+                )
+
+        predictions = await predict_batcher.predict(
+            request.modelName, model_info, records, request.probabilities, request.topK
+        )
+        return {"modelName": request.modelName, "predictions": predictions}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Prediction error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def model_blobs(models: Dict[str, Dict]) -> Dict[str, Dict]:
+    """Serialized payload fields per model name, from the local store or else one database query."""
+    local = {name: local_model_payloads(name, model_info) for name, model_info in models.items()}
+    blobs = fetch_model_blobs([
+        model_info["id"] for name, model_info in models.items()
+        if local[name] is None and model_info.get("id")
+    ])
+    payloads = {}
+    for name, model_info in models.items():
+        source = local[name] if local[name] is not None else blobs.get(model_info.get("id"), {})
+        payloads[name] = {key: source.get(key) for key in MODEL_BLOB_FIELDS}
+    return payloads
+
 
 @api_router.get("/models")
-async def list_models():
-    """List all available models."""
-    if not models_metadata:
-        print("Models metadata is empty, initializing from database...")
-        initialize_models_from_db()
-    
-    return {
-        "models": list(models_metadata.values()),
+async def list_models(
+    request: Request,
+    include_blobs: bool = False,
+    limit: Optional[int] = None,
+    offset: int = 0
+):
+    """List available models.
+
+    Serialized model payloads are left out unless ``include_blobs`` is set,
+    ``limit``/``offset`` page through the models in name order, and the
+    response carries an ETag so unchanged listings revalidate with a 304.
+    """
+    if offset < 0 or (limit is not None and limit < 0):
+        raise HTTPException(status_code=400, detail="limit and offset must be non-negative")
+    try:
+        await run_in_threadpool(ensure_models_loaded)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to load models: {str(e)}")
+
+    model_names = sorted(models_metadata.keys())
+    page_names = model_names[offset:offset + limit if limit is not None else None]
+    page = [
+        {key: value for key, value in models_metadata[name].items() if key not in MODEL_PAYLOAD_FIELDS}
+        for name in page_names
+    ]
+
+    if include_blobs:
+        payloads = await run_in_threadpool(model_blobs, {name: models_metadata[name] for name in page_names})
+        for name, model in zip(page_names, page):
+            model.update(payloads[name])
+
+    body = dumps_json({
+        "models": page,
         "count": len(models_metadata),
-        "model_names": list(models_metadata.keys())
-    }
+        "model_names": model_names,
+        "offset": offset,
+        "limit": limit
+    })
+
+    etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 def delete_model_from_database(model_name: str):
     """Delete model and related data from database."""
-    database_url = os.getenv('DATABASE_URL')
-    if not database_url:
-        raise Exception("DATABASE_URL environment variable not found")
-        
     try:
-        conn = psycopg2.connect(database_url)
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        
-        cursor.execute("""
-            SELECT id FROM naive_bayes_app.models 
-            WHERE model_name = %s
-        """, (model_name,))
-        
-        model = cursor.fetchone()
-        if not model:
-            cursor.close()
-            conn.close()
-            return False
-            
-        model_id = model['id']
-        
-        cursor.execute("DELETE FROM naive_bayes_app.classifications WHERE model_id = %s", (model_id,))
-        cursor.execute("DELETE FROM naive_bayes_app.model_metrics WHERE model_id = %s", (model_id,))
-        
-        cursor.execute("DELETE FROM naive_bayes_app.models WHERE id = %s", (model_id,))
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
+        with db_connection() as conn:
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+                cursor.execute("""
+                    SELECT id FROM naive_bayes_app.models 
+                    WHERE model_name = %s
+                """, (model_name,))
+                
+                model = cursor.fetchone()
+                if not model:
+                    return False
+                    
+                model_id = model['id']
+                
+                cursor.execute("DELETE FROM naive_bayes_app.classifications WHERE model_id = %s", (model_id,))
+                cursor.execute("DELETE FROM naive_bayes_app.model_metrics WHERE model_id = %s", (model_id,))
+                
+                cursor.execute("DELETE FROM naive_bayes_app.models WHERE id = %s", (model_id,))
         
         return True
         
     except psycopg2.Error as e:
         print(f"Database error deleting model: {str(e)}")
-        if conn:
-            conn.rollback()
-            cursor.close()
-            conn.close()
         raise Exception(f"Database error: {str(e)}")
     except Exception as e:
         print(f"Error deleting model from database: {str(e)}")
-        if conn:
-            conn.rollback()
-            cursor.close()
-            conn.close()
         raise
 
 @api_router.delete("/models/{model_name}")
 async def delete_model(model_name: str):
-    """Delete a specific model from both memory and database."""
+    """Delete a specific model from the database, then from memory.
+
+    The model is only dropped from this worker and announced to the others
+    once its database row is actually gone.
+    """
     try:
-        if model_name in models_metadata:
-            del models_metadata[model_name]
-        
-        deleted = delete_model_from_database(model_name)
-        
+        deleted = await run_in_threadpool(delete_model_from_database, model_name)
         if not deleted:
             raise HTTPException(status_code=404, detail=f"Model '{model_name}' not found in database")
-        
+
+        models_metadata.pop(model_name, None)
+        model_cache.invalidate(model_name)
+        result_cache.invalidate(model_name)
+        await run_in_threadpool(publish_model_event, "deleted", model_name)
+
         return {"message": f"Model '{model_name}' deleted successfully"}
         
     except HTTPException:
@@ -638,8 +4877,142 @@ async def delete_model(model_name: str):
         print(f"Error in delete_model endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to delete model: {str(e)}")
 
+# =============================================================================
+# API ENDPOINTS - JOBS
+# =============================================================================
+
+async def get_job_or_404(job_id: str) -> Dict:
+    job = await run_in_threadpool(job_queue.store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return job
+
+
+@api_router.post("/jobs/train", status_code=202)
+async def submit_train_job(
+    file: UploadFile = File(...),
+    model_name: str = Form(...),
+    target_column: str = Form(...),
+    id_column: Optional[str] = Form(None),
+    feature_columns: Optional[str] = Form(None),
+    chunked: bool = Form(True),
+    chunk_size: int = Form(TRAIN_CHUNK_ROWS),
+    validation: Optional[str] = Form(None),
+    folds: int = Form(5),
+    holdout_fraction: float = Form(0.2),
+    validation_seed: int = Form(0)
+):
+    """Queue a training job; takes the /train fields and returns the job to poll.
+
+    Jobs train chunked by default. The model is stored and served exactly as
+    with /train once the job succeeds.
+    """
+    if chunk_size < 1:
+        raise HTTPException(status_code=400, detail="chunk_size must be a positive integer")
+    CrossValidator.from_form(validation, folds, holdout_fraction, validation_seed)
+
+    try:
+        params = {
+            "modelName": model_name,
+            "targetColumn": target_column,
+            "idColumn": id_column,
+            "featureColumns": feature_columns,
+            "chunked": chunked,
+            "chunkSize": chunk_size,
+            "uploadFormat": upload_format_of(file),
+            "validation": [validation, folds, holdout_fraction, validation_seed]
+        }
+        job = await job_queue.submit("train", model_name, params, file)
+        return job_payload(job)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@api_router.post("/jobs/classify", status_code=202)
+async def submit_classify_job(
+    request: Request,
+    file: UploadFile = File(...),
+    model_name: str = Form(...),
+    id_column: Optional[str] = Form(None),
+    actual_column: Optional[str] = Form(None),
+    persist: bool = Form(False),
+    include_data: bool = Form(True),
+    data_columns: Optional[str] = Form(None)
+):
+    """Queue a classification job; takes the /classify fields and Accept header and returns the job to poll."""
+    try:
+        result_format = "json" if persist else negotiate_result_format(request.headers.get("accept"))
+        await run_in_threadpool(resolve_model_info, model_name)
+        params = {
+            "modelName": model_name,
+            "idColumn": id_column,
+            "actualColumn": actual_column,
+            "persist": persist,
+            "fileName": file.filename or "",
+            "uploadFormat": upload_format_of(file),
+            "dataColumns": parse_data_columns(include_data, data_columns),
+            "resultFormat": result_format
+        }
+        job = await job_queue.submit("classify", model_name, params, file)
+        return job_payload(job)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Classification job error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@api_router.get("/jobs")
+async def list_jobs(status: Optional[str] = None, model_name: Optional[str] = None, limit: int = 100):
+    """List jobs, newest first, optionally filtered by status and model."""
+    if status is not None and status not in JOB_STATUSES:
+        raise HTTPException(status_code=400, detail=f"status must be one of {list(JOB_STATUSES)}")
+    jobs = await run_in_threadpool(job_queue.store.list, status, model_name, limit)
+    return {"jobs": [job_payload(job) for job in jobs]}
+
+
+@api_router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status and progress of a job: its current stage and the rows processed so far."""
+    return job_payload(await get_job_or_404(job_id))
+
+
+@api_router.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """The response body /train or /classify would have returned, once the job has succeeded."""
+    job = await get_job_or_404(job_id)
+    if job["status"] == "failed":
+        raise HTTPException(status_code=job["error_status"] or 500, detail=job_payload(job)["error"])
+    if job["status"] != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job '{job_id}' is {job['status']}")
+    if not job["result_path"] or not os.path.exists(job["result_path"]):
+        raise HTTPException(status_code=410, detail=f"Result of job '{job_id}' is no longer available")
+    return FileResponse(job["result_path"], media_type=job["result_media_type"])
+
+
+@api_router.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job, or delete a finished job and its result.
+
+    Running jobs stop at their next stage or chunk boundary, so their status
+    may stay ``running`` briefly after this returns.
+    """
+    job = await get_job_or_404(job_id)
+    if job["status"] in JOB_FINISHED_STATUSES:
+        await run_in_threadpool(job_queue.store.delete, job_id)
+        _remove_file(job["result_path"])
+        _remove_file(job["input_path"])
+        return {"message": f"Job '{job_id}' deleted successfully"}
+    return job_payload(await job_queue.cancel(job_id))
+
 # =============================================================================
 # APP SETUP
 # =============================================================================
 
-app.include_router(api_router)
\ No newline at end of file
+app.include_router(api_router)
+
+MODULE_IMPORT_SECONDS = time.perf_counter() - _import_started
\ No newline at end of file
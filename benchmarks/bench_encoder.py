@@ -0,0 +1,88 @@
+"""Compare per-column OrdinalEncoder encoding with the vectorized CategoricalEncoder.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_encoder --rows 200000 --columns 60 --cardinality 5000
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import OrdinalEncoder
+
+from api.main import CategoricalEncoder
+from benchmarks.harness import best_of
+
+
+def make_frame(rows: int, columns: int, cardinality: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    data = {}
+    for index in range(columns):
+        if index % 2:
+            data[f"f{index}"] = rng.integers(0, cardinality, size=rows)
+        else:
+            vocabulary = np.array([f"v{index}_{value}" for value in range(cardinality)], dtype=object)
+            data[f"f{index}"] = vocabulary[rng.integers(0, cardinality, size=rows)]
+    return pd.DataFrame(data)
+
+
+def ordinal_encoders_fit(df: pd.DataFrame, columns):
+    """The per-column loop /api/train used before CategoricalEncoder."""
+    encoders = {}
+    X_encoded = df[columns].copy()
+    for column in columns:
+        unique_categories = len(df[column].unique())
+        encoder = OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=unique_categories)
+        X_encoded[column] = encoder.fit_transform(df[[column]])
+        encoders[column] = encoder
+    return encoders, X_encoded.to_numpy(dtype=np.int64)
+
+
+def ordinal_encoders_transform(df: pd.DataFrame, columns, encoders):
+    """The per-column loop /api/classify used before CategoricalEncoder."""
+    X_encoded = df[columns].copy()
+    unknown_categories = []
+    for column in columns:
+        encoder = encoders[column]
+        unknown = set(df[column].unique()) - set(encoder.categories_[0])
+        if unknown:
+            unknown_categories.append({"column": column, "unknown_values": list(unknown)})
+        X_encoded[column] = encoder.transform(df[[column]])
+    return X_encoded.to_numpy(dtype=np.int64), unknown_categories
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--columns", type=int, default=60)
+    parser.add_argument("--cardinality", type=int, default=5_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    train = make_frame(args.rows, args.columns, args.cardinality, seed=0)
+    test = make_frame(args.rows, args.columns, int(args.cardinality * 1.05), seed=1)
+    columns = list(train.columns)
+
+    legacy_fit_time, (encoders, legacy_train_codes) = best_of(args.repeat, lambda: ordinal_encoders_fit(train, columns))
+
+    def encoder_fit():
+        encoder = CategoricalEncoder.fit(train, columns)
+        return encoder, encoder.transform(train)[0]
+
+    fit_time, (encoder, train_codes) = best_of(args.repeat, encoder_fit)
+    assert np.array_equal(legacy_train_codes, train_codes), "fit codes differ from OrdinalEncoder"
+
+    legacy_time, (legacy_codes, _) = best_of(args.repeat, lambda: ordinal_encoders_transform(test, columns, encoders))
+    transform_time, (codes, unknown_categories) = best_of(args.repeat, lambda: encoder.transform(test))
+    assert np.array_equal(legacy_codes, codes), "transform codes differ from OrdinalEncoder"
+
+    print(f"rows={args.rows} columns={args.columns} cardinality={args.cardinality} code dtype={codes.dtype}")
+    print(f"unknown categories found in {len(unknown_categories)} columns")
+    print(f"fit + encode    OrdinalEncoder loop: {legacy_fit_time:8.3f}s  CategoricalEncoder: {fit_time:8.3f}s")
+    print(f"transform       OrdinalEncoder loop: {legacy_time:8.3f}s  CategoricalEncoder: {transform_time:8.3f}s")
+    print(f"transform speedup: {legacy_time / transform_time:.1f}x")
+    print(f"code matrix: {legacy_codes.nbytes / 2**20:.1f} MiB -> {codes.nbytes / 2**20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Compare CategoricalNB predict + predict_proba with the compiled inference engine.
+
+The float64 table must match sklearn exactly; the default MODEL_TABLE_DTYPE
+table is timed too and its largest confidence error printed. Run from the
+repository root:
+
+    python -m benchmarks.bench_inference --rows 1000000
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+from sklearn.naive_bayes import CategoricalNB
+
+from api.main import MODEL_TABLE_DTYPE, CompiledCategoricalNB
+from benchmarks.datasets import make_codes
+from benchmarks.harness import best_of
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--features", type=int, default=10)
+    parser.add_argument("--cardinality", type=int, default=8)
+    parser.add_argument("--classes", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    X, y = make_codes(args.rows, args.features, args.cardinality, args.classes)
+    columns = [f"f{i}" for i in range(args.features)]
+    X_frame = pd.DataFrame(X, columns=columns).astype(np.float64)
+
+    model = CategoricalNB().fit(X_frame, y)
+    exact_predictor = CompiledCategoricalNB.from_model(model, dtype=np.float64)
+    predictor = CompiledCategoricalNB.from_model(model)
+
+    def sklearn_path():
+        proba = model.predict_proba(X_frame)
+        pred = model.predict(X_frame)
+        return pred, proba.max(axis=1)
+
+    codes = X_frame.to_numpy(dtype=np.int64)
+
+    def compiled_path(compiled: CompiledCategoricalNB):
+        prediction = compiled.predict(codes)
+        return prediction["indices"], prediction["confidence"]
+
+    sklearn_time, (sk_pred, sk_conf) = best_of(args.repeat, sklearn_path)
+    exact_time, (exact_pred, exact_conf) = best_of(args.repeat, lambda: compiled_path(exact_predictor))
+    compiled_time, (nb_pred, nb_conf) = best_of(args.repeat, lambda: compiled_path(predictor))
+
+    assert np.array_equal(sk_pred, exact_pred), "predictions differ from CategoricalNB"
+    assert np.allclose(sk_conf, exact_conf, rtol=1e-12, atol=1e-12), "confidences differ from CategoricalNB"
+    assert np.allclose(sk_conf, nb_conf, rtol=1e-5, atol=1e-6), f"{MODEL_TABLE_DTYPE} confidences differ from CategoricalNB"
+
+    print(f"rows={args.rows} features={args.features} cardinality={args.cardinality} classes={args.classes}")
+    print(f"sklearn predict + predict_proba: {sklearn_time:8.3f}s ({args.rows / sklearn_time:,.0f} rows/s)")
+    print(f"compiled predict (float64):     {exact_time:8.3f}s ({args.rows / exact_time:,.0f} rows/s)")
+    print(f"compiled predict ({MODEL_TABLE_DTYPE}):     {compiled_time:8.3f}s ({args.rows / compiled_time:,.0f} rows/s)")
+    print(f"{MODEL_TABLE_DTYPE} max confidence error: {np.abs(sk_conf - nb_conf).max():.2e}, "
+          f"differing predictions: {int((sk_pred != nb_pred).sum())}")
+    print(f"speedup: {sklearn_time / compiled_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
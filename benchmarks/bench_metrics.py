@@ -0,0 +1,70 @@
+"""Compare the separate sklearn metric calls with the single confusion-matrix metrics engine.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_metrics --rows 1000000 --classes 5
+"""
+import argparse
+
+import numpy as np
+from sklearn.metrics import (
+    accuracy_score,
+    classification_report,
+    confusion_matrix,
+    f1_score,
+    precision_score,
+    recall_score,
+)
+
+from api.main import ConfusionMatrixAccumulator
+from benchmarks.harness import best_of
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--classes", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    classes = np.array([f"class_{index}" for index in range(args.classes)], dtype=object)
+    y_true = rng.integers(0, args.classes, size=args.rows)
+    y_pred = np.where(rng.random(args.rows) < 0.7, y_true, rng.integers(0, args.classes, size=args.rows))
+    actuals = classes[y_true].tolist()
+
+    def sklearn_path():
+        # The filtering and six metric calls /api/classify made before the metrics engine.
+        valid_actuals = [a for a in actuals if a in classes]
+        valid_indices = [i for i, a in enumerate(actuals) if a in classes]
+        codes = np.searchsorted(classes, valid_actuals)
+        preds = y_pred[valid_indices]
+        labels = np.unique(np.concatenate([np.unique(codes), np.unique(preds)]))
+        return {
+            "accuracy": accuracy_score(codes, preds),
+            "precision": precision_score(codes, preds, average='weighted', zero_division=0),
+            "recall": recall_score(codes, preds, average='weighted', zero_division=0),
+            "f1Score": f1_score(codes, preds, average='weighted', zero_division=0),
+            "classMetrics": classification_report(
+                codes, preds, labels=labels, target_names=classes[labels].tolist(), output_dict=True, zero_division=0
+            ),
+            "confusionMatrix": confusion_matrix(codes, preds, labels=labels).tolist()
+        }
+
+    def engine_path():
+        accumulator = ConfusionMatrixAccumulator(args.classes)
+        accumulator.update_labels(actuals, y_pred, classes)
+        return accumulator.metrics(classes.tolist())
+
+    sklearn_time, expected = best_of(args.repeat, sklearn_path)
+    engine_time, metrics = best_of(args.repeat, engine_path)
+    assert metrics == expected, "metrics differ from sklearn"
+
+    print(f"rows={args.rows} classes={args.classes}")
+    print(f"sklearn filtering + metric calls: {sklearn_time:8.3f}s")
+    print(f"confusion-matrix engine:          {engine_time:8.3f}s")
+    print(f"speedup: {sklearn_time / engine_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Compare the pooled single-query model loader with the previous N+1 loader.
+
+Needs a local PostgreSQL with the naive_bayes_app schema (``bun drizzle-kit
+push``). The benchmark inserts ``--models`` rows named ``bench-loader-*``
+and deletes them again afterwards. Run from the repository root:
+
+    DATABASE_URL=postgres://localhost/naive_bayes python -m benchmarks.bench_model_loader --models 300
+"""
+import argparse
+import json
+import os
+import secrets
+import time
+
+import psycopg2
+import psycopg2.extras
+
+from api import main
+
+MODEL_PREFIX = "bench-loader-"
+
+
+class CountingCursor(psycopg2.extras.RealDictCursor):
+    executions = 0
+
+    def execute(self, query, vars=None):
+        CountingCursor.executions += 1
+        return super().execute(query, vars)
+
+
+def seed(database_url: str, count: int, payload_bytes: int):
+    payload = secrets.token_urlsafe(payload_bytes)
+    with psycopg2.connect(database_url) as conn, conn.cursor() as cursor:
+        for i in range(count):
+            model_id = f"{MODEL_PREFIX}{i}"
+            cursor.execute("""
+                INSERT INTO naive_bayes_app.models
+                    (id, model_name, target_column, feature_columns, classes, accuracy,
+                     model_data, encoders_data, label_encoder_data)
+                VALUES (%s, %s, 'target', %s, %s, 0.5, %s, %s, %s)
+            """, (model_id, model_id, json.dumps(["a", "b"]), json.dumps(["no", "yes"]), payload, payload, payload))
+            for _ in range(3):
+                cursor.execute("""
+                    INSERT INTO naive_bayes_app.model_metrics
+                        (id, model_id, accuracy, precision, recall, f1_score, class_metrics)
+                    VALUES (%s, %s, 0.5, 0.5, 0.5, 0.5, '{}')
+                """, (secrets.token_urlsafe(15), model_id))
+
+
+def cleanup(database_url: str):
+    with psycopg2.connect(database_url) as conn, conn.cursor() as cursor:
+        cursor.execute("DELETE FROM naive_bayes_app.model_metrics WHERE model_id LIKE %s", (MODEL_PREFIX + "%",))
+        cursor.execute("DELETE FROM naive_bayes_app.models WHERE id LIKE %s", (MODEL_PREFIX + "%",))
+
+
+def legacy_load(database_url: str):
+    """The previous loader: a fresh connection plus one metrics query per model."""
+    conn = psycopg2.connect(database_url)
+    cursor = conn.cursor(cursor_factory=CountingCursor)
+    cursor.execute("""
+        SELECT model_name as "modelName", model_data as "modelData",
+               encoders_data as "encodersData", label_encoder_data as "labelEncoderData", id
+        FROM naive_bayes_app.models
+    """)
+    loaded = {}
+    for model in cursor.fetchall():
+        cursor.execute("""
+            SELECT mm.accuracy, mm.precision, mm.recall, mm.f1_score as "f1Score", mm.class_metrics as "classMetrics"
+            FROM naive_bayes_app.model_metrics mm
+            JOIN naive_bayes_app.models m ON mm.model_id = m.id
+            WHERE m.model_name = %s
+            ORDER BY mm.created_at DESC
+            LIMIT 1
+        """, (model["modelName"],))
+        loaded[model["modelName"]] = cursor.fetchone()
+    cursor.close()
+    conn.close()
+    return loaded
+
+
+def pooled_load():
+    original = psycopg2.extras.RealDictCursor
+    psycopg2.extras.RealDictCursor = CountingCursor
+    try:
+        return main.load_models_from_db()
+    finally:
+        psycopg2.extras.RealDictCursor = original
+
+
+def measure(fn, repeat: int):
+    timings = []
+    CountingCursor.executions = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), CountingCursor.executions // repeat
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--models", type=int, default=300)
+    parser.add_argument("--payload-bytes", type=int, default=1024)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        raise SystemExit("DATABASE_URL must point at a local PostgreSQL database")
+
+    cleanup(database_url)
+    seed(database_url, args.models, args.payload_bytes)
+    try:
+        legacy_time, legacy_queries = measure(lambda: legacy_load(database_url), args.repeat)
+        pooled_time, pooled_queries = measure(pooled_load, args.repeat)
+    finally:
+        cleanup(database_url)
+
+    print(f"models={args.models} (plus any existing rows)")
+    print(f"legacy N+1 loader: {legacy_time * 1000:8.1f} ms, {legacy_queries} queries, new connection per call")
+    print(f"pooled loader:     {pooled_time * 1000:8.1f} ms, {pooled_queries} queries, pooled connection")
+    print(f"speedup: {legacy_time / pooled_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main_cli()
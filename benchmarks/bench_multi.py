@@ -0,0 +1,61 @@
+"""Compare one /classify/multi call with one /classify call per model.
+
+Trains several models on the same feature columns, so their vocabularies
+match and the multi-model path can share encoded columns. Then times
+classifying one upload with every model both ways. Run from the repository root:
+
+    python -m benchmarks.bench_multi --rows 200000 --models 1 2 4 8
+"""
+import argparse
+import json
+
+from fastapi.testclient import TestClient
+
+from api import main
+from benchmarks.datasets import make_csv
+from benchmarks.harness import best_of, disable_result_cache
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--columns", type=int, default=12)
+    parser.add_argument("--models", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--repeat", type=int, default=2)
+    parser.add_argument("--include-data", action="store_true", help="echo row data in the responses")
+    args = parser.parse_args()
+
+    disable_result_cache(main)
+    content = make_csv(args.rows, args.columns, seed=1)
+    form = {"include_data": str(args.include_data).lower()}
+    with TestClient(main.app) as client:
+        for index in range(max(args.models)):
+            client.post(
+                "/api/train",
+                files={"file": ("train.csv", make_csv(20_000, args.columns, seed=index + 10))},
+                data={"model_name": f"multi-{index}", "target_column": "label", "id_column": "id"}
+            ).raise_for_status()
+
+        def classify(name: str):
+            client.post("/api/classify", files={"file": ("data.csv", content)},
+                        data={**form, "model_name": name}).raise_for_status()
+
+        for count in args.models:
+            names = [f"multi-{index}" for index in range(count)]
+
+            def separate():
+                for name in names:
+                    classify(name)
+
+            def multi():
+                client.post("/api/classify/multi", files={"file": ("data.csv", content)},
+                            data={**form, "model_names": json.dumps(names)}).raise_for_status()
+
+            separate_time, _ = best_of(args.repeat, separate)
+            multi_time, _ = best_of(args.repeat, multi)
+            print(f"models={count:3d}  separate={separate_time:7.2f}s  multi={multi_time:7.2f}s  "
+                  f"per model={(multi_time / count):6.2f}s  speedup={separate_time / multi_time:5.2f}x")
+
+
+if __name__ == "__main__":
+    main_cli()
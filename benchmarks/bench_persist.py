@@ -0,0 +1,112 @@
+"""Compare COPY-based persistence of classification results with row-by-row inserts.
+
+Needs a local PostgreSQL with the naive_bayes_app schema (``bun drizzle-kit
+push``). The benchmark creates a model row named ``bench-persist`` and
+deletes it (and, by cascade, its classifications) afterwards. Run from the
+repository root:
+
+    DATABASE_URL=postgres://localhost/naive_bayes python -m benchmarks.bench_persist --rows 100000 1000000
+"""
+import argparse
+import io
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import psycopg2
+
+from api import main
+from benchmarks.datasets import make_csv
+
+MODEL_NAME = "bench-persist"
+
+
+def seed_model(database_url: str, model_info):
+    with psycopg2.connect(database_url) as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO naive_bayes_app.models
+                (id, model_name, target_column, feature_columns, classes, accuracy,
+                 model_data, encoders_data, label_encoder_data)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, (
+            MODEL_NAME, MODEL_NAME, model_info["targetColumn"], json.dumps(model_info["featureColumns"]),
+            json.dumps(model_info["classes"]), model_info["accuracy"],
+            model_info["modelData"], model_info["encodersData"], model_info["labelEncoderData"]
+        ))
+
+
+def cleanup(database_url: str):
+    with psycopg2.connect(database_url) as conn, conn.cursor() as cursor:
+        cursor.execute("DELETE FROM naive_bayes_app.classification_history WHERE model_name = %s", (MODEL_NAME,))
+        cursor.execute("DELETE FROM naive_bayes_app.models WHERE id = %s", (MODEL_NAME,))
+
+
+def delete_classifications(database_url: str):
+    with psycopg2.connect(database_url) as conn, conn.cursor() as cursor:
+        cursor.execute("DELETE FROM naive_bayes_app.classifications WHERE model_id = %s", (MODEL_NAME,))
+
+
+def row_by_row(database_url: str, body: dict):
+    """One INSERT per result, as the web tier's insert of the returned results amounts to."""
+    with psycopg2.connect(database_url) as conn, conn.cursor() as cursor:
+        cursor.executemany("""
+            INSERT INTO naive_bayes_app.classifications
+                (id, model_id, data, predicted_class, actual_class, confidence)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, [
+            (main.generate_id(), MODEL_NAME, json.dumps(result), result["predictedClass"],
+             result["actualClass"], result["confidence"])
+            for result in body["results"]
+        ])
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--baseline-rows", type=int, default=100_000,
+                        help="largest row count to also time with row-by-row inserts")
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        raise SystemExit("DATABASE_URL must point at a local PostgreSQL database")
+
+    model_info = main.fit_model_from_csv(make_csv(20_000, 8), MODEL_NAME, "label", "id", None)
+    cleanup(database_url)
+    seed_model(database_url, model_info)
+    model_info = {**model_info, "id": MODEL_NAME}
+    try:
+        for rows in args.rows:
+            content = make_csv(rows, 8, seed=1)
+
+            delete_classifications(database_url)
+            persist_time, summary = timed(lambda: json.loads(main.classify_csv(
+                content, MODEL_NAME, model_info, actual_column="label", persist=True, file_name="bench.csv"
+            )))
+            assert summary["totalRecords"] == rows
+
+            classify_time, body = timed(lambda: json.loads(main.classify_csv(
+                content, MODEL_NAME, model_info, actual_column="label"
+            )))
+            print(f"rows={rows}")
+            print(f"  classify + COPY persist:      {persist_time:8.2f}s ({rows / persist_time:10,.0f} rows/s end to end)")
+            print(f"  classify + JSON response:     {classify_time:8.2f}s")
+
+            if rows <= args.baseline_rows:
+                delete_classifications(database_url)
+                insert_time, _ = timed(lambda: row_by_row(database_url, body))
+                print(f"  row-by-row inserts (db only): {insert_time:8.2f}s ({rows / insert_time:10,.0f} rows/s)")
+    finally:
+        cleanup(database_url)
+
+
+if __name__ == "__main__":
+    main_cli()
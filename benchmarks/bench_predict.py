@@ -0,0 +1,89 @@
+"""Measure /api/predict latency percentiles at several concurrency levels.
+
+Starts the API with uvicorn in a subprocess, trains a model, then has N
+concurrent clients send single-record predict calls back to back and
+reports p50/p99 latency, throughput and the average micro-batch size the
+server formed. Compare ``--window 0`` with the default window to see the
+effect of coalescing. Run from the repository root:
+
+    python -m benchmarks.bench_predict --concurrency 1 8 32 128
+    python -m benchmarks.bench_predict --concurrency 1 8 32 128 --window 0
+"""
+import argparse
+import asyncio
+import io
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+import numpy as np
+import pandas as pd
+
+from benchmarks.datasets import make_csv
+from benchmarks.load_health import wait_until_up
+
+
+async def run_level(base_url: str, records, concurrency: int, requests_per_client: int):
+    latencies = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        async def worker(offset: int):
+            for index in range(requests_per_client):
+                record = records[(offset * requests_per_client + index) % len(records)]
+                start = time.perf_counter()
+                response = await client.post("/api/predict", json={"modelName": "predict-bench", "records": record})
+                latencies.append(time.perf_counter() - start)
+                response.raise_for_status()
+
+        before = (await client.get("/api/cache/stats")).json()["predict"]
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(offset) for offset in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        after = (await client.get("/api/cache/stats")).json()["predict"]
+
+    batches = after["batches"] - before["batches"]
+    batch_size = (after["records"] - before["records"]) / batches if batches else 0.0
+    values = np.array(latencies) * 1000
+    print(f"concurrency={concurrency:4d}  n={len(values):5d}  p50={np.percentile(values, 50):7.2f}ms  "
+          f"p99={np.percentile(values, 99):7.2f}ms  throughput={len(values) / elapsed:8.0f} req/s  "
+          f"avg batch={batch_size:6.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--requests", type=int, default=2000, help="requests per concurrency level")
+    parser.add_argument("--window", type=float, default=None, help="PREDICT_BATCH_WINDOW_MS for the server")
+    parser.add_argument("--features", type=int, default=8)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    env = dict(os.environ)
+    env.pop("DATABASE_URL", None)
+    if args.window is not None:
+        env["PREDICT_BATCH_WINDOW_MS"] = str(args.window)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--port", str(args.port), "--log-level", "warning"],
+        env=env
+    )
+    try:
+        wait_until_up(base_url)
+        content = make_csv(20_000, args.features)
+        form = {"model_name": "predict-bench", "target_column": "label", "id_column": "id"}
+        httpx.post(f"{base_url}/api/train", files={"file": ("train.csv", content)}, data=form, timeout=600).raise_for_status()
+        records = pd.read_csv(io.BytesIO(content)).drop(columns=["id", "label"]).head(1000).to_dict("records")
+
+        window = httpx.get(f"{base_url}/api/cache/stats").json()["predict"]["windowMs"]
+        print(f"window={window}ms features={args.features}")
+        for concurrency in args.concurrency:
+            asyncio.run(run_level(base_url, records, concurrency, max(1, args.requests // concurrency)))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Synthetic categorical datasets shared by the benchmarks.
+
+Every generator is deterministic for a given seed. Datasets have an ``id``
+column, ``columns`` categorical feature columns ``f0 .. fN`` and a ``label``
+target. Even feature columns hold strings (``v3_17``) and odd ones integers,
+so both the object and the numeric encoding paths are exercised. The label
+depends on the first few features, so trained models have real signal and
+metrics are not just noise.
+"""
+import gzip
+import io
+
+import numpy as np
+import pandas as pd
+
+
+def make_codes(rows: int, columns: int, cardinality: int, classes: int, seed: int = 0):
+    """Integer feature codes ``(rows, columns)`` and class codes ``(rows,)``."""
+    rng = np.random.default_rng(seed)
+    X = rng.integers(0, cardinality, size=(rows, columns))
+    informative = X[:, :min(columns, 3)].sum(axis=1)
+    noise = rng.integers(0, classes, size=rows)
+    y = np.where(rng.random(rows) < 0.6, informative % classes, noise)
+    return X, y
+
+
+def make_frame(
+    rows: int,
+    columns: int = 8,
+    cardinality: int = 12,
+    classes: int = 3,
+    seed: int = 0,
+    with_label: bool = True
+) -> pd.DataFrame:
+    """A DataFrame with ``id``, ``f0 .. f{columns-1}`` and optionally ``label``."""
+    X, y = make_codes(rows, columns, cardinality, classes, seed)
+    data = {"id": np.arange(rows)}
+    for index in range(columns):
+        if index % 2:
+            data[f"f{index}"] = X[:, index]
+        else:
+            vocabulary = np.array([f"v{index}_{value}" for value in range(cardinality)], dtype=object)
+            data[f"f{index}"] = vocabulary[X[:, index]]
+    if with_label:
+        labels = np.array([f"class_{value}" for value in range(classes)], dtype=object)
+        data["label"] = labels[y]
+    return pd.DataFrame(data)
+
+
+def make_csv(rows: int, columns: int = 8, cardinality: int = 12, classes: int = 3, seed: int = 0) -> bytes:
+    """``make_frame`` rendered as CSV bytes, as uploaded to /api/train and /api/classify."""
+    return make_frame(rows, columns, cardinality, classes, seed).to_csv(index=False).encode()
+
+
+UPLOAD_FILE_NAMES = {
+    "csv": "data.csv",
+    "csv.gz": "data.csv.gz",
+    "csv.zst": "data.csv.zst",
+    "parquet": "data.parquet",
+    "arrow": "data.arrow"
+}
+
+
+def make_upload(
+    rows: int,
+    columns: int = 8,
+    cardinality: int = 12,
+    classes: int = 3,
+    seed: int = 0,
+    upload_format: str = "csv"
+):
+    """``make_frame`` encoded as an upload in ``upload_format``; returns ``(file_name, content)``."""
+    if upload_format in ("csv", "csv.gz", "csv.zst"):
+        content = make_csv(rows, columns, cardinality, classes, seed)
+        if upload_format == "csv.gz":
+            content = gzip.compress(content, compresslevel=6)
+        elif upload_format == "csv.zst":
+            import zstandard
+
+            content = zstandard.ZstdCompressor().compress(content)
+        return UPLOAD_FILE_NAMES[upload_format], content
+
+    import pyarrow as pa
+    import pyarrow.feather
+    import pyarrow.parquet
+
+    table = pa.Table.from_pandas(make_frame(rows, columns, cardinality, classes, seed), preserve_index=False)
+    buffer = io.BytesIO()
+    if upload_format == "parquet":
+        pa.parquet.write_table(table, buffer)
+    else:
+        pa.feather.write_feather(table, buffer)
+    return UPLOAD_FILE_NAMES[upload_format], buffer.getvalue()
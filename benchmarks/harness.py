@@ -0,0 +1,47 @@
+"""Timing and memory helpers shared by the benchmarks."""
+import resource
+import sys
+import time
+
+import numpy as np
+
+
+def best_of(repeat: int, fn):
+    """Run ``fn`` ``repeat`` times and return the fastest wall time and the last result."""
+    timings, result = timings_of(repeat, fn)
+    return min(timings), result
+
+
+def timings_of(repeat: int, fn):
+    """Run ``fn`` ``repeat`` times and return every wall time and the last result."""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return timings, result
+
+
+def latency_summary(timings) -> dict:
+    """Latency percentiles in milliseconds."""
+    values = np.asarray(timings, dtype=np.float64) * 1000
+    return {
+        "minMs": float(values.min()),
+        "p50Ms": float(np.percentile(values, 50)),
+        "p95Ms": float(np.percentile(values, 95)),
+        "p99Ms": float(np.percentile(values, 99)),
+        "maxMs": float(values.max())
+    }
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far, in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in KiB elsewhere.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def disable_result_cache(main):
+    """Turn off /classify result caching so repeated uploads are measured end to end."""
+    main.result_cache = main.ResultCache(0)
@@ -0,0 +1,122 @@
+"""Measure /health latency while large /classify and /train jobs run.
+
+Starts the API with uvicorn in a subprocess, then pings /api/health on an
+idle server and again while several large classify and train uploads are in
+flight. With heavy stages on the worker pool the loaded percentiles should
+stay close to the idle ones. Run from the repository root:
+
+    python -m benchmarks.load_health --backend thread --rows 300000 --jobs 4
+    python -m benchmarks.load_health --backend process --rows 300000 --jobs 4
+"""
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import httpx
+import numpy as np
+
+from benchmarks.datasets import make_csv
+
+
+def wait_until_up(base_url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/api/health", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("API did not start")
+
+
+def ping_health(base_url: str, stop: threading.Event, interval: float):
+    latencies = []
+    with httpx.Client(timeout=60) as client:
+        while not stop.is_set():
+            start = time.perf_counter()
+            client.get(f"{base_url}/api/health")
+            latencies.append(time.perf_counter() - start)
+            time.sleep(interval)
+    return latencies
+
+
+def summarize(label: str, latencies):
+    values = np.array(latencies) * 1000
+    print(f"{label:<8} n={len(values):4d}  p50={np.percentile(values, 50):7.1f}ms  "
+          f"p99={np.percentile(values, 99):7.1f}ms  max={values.max():7.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=["thread", "process"], default="thread")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--rows", type=int, default=300_000)
+    parser.add_argument("--features", type=int, default=8)
+    parser.add_argument("--jobs", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--interval", type=float, default=0.02)
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    # The classify jobs repeat one upload, so result caching would turn them into cache hits.
+    env = dict(os.environ, EXECUTION_BACKEND=args.backend, EXECUTION_MAX_WORKERS=str(args.workers), RESULT_CACHE_MAX_BYTES="0")
+    env.pop("DATABASE_URL", None)
+    env.pop("RESULT_CACHE_DIR", None)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--port", str(args.port), "--log-level", "warning"],
+        env=env
+    )
+    try:
+        wait_until_up(base_url)
+        content = make_csv(args.rows, args.features)
+        form = {"model_name": "load-test", "target_column": "label", "id_column": "id"}
+        httpx.post(f"{base_url}/api/train", files={"file": ("train.csv", content)}, data=form, timeout=600).raise_for_status()
+
+        stop = threading.Event()
+        idle = []
+        idle_thread = threading.Thread(target=lambda: idle.extend(ping_health(base_url, stop, args.interval)))
+        idle_thread.start()
+        time.sleep(2)
+        stop.set()
+        idle_thread.join()
+
+        stop = threading.Event()
+        loaded = []
+        statuses = []
+
+        def job(index: int):
+            if index % 2:
+                response = httpx.post(f"{base_url}/api/train", files={"file": ("train.csv", content)},
+                                      data={**form, "model_name": f"load-test-{index}"}, timeout=600)
+            else:
+                response = httpx.post(f"{base_url}/api/classify", files={"file": ("data.csv", content)},
+                                      data={"model_name": "load-test"}, timeout=600)
+            statuses.append(response.status_code)
+
+        pinger = threading.Thread(target=lambda: loaded.extend(ping_health(base_url, stop, args.interval)))
+        jobs = [threading.Thread(target=job, args=(i,)) for i in range(args.jobs)]
+        start = time.perf_counter()
+        pinger.start()
+        for thread in jobs:
+            thread.start()
+        for thread in jobs:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        stop.set()
+        pinger.join()
+
+        print(f"backend={args.backend} workers={args.workers} rows={args.rows} jobs={args.jobs} "
+              f"statuses={sorted(statuses)} elapsed={elapsed:.1f}s")
+        summarize("idle", idle)
+        summarize("loaded", loaded)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
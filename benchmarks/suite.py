@@ -0,0 +1,382 @@
+"""Reproducible benchmark suite for training, classification, model loading and metrics.
+
+Every case runs in a fresh interpreter, so its peak RSS is its own. Cases
+use the synthetic datasets in ``benchmarks.datasets`` and sweep every
+combination of --rows, --columns, --cardinality and --classes. Train and
+classify cases also sweep the upload --formats (csv, csv.gz, csv.zst,
+parquet, arrow). Results are written as JSON. Pass an earlier results file
+to --compare to print the change per case. Run from the repository root:
+
+    python -m benchmarks.suite --rows 10000 100000 --output bench-results.json
+    python -m benchmarks.suite --rows 10000 100000 --compare bench-results.json
+    python -m benchmarks.suite --cases classify_function classify_endpoint --rows 1000000
+    python -m benchmarks.suite --cases train_function classify_function --formats csv parquet --rows 1000000
+
+``load_models_from_db`` uses DATABASE_URL when it is set. Otherwise it
+uses a stand-in connection that returns --models synthetic rows. The
+stand-in times the Python side of the loader but not PostgreSQL itself.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from benchmarks.datasets import make_csv, make_frame, make_upload
+from benchmarks.harness import disable_result_cache, latency_summary, peak_rss_mb, timings_of
+
+CASES = {}
+
+
+def case(name: str):
+    def register(fn):
+        CASES[name] = fn
+        return fn
+    return register
+
+
+def throughput(timings, rows: int, size: int = 0, **extra) -> dict:
+    best = min(timings)
+    result = {
+        "seconds": best,
+        "latency": latency_summary(timings),
+        "rows": rows,
+        "rowsPerSecond": rows / best if best else None,
+        **extra
+    }
+    if size:
+        result["bytes"] = size
+        result["mbPerSecond"] = size / best / (1024 * 1024) if best else None
+    return result
+
+
+def train_model_info(main, params: dict, model_name: str = "bench-suite"):
+    content = make_csv(params["rows"], params["columns"], params["cardinality"], params["classes"], seed=0)
+    model_info = main.fit_model_from_csv(content, model_name, "label", "id", None)
+    main.models_metadata[model_name] = model_info
+    return model_info
+
+
+def upload(params: dict, seed: int = 0):
+    return make_upload(
+        params["rows"], params["columns"], params["cardinality"], params["classes"], seed, params.get("format", "csv")
+    )
+
+
+@case("train_function")
+def train_function(main, params: dict, repeat: int) -> dict:
+    _, content = upload(params)
+    upload_format = params.get("format", "csv")
+    timings, _ = timings_of(repeat, lambda: main.fit_model_from_csv(
+        content, "bench-suite", "label", "id", None, upload_format
+    ))
+    return throughput(timings, params["rows"], len(content))
+
+
+@case("train_chunked_function")
+def train_chunked_function(main, params: dict, repeat: int) -> dict:
+    file_name, content = upload(params)
+    with tempfile.NamedTemporaryFile(suffix=file_name) as spooled:
+        spooled.write(content)
+        spooled.flush()
+        timings, _ = timings_of(repeat, lambda: main.fit_model_from_csv_chunks(
+            spooled.name, "bench-suite", "label", "id", None, main.TRAIN_CHUNK_ROWS, params.get("format", "csv")
+        ))
+    return throughput(timings, params["rows"], len(content))
+
+
+@case("train_endpoint")
+def train_endpoint(main, params: dict, repeat: int) -> dict:
+    from fastapi.testclient import TestClient
+
+    file_name, content = upload(params)
+    form = {"model_name": "bench-suite", "target_column": "label", "id_column": "id"}
+    with TestClient(main.app) as client:
+        def train():
+            client.post("/api/train", files={"file": (file_name, content)}, data=form).raise_for_status()
+        timings, _ = timings_of(repeat, train)
+    return throughput(timings, params["rows"], len(content))
+
+
+@case("classify_function")
+def classify_function(main, params: dict, repeat: int) -> dict:
+    model_info = train_model_info(main, params)
+    _, content = upload(params, seed=1)
+    upload_format = params.get("format", "csv")
+    main.get_model_artifacts("bench-suite", model_info)
+    timings, body = timings_of(repeat, lambda: main.classify_csv(
+        content, "bench-suite", model_info, actual_column="label", upload_format=upload_format
+    ))
+    return throughput(timings, params["rows"], len(content), responseBytes=len(body))
+
+
+@case("classify_endpoint")
+def classify_endpoint(main, params: dict, repeat: int) -> dict:
+    from fastapi.testclient import TestClient
+
+    train_model_info(main, params)
+    file_name, content = upload(params, seed=1)
+    form = {"model_name": "bench-suite", "actual_column": "label"}
+    with TestClient(main.app) as client:
+        def classify():
+            response = client.post("/api/classify", files={"file": (file_name, content)}, data=form)
+            response.raise_for_status()
+            return response.content
+        classify()
+        timings, body = timings_of(repeat, classify)
+    return throughput(timings, params["rows"], len(content), responseBytes=len(body))
+
+
+def deserialize(main, params: dict, repeat: int, model_format: str) -> dict:
+    main.MODEL_FORMAT = model_format
+    model_info = train_model_info(main, params)
+    blobs = {field: model_info[field] for field in main.MODEL_BLOB_FIELDS}
+    timings, _ = timings_of(repeat, lambda: main.load_model_payloads(blobs, model_info["featureColumns"]))
+    size = sum(len(value) for value in blobs.values())
+    return throughput(timings, 1, size, payloadBytes=size)
+
+
+@case("deserialize_binary")
+def deserialize_binary(main, params: dict, repeat: int) -> dict:
+    return deserialize(main, params, repeat, "binary")
+
+
+@case("deserialize_joblib")
+def deserialize_joblib(main, params: dict, repeat: int) -> dict:
+    return deserialize(main, params, repeat, "joblib")
+
+
+@case("load_model_artifacts")
+def load_model_artifacts(main, params: dict, repeat: int) -> dict:
+    model_info = train_model_info(main, params)
+    payload_bytes = sum(len(model_info[field]) for field in main.MODEL_BLOB_FIELDS)
+
+    def load():
+        main.model_cache.invalidate("bench-suite")
+        return main.get_model_artifacts("bench-suite", model_info)
+
+    timings, artifacts = timings_of(repeat, load)
+    footprint = main.model_footprint(*artifacts)
+    return throughput(
+        timings, 1, payload_bytes, payloadBytes=payload_bytes, footprintBytes=footprint["bytes"],
+        tableBytes=footprint["tableBytes"], vocabularyBytes=footprint["vocabularyBytes"]
+    )
+
+
+class StandInCursor:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, query, params=None):
+        pass
+
+    def fetchall(self):
+        return self.rows
+
+
+class StandInConnection:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def cursor(self, cursor_factory=None):
+        return StandInCursor(self.rows)
+
+
+class StandInPool:
+    """Replaces the connection pool with canned ``load_models_from_db`` rows."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    @contextmanager
+    def connection(self):
+        yield StandInConnection(self.rows)
+
+
+def stand_in_model_rows(count: int, params: dict):
+    frame = make_frame(1, params["columns"], with_label=False)
+    feature_columns = [column for column in frame.columns if column != "id"]
+    classes = [f"class_{value}" for value in range(params["classes"])]
+    class_metrics = {name: {"precision": 0.5, "recall": 0.5, "f1-score": 0.5, "support": 100.0} for name in classes}
+    return [{
+        "modelName": f"bench-model-{index}",
+        "targetColumn": "label",
+        "featureColumns": feature_columns,
+        "classes": classes,
+        "accuracy": 0.5,
+        "id": f"bench-model-{index}",
+        "updatedAt": datetime(2024, 1, 1, tzinfo=timezone.utc),
+        "metricsAccuracy": 0.5,
+        "metricsPrecision": 0.5,
+        "metricsRecall": 0.5,
+        "metricsF1Score": 0.5,
+        "classMetrics": json.dumps(class_metrics)
+    } for index in range(count)]
+
+
+@case("load_models_from_db")
+def load_models_from_db(main, params: dict, repeat: int) -> dict:
+    backend = "postgres"
+    if not os.getenv("DATABASE_URL"):
+        backend = "stand-in"
+        os.environ["DATABASE_URL"] = "stand-in"
+        main._db_pool = StandInPool(stand_in_model_rows(params["models"], params))
+    timings, loaded = timings_of(repeat, main.load_models_from_db)
+    return throughput(timings, len(loaded), backend=backend)
+
+
+@case("metrics")
+def metrics(main, params: dict, repeat: int) -> dict:
+    import numpy as np
+
+    frame = make_frame(params["rows"], params["columns"], params["cardinality"], params["classes"])
+    classes = np.array(sorted(frame["label"].unique()), dtype=object)
+    rng = np.random.default_rng(1)
+    y_pred = rng.integers(0, len(classes), size=len(frame))
+
+    def compute():
+        accumulator = main.ConfusionMatrixAccumulator(len(classes))
+        accumulator.update_labels(frame["label"], y_pred, classes)
+        return accumulator.metrics(classes.tolist())
+
+    timings, _ = timings_of(repeat, compute)
+    return throughput(timings, params["rows"])
+
+
+def run_case(name: str, params: dict, repeat: int) -> dict:
+    from api import main
+
+    disable_result_cache(main)
+
+    # Import the lazily loaded modules up front, as the server's warm-up does,
+    # so the first timed iteration doesn't include them.
+    main.warm_up_worker()
+    baseline_rss = peak_rss_mb()
+    started = time.perf_counter()
+    result = CASES[name](main, params, repeat)
+    return {
+        "case": name,
+        "params": params,
+        "repeat": repeat,
+        **result,
+        "wallSeconds": time.perf_counter() - started,
+        "importRssMb": baseline_rss,
+        "peakRssMb": peak_rss_mb()
+    }
+
+
+def run_isolated(name: str, params: dict, repeat: int) -> dict:
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.suite", "--run-case", name, "--params", json.dumps(params),
+         "--repeat", str(repeat)],
+        capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        return {"case": name, "params": params, "error": completed.stderr.strip().splitlines()[-1:]}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def environment() -> dict:
+    import numpy
+    import pandas
+    import sklearn
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": numpy.__version__,
+        "pandas": pandas.__version__,
+        "sklearn": sklearn.__version__,
+        "platform": platform.platform(),
+        "cpuCount": os.cpu_count()
+    }
+
+
+def result_key(result: dict):
+    return result["case"], json.dumps(result["params"], sort_keys=True)
+
+
+def print_result(result: dict, previous: dict = None):
+    params = result["params"]
+    label = (f"{result['case']:<24} {params.get('format', 'csv'):<8} rows={params['rows']:<8} cols={params['columns']:<3} "
+             f"card={params['cardinality']:<5} cls={params['classes']:<3}")
+    if "error" in result:
+        print(f"{label} ERROR {result['error']}")
+        return
+    line = f"{label} {result['seconds'] * 1000:10.1f}ms  p99={result['latency']['p99Ms']:9.1f}ms  peak={result['peakRssMb']:7.0f}MiB"
+    if result.get("rowsPerSecond") and result["case"].startswith(("train", "classify", "metrics")):
+        line += f"  {result['rowsPerSecond']:12,.0f} rows/s"
+    if previous and "seconds" in previous:
+        line += f"  time x{result['seconds'] / previous['seconds']:.2f}  rss {result['peakRssMb'] - previous['peakRssMb']:+.0f}MiB"
+    print(line)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=sorted(CASES))
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000])
+    parser.add_argument("--columns", type=int, nargs="+", default=[8])
+    parser.add_argument("--cardinality", type=int, nargs="+", default=[12])
+    parser.add_argument("--classes", type=int, nargs="+", default=[3])
+    parser.add_argument("--formats", nargs="+", choices=["csv", "csv.gz", "csv.zst", "parquet", "arrow"], default=["csv"],
+                        help="upload formats for the train and classify cases")
+    parser.add_argument("--models", type=int, default=500, help="stand-in model rows for load_models_from_db")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--in-process", action="store_true", help="run cases in this process (peak RSS is cumulative)")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    parser.add_argument("--params", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        print(json.dumps(run_case(args.run_case, json.loads(args.params), args.repeat)))
+        return
+
+    previous = {}
+    if args.compare:
+        with open(args.compare) as handle:
+            previous = {result_key(result): result for result in json.load(handle)["results"]}
+
+    results = []
+    sweep = itertools.product(args.formats, args.rows, args.columns, args.cardinality, args.classes)
+    for upload_format, rows, columns, cardinality, classes in sweep:
+        params = {
+            "rows": rows, "columns": columns, "cardinality": cardinality, "classes": classes, "models": args.models,
+            "format": upload_format
+        }
+        for name in args.cases:
+            if upload_format != "csv" and not name.startswith(("train", "classify")):
+                continue
+            if args.in_process:
+                result = run_case(name, params, args.repeat)
+            else:
+                result = run_isolated(name, params, args.repeat)
+            print_result(result, previous.get(result_key(result)))
+            results.append(result)
+
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump({"environment": environment(), "results": results}, handle, indent=2)
+        print(f"wrote {len(results)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,71 @@
+"""Shared fixtures: the API running without a database, and small labelled uploads.
+
+Run from the repository root:
+
+    pip install -r tests/requirements.txt
+    python -m pytest -q tests
+"""
+
+import io
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# api.main reads its configuration at import time, and load_dotenv() never
+# overrides variables that are already set, so pin these before importing it.
+os.environ["DATABASE_URL"] = ""
+os.environ["WARMUP_ENABLED"] = "false"
+os.environ["JOB_STORE_DIR"] = tempfile.mkdtemp(prefix="naive-bayes-test-jobs-")
+for variable in ("MODEL_STORE_DIR", "RESULT_CACHE_DIR", "MODEL_TABLE_DTYPE", "MODEL_FORMAT"):
+    os.environ.pop(variable, None)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FEATURE_COLUMNS = ["color", "shape", "size"]
+
+
+def make_frame(rows: int, seed: int = 0, colors=("red", "green", "blue", "black")) -> pd.DataFrame:
+    """Labelled rows whose class depends on the features, with string and integer categories."""
+    rng = np.random.default_rng(seed)
+    color = rng.choice(list(colors), size=rows)
+    shape = rng.choice(["circle", "square", "triangle"], size=rows)
+    size = rng.integers(1, 6, size=rows)
+    score = (color == "red") * 2 + (shape == "square") + (size > 3) + rng.integers(0, 2, size=rows)
+    label = np.array(["low", "mid", "high"])[np.clip(score - 1, 0, 2)]
+    return pd.DataFrame({
+        "id": [f"row-{seed}-{index}" for index in range(rows)],
+        "color": color,
+        "shape": shape,
+        "size": size,
+        "label": label
+    })
+
+
+def to_csv(df: pd.DataFrame) -> bytes:
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False)
+    return buffer.getvalue().encode("utf-8")
+
+
+@pytest.fixture(scope="session")
+def main():
+    from api import main
+    return main
+
+
+@pytest.fixture(scope="session")
+def client(main):
+    from fastapi.testclient import TestClient
+
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def model_name(request):
+    """A model name unique to the test, so tests sharing the app never see each other's models."""
+    return f"test-{request.node.name}"
@@ -0,0 +1,302 @@
+"""Training, classification, result caching, prediction and model updates through the HTTP API."""
+
+import io
+import json
+
+import numpy as np
+import pandas as pd
+from sklearn.naive_bayes import CategoricalNB
+from sklearn.preprocessing import LabelEncoder, OrdinalEncoder
+
+from conftest import FEATURE_COLUMNS, make_frame, to_csv
+
+
+def train(client, model_name, df, **fields):
+    response = client.post(
+        "/api/train",
+        files={"file": ("train.csv", to_csv(df), "text/csv")},
+        data={
+            "model_name": model_name,
+            "target_column": "label",
+            "id_column": "id",
+            "feature_columns": json.dumps(FEATURE_COLUMNS),
+            **fields
+        }
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def classify(client, model_name, df, **fields):
+    return client.post(
+        "/api/classify",
+        files={"file": ("data.csv", to_csv(df), "text/csv")},
+        data={"model_name": model_name, "id_column": "id", "actual_column": "label", **fields}
+    )
+
+
+def sklearn_reference(train_df, df):
+    """Predictions and confidences of an OrdinalEncoder + CategoricalNB pipeline fitted on ``train_df``."""
+    encoder = OrdinalEncoder().fit(train_df[FEATURE_COLUMNS])
+    label_encoder = LabelEncoder().fit(train_df["label"])
+    model = CategoricalNB().fit(encoder.transform(train_df[FEATURE_COLUMNS]), label_encoder.transform(train_df["label"]))
+    proba = model.predict_proba(encoder.transform(df[FEATURE_COLUMNS]))
+    return label_encoder.classes_[proba.argmax(axis=1)], proba.max(axis=1)
+
+
+def test_train_reports_model_and_metrics(client, model_name):
+    df = make_frame(1000)
+    info = train(client, model_name, df)
+
+    assert info["modelName"] == model_name
+    assert info["featureColumns"] == FEATURE_COLUMNS
+    assert info["classes"] == sorted(df["label"].unique())
+    assert 0 < info["accuracy"] <= 1
+    assert info["metrics"]["accuracy"] == info["accuracy"]
+    assert model_name in client.get("/api/models").text
+
+
+def test_classify_matches_sklearn(client, model_name):
+    train_df = make_frame(2000, seed=1)
+    df = make_frame(300, seed=2)
+    train(client, model_name, train_df)
+
+    response = classify(client, model_name, df)
+
+    assert response.status_code == 200, response.text
+    results = response.json()["results"]
+    expected_class, expected_confidence = sklearn_reference(train_df, df)
+    assert [result["id"] for result in results] == df["id"].tolist()
+    assert [result["predictedClass"] for result in results] == expected_class.tolist()
+    np.testing.assert_allclose([result["confidence"] for result in results], expected_confidence, rtol=1e-5)
+    accuracy = float((expected_class == df["label"].to_numpy()).mean())
+    assert response.json()["metrics"]["accuracy"] == accuracy
+
+
+def test_classify_unknown_model_is_404(client):
+    assert classify(client, "no-such-model", make_frame(10)).status_code == 404
+
+
+def test_classify_reuses_cached_model_until_retrained(client, model_name):
+    train(client, model_name, make_frame(1000, seed=3))
+    classify(client, model_name, make_frame(100, seed=4))
+    hits = client.get("/api/cache/stats").json()["models"]["hits"]
+
+    assert classify(client, model_name, make_frame(100, seed=5)).status_code == 200
+    assert client.get("/api/cache/stats").json()["models"]["hits"] == hits + 1
+
+    retrained_df = make_frame(1000, seed=6)
+    retrained_df["label"] = retrained_df["label"].iloc[::-1].to_numpy()
+    train(client, model_name, retrained_df)
+    df = make_frame(100, seed=7)
+    response = classify(client, model_name, df)
+
+    assert client.get("/api/cache/stats").json()["models"]["hits"] == hits + 1
+    expected_class, _ = sklearn_reference(retrained_df, df)
+    assert [result["predictedClass"] for result in response.json()["results"]] == expected_class.tolist()
+
+
+def test_classify_echoes_uploaded_floats_unchanged(client, model_name):
+    train(client, model_name, make_frame(500, seed=8))
+    df = make_frame(4, seed=9)
+    df["fare"] = [8.05, 71.2833, 0.1, None]
+
+    response = classify(client, model_name, df)
+
+    assert response.status_code == 200, response.text
+    results = response.json()["results"]
+    # Compare the text: 8.050000000000001 would parse back to the same double as 8.05.
+    assert [result["data"].rsplit('"fare":', 1)[1] for result in results] == ["8.05}", "71.2833}", "0.1}", "null}"]
+
+
+def test_classify_stream_matches_classify(client, model_name):
+    train(client, model_name, make_frame(500, seed=10))
+    df = make_frame(25, seed=11)
+    df["fare"] = 8.05
+    expected = classify(client, model_name, df).json()
+
+    def stream(output_format):
+        response = client.post(
+            "/api/classify/stream",
+            files={"file": ("data.csv", to_csv(df), "text/csv")},
+            data={
+                "model_name": model_name,
+                "id_column": "id",
+                "actual_column": "label",
+                "output_format": output_format,
+                "chunk_size": "10"
+            }
+        )
+        assert response.status_code == 200, response.text
+        return response.text
+
+    lines = [json.loads(line) for line in stream("ndjson").splitlines()]
+    assert lines[:-1] == expected["results"]
+    assert lines[-1]["type"] == "summary"
+    assert lines[-1]["metrics"]["accuracy"] == expected["metrics"]["accuracy"]
+
+    rows = pd.read_csv(io.StringIO(stream("csv")), comment="#", keep_default_na=False, float_precision="round_trip")
+    assert rows["data"].tolist() == [result["data"] for result in expected["results"]]
+    assert rows["confidence"].tolist() == [result["confidence"] for result in expected["results"]]
+
+
+def test_list_models_leaves_out_payloads_unless_asked(client, model_name):
+    info = train(client, model_name, make_frame(300, seed=12))
+
+    listed = client.get("/api/models").json()
+    with_blobs = client.get("/api/models", params={"include_blobs": "true"}).json()
+
+    model = next(model for model in listed["models"] if model["modelName"] == model_name)
+    assert "modelData" not in model
+    model = next(model for model in with_blobs["models"] if model["modelName"] == model_name)
+    assert model["modelData"] == info["modelData"]
+
+
+def test_update_matches_training_on_all_rows(client, model_name):
+    first_df = make_frame(1000, seed=8, colors=("red", "green", "blue"))
+    second_df = make_frame(500, seed=9, colors=("red", "black"))
+    df = make_frame(300, seed=10)
+    train(client, model_name, first_df)
+    before = classify(client, model_name, df)
+
+    response = client.post(
+        f"/api/models/{model_name}/update",
+        files={"file": ("batch.csv", to_csv(second_df), "text/csv")}
+    )
+
+    assert response.status_code == 200, response.text
+    update = response.json()
+    assert update["rowsAdded"] == len(second_df)
+    assert update["newCategories"] == {"color": ["black"]}
+    assert update["persisted"] is False
+
+    after = classify(client, model_name, df)
+    assert after.headers["X-Result-Cache"] == "miss"
+    assert after.content != before.content
+    expected_class, expected_confidence = sklearn_reference(pd.concat([first_df, second_df]), df)
+    results = after.json()["results"]
+    assert [result["predictedClass"] for result in results] == expected_class.tolist()
+    np.testing.assert_allclose([result["confidence"] for result in results], expected_confidence, rtol=1e-5)
+
+
+def test_update_rejects_unknown_classes(client, model_name):
+    train(client, model_name, make_frame(500, seed=11))
+    batch = make_frame(50, seed=12)
+    batch.loc[0, "label"] = "unheard-of"
+
+    response = client.post(
+        f"/api/models/{model_name}/update",
+        files={"file": ("batch.csv", to_csv(batch), "text/csv")}
+    )
+
+    assert response.status_code == 400
+    assert response.json()["detail"]["unknown_classes"] == ["unheard-of"]
+
+
+def test_classify_reports_unknown_categories(client, model_name):
+    train(client, model_name, make_frame(500, seed=13, colors=("red", "green")))
+    df = make_frame(40, seed=14, colors=("red", "purple", "teal"))
+
+    known = classify(client, model_name, df[df["color"] == "red"]).json()
+    response = classify(client, model_name, df)
+
+    assert known["unknownCategories"] == []
+    assert response.status_code == 200, response.text
+    (report,) = response.json()["unknownCategories"]
+    assert report["column"] == "color"
+    assert sorted(report["unknown_values"]) == ["purple", "teal"]
+    assert report["known_values"] == ["green", "red"]
+
+    stream = client.post(
+        "/api/classify/stream",
+        files={"file": ("data.csv", to_csv(df), "text/csv")},
+        data={"model_name": model_name, "chunk_size": "5"}
+    )
+    summary = json.loads(stream.text.splitlines()[-1])
+    assert [(report["column"], sorted(report["unknown_values"])) for report in summary["unknownCategories"]] == [
+        ("color", ["purple", "teal"])
+    ]
+
+    multi = client.post(
+        "/api/classify/multi",
+        files={"file": ("data.csv", to_csv(df), "text/csv")},
+        data={"model_names": json.dumps([model_name])}
+    )
+    assert multi.status_code == 200, multi.text
+    assert multi.json()["models"][model_name]["unknownCategories"] == response.json()["unknownCategories"]
+
+
+def test_predict_matches_classify(client, model_name):
+    train(client, model_name, make_frame(1000, seed=13))
+    df = make_frame(20, seed=14)
+    records = df[FEATURE_COLUMNS].to_dict(orient="records")
+    for record in records:
+        record["size"] = int(record["size"])
+
+    response = client.post("/api/predict", json={"modelName": model_name, "records": records, "probabilities": True})
+
+    assert response.status_code == 200, response.text
+    predictions = response.json()["predictions"]
+    results = classify(client, model_name, df).json()["results"]
+    assert [prediction["predictedClass"] for prediction in predictions] == [result["predictedClass"] for result in results]
+    np.testing.assert_allclose(
+        [prediction["confidence"] for prediction in predictions], [result["confidence"] for result in results]
+    )
+    for prediction in predictions:
+        assert abs(sum(prediction["probabilities"].values()) - 1) < 1e-9
+
+
+def test_classify_multi_matches_single_model_classify(client, model_name):
+    other_name = f"{model_name}-other"
+    train(client, model_name, make_frame(800, seed=15))
+    train(client, other_name, make_frame(800, seed=16))
+    df = make_frame(30, seed=17)
+    df["fare"] = 8.05
+
+    response = client.post(
+        "/api/classify/multi",
+        files={"file": ("data.csv", to_csv(df), "text/csv")},
+        data={"model_names": json.dumps([model_name, other_name]), "id_column": "id", "actual_column": "label"}
+    )
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["ids"] == df["id"].tolist()
+    for name in (model_name, other_name):
+        results = classify(client, name, df).json()["results"]
+        assert body["data"] == [result["data"] for result in results]
+        assert body["models"][name]["predictedClass"] == [result["predictedClass"] for result in results]
+        assert body["models"][name]["confidence"] == [result["confidence"] for result in results]
+
+
+def test_classify_result_cache_hit_and_miss(client, model_name):
+    train(client, model_name, make_frame(1000, seed=3))
+    df = make_frame(200, seed=4)
+
+    first = classify(client, model_name, df)
+    second = classify(client, model_name, df)
+    other_options = classify(client, model_name, df, include_data="false")
+    other_upload = classify(client, model_name, df.head(100))
+
+    assert first.headers["X-Result-Cache"] == "miss"
+    assert second.headers["X-Result-Cache"] == "hit"
+    assert second.content == first.content
+    assert other_options.headers["X-Result-Cache"] == "miss"
+    assert other_upload.headers["X-Result-Cache"] == "miss"
+
+
+def test_classify_result_cache_misses_after_retrain(client, model_name):
+    df = make_frame(200, seed=5)
+    train(client, model_name, make_frame(1000, seed=6))
+    before = classify(client, model_name, df)
+    assert classify(client, model_name, df).headers["X-Result-Cache"] == "hit"
+
+    retrained_df = make_frame(1000, seed=7)
+    retrained_df["label"] = retrained_df["label"].iloc[::-1].to_numpy()
+    train(client, model_name, retrained_df)
+    after = classify(client, model_name, df)
+
+    assert after.headers["X-Result-Cache"] == "miss"
+    assert after.content != before.content
+    expected_class, _ = sklearn_reference(retrained_df, df)
+    assert [result["predictedClass"] for result in after.json()["results"]] == expected_class.tolist()
@@ -0,0 +1,105 @@
+"""ModelCache and ResultCache bookkeeping."""
+
+import os
+
+from conftest import FEATURE_COLUMNS, make_frame
+from test_api import train
+
+
+def test_model_cache_misses_on_new_version(main):
+    cache = main.ModelCache(1000)
+    cache.put("churn", ("id-1", "v1"), ("artifacts-v1",), 100)
+
+    assert cache.get("churn", ("id-1", "v1")) == ("artifacts-v1",)
+    assert cache.get("churn", ("id-1", "v2")) is None
+
+    cache.put("churn", ("id-1", "v2"), ("artifacts-v2",), 100)
+    assert cache.get("churn", ("id-1", "v2")) == ("artifacts-v2",)
+    assert cache.stats()["entries"] == 1
+    assert cache.current_bytes == 100
+
+
+def test_model_cache_evicts_least_recently_used(main):
+    cache = main.ModelCache(250)
+    cache.put("a", ("a", 1), ("a",), 100)
+    cache.put("b", ("b", 1), ("b",), 100)
+    cache.get("a", ("a", 1))
+    cache.put("c", ("c", 1), ("c",), 100)
+
+    assert cache.stats()["models"] == ["a", "c"]
+    assert cache.evictions == 1
+    cache.put("huge", ("huge", 1), ("huge",), 1000)
+    assert cache.get("huge", ("huge", 1)) is None
+
+
+def test_model_cache_recharge_evicts_grown_entries(main):
+    cache = main.ModelCache(250)
+    cache.put("a", ("a", 1), ("a",), 100)
+    cache.put("b", ("b", 1), ("b",), 100)
+
+    cache.recharge(lambda artifacts: 200 if artifacts == ("b",) else 100)
+
+    assert cache.stats()["models"] == ["b"]
+    assert cache.current_bytes == 200
+
+
+def test_model_cache_key_follows_version(main):
+    assert main.model_cache_key("churn", {"id": "id-1", "version": "v1"}) == ("id-1", "v1")
+    assert main.model_cache_key("churn", {"version": "v1"}) == ("churn", "v1")
+
+
+def test_predict_lookups_are_charged_to_the_model_cache(main, client, model_name):
+    train(client, model_name, make_frame(500, seed=1))
+    records = make_frame(5, seed=2)[FEATURE_COLUMNS].to_dict(orient="records")
+    for record in records:
+        record["size"] = int(record["size"])
+
+    response = client.post("/api/predict", json={"modelName": model_name, "records": records})
+
+    assert response.status_code == 200, response.text
+    entries = {name: (artifacts, size) for name, _, artifacts, size in main.model_cache.snapshot()}
+    artifacts, size = entries[model_name]
+    assert artifacts[0].has_record_lookups
+    assert size == main.model_footprint(*artifacts)["bytes"]
+
+
+def test_result_cache_key_covers_content_version_and_options(main):
+    info = {"id": "id-1", "version": "v1"}
+    key = main.ResultCache.key(b"a,b\n1,2\n", "churn", info, {"idColumn": "a"})
+
+    assert key == main.ResultCache.key(b"a,b\n1,2\n", "churn", info, {"idColumn": "a"})
+    assert key != main.ResultCache.key(b"a,b\n1,3\n", "churn", info, {"idColumn": "a"})
+    assert key != main.ResultCache.key(b"a,b\n1,2\n", "churn", {**info, "version": "v2"}, {"idColumn": "a"})
+    assert key != main.ResultCache.key(b"a,b\n1,2\n", "churn", info, {"idColumn": "b"})
+
+
+def test_result_cache_memory_tier(main):
+    cache = main.ResultCache(10)
+    cache.put("churn", "k1", b"12345")
+    cache.put("churn", "k2", b"12345")
+    cache.put("other", "k3", b"12345")
+
+    assert cache.get("churn", "k1") is None
+    assert cache.get("churn", "k2") == b"12345"
+    cache.invalidate("churn")
+    assert cache.get("churn", "k2") is None
+    assert cache.get("other", "k3") == b"12345"
+    assert cache.current_bytes == 5
+
+
+def test_result_cache_disk_tier(main, tmp_path):
+    cache = main.ResultCache(0, str(tmp_path), disk_max_bytes=12)
+    assert cache.enabled
+    cache.put("churn", "k1", b"12345")
+    cache.put("other", "k2", b"12345")
+
+    assert main.ResultCache(0, str(tmp_path), 12).get("churn", "k1") == b"12345"
+    assert cache.stats()["diskHits"] == 0
+
+    cache.invalidate("churn")
+    assert cache.get("churn", "k1") is None
+    assert cache.get("other", "k2") == b"12345"
+
+    cache.put("churn", "k3", b"12345")
+    cache.put("churn", "k4", b"12345")
+    assert sum(os.path.getsize(tmp_path / name) for name in os.listdir(tmp_path)) <= 12
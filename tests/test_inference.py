@@ -0,0 +1,110 @@
+"""Inference components checked against their sklearn counterparts."""
+
+import numpy as np
+import pytest
+from sklearn.naive_bayes import CategoricalNB
+from sklearn.preprocessing import LabelEncoder, OrdinalEncoder
+
+from conftest import FEATURE_COLUMNS, make_frame
+
+
+@pytest.fixture
+def fitted(main):
+    df = make_frame(2000, seed=1)
+    encoder = main.CategoricalEncoder.fit(df, FEATURE_COLUMNS)
+    label_encoder = LabelEncoder().fit(df["label"])
+    codes, _ = encoder.transform(df)
+    model = CategoricalNB().fit(codes, label_encoder.transform(df["label"]))
+    return df, encoder, label_encoder, codes, model
+
+
+def test_encoder_matches_ordinal_encoder(main):
+    df = make_frame(500, seed=2)
+    encoder = main.CategoricalEncoder.fit(df, FEATURE_COLUMNS)
+    ordinal = OrdinalEncoder().fit(df[FEATURE_COLUMNS])
+
+    for vocabulary, categories in zip(encoder.vocabularies, ordinal.categories_):
+        assert list(vocabulary) == list(categories)
+    codes, unknown = encoder.transform(df)
+    assert unknown == []
+    np.testing.assert_array_equal(codes, ordinal.transform(df[FEATURE_COLUMNS]))
+
+
+def test_encoder_reports_unknown_categories(main):
+    encoder = main.CategoricalEncoder.fit(make_frame(500, seed=3), FEATURE_COLUMNS)
+    df = make_frame(50, seed=4, colors=("red", "purple"))
+
+    codes, unknown = encoder.transform(df)
+
+    purple = (df["color"] == "purple").to_numpy()
+    assert (codes[purple, 0] == encoder.n_categories[0]).all()
+    assert (codes[~purple, 0] < encoder.n_categories[0]).all()
+    assert [report["column"] for report in unknown] == ["color"]
+    assert unknown[0]["unknown_values"] == ["purple"]
+
+
+def test_encode_records_matches_transform(main):
+    df = make_frame(200, seed=5, colors=("red", "green", "purple"))
+    encoder = main.CategoricalEncoder.fit(make_frame(500, seed=5), FEATURE_COLUMNS)
+
+    records = df[FEATURE_COLUMNS].to_dict(orient="records")
+    np.testing.assert_array_equal(encoder.encode_records(records), encoder.transform(df)[0])
+
+
+def test_compiled_predictor_matches_sklearn(main, fitted):
+    _, _, _, codes, model = fitted
+    predictor = main.CompiledCategoricalNB.from_model(model, dtype=np.float64)
+
+    prediction = predictor.predict(codes, top_k=2)
+    proba = model.predict_proba(codes)
+
+    np.testing.assert_array_equal(prediction["indices"], model.predict(codes))
+    np.testing.assert_allclose(prediction["confidence"], proba.max(axis=1), rtol=1e-12)
+    np.testing.assert_allclose(predictor.predict_proba(codes), proba, rtol=1e-12, atol=1e-15)
+    np.testing.assert_array_equal(prediction["topIndices"][:, 0], prediction["indices"])
+
+
+def test_unknown_code_contributes_nothing(main, fitted):
+    _, encoder, _, codes, model = fitted
+    predictor = main.CompiledCategoricalNB.from_model(model, dtype=np.float64)
+
+    unknown = codes[:10].copy()
+    unknown[:, 0] = encoder.n_categories[0]
+    expected = model.class_log_prior_ + sum(
+        model.feature_log_prob_[position][:, codes[:10, position]].T for position in range(1, len(FEATURE_COLUMNS))
+    )
+    np.testing.assert_allclose(predictor.joint_log_likelihood(unknown), expected, rtol=1e-12)
+
+
+def test_encoders_share_vocabularies(main):
+    first = main.CategoricalEncoder.fit(make_frame(300, seed=6), FEATURE_COLUMNS)
+    second = main.CategoricalEncoder.fit(make_frame(300, seed=7), FEATURE_COLUMNS)
+
+    for mine, theirs in zip(first.shared_vocabularies, second.shared_vocabularies):
+        assert mine is theirs
+
+
+def test_float32_table_stays_close_to_sklearn(main, fitted):
+    _, _, _, codes, model = fitted
+    predictor = main.CompiledCategoricalNB.from_model(model, dtype=np.float32)
+
+    assert predictor.table.dtype == np.float32
+    np.testing.assert_allclose(predictor.predict_proba(codes), model.predict_proba(codes), rtol=1e-5, atol=1e-6)
+
+
+@pytest.mark.parametrize("model_format", ["binary", "joblib"])
+def test_model_payloads_round_trip(main, fitted, monkeypatch, model_format):
+    df, encoder, label_encoder, codes, model = fitted
+    monkeypatch.setattr(main, "MODEL_FORMAT", model_format)
+
+    payloads = main.dump_model_payloads(model, encoder, label_encoder)
+    assert main.is_model_bundle(main._payload_bytes(payloads["modelData"])) == (model_format == "binary")
+    loaded, loaded_encoder, loaded_label_encoder, _ = main.load_model_payloads(payloads, FEATURE_COLUMNS)
+
+    assert list(loaded_label_encoder.classes_) == list(label_encoder.classes_)
+    for vocabulary, loaded_vocabulary in zip(encoder.vocabularies, loaded_encoder.vocabularies):
+        assert list(vocabulary) == list(loaded_vocabulary)
+    for counts, loaded_counts in zip(model.category_count_, loaded.category_count_):
+        np.testing.assert_array_equal(counts, loaded_counts)
+    np.testing.assert_array_equal(loaded_encoder.transform(df)[0], codes)
+    np.testing.assert_array_equal(loaded.predict_proba(codes), model.predict_proba(codes))
@@ -0,0 +1,50 @@
+"""Bulk persistence of classification results, against a recording stand-in for the database."""
+
+import csv
+import io
+import json
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+
+class RecordingCursor:
+    def __init__(self):
+        self.copied = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        pass
+
+    def fetchone(self):
+        return (datetime(2024, 1, 1),)
+
+    def copy_expert(self, sql, buffer):
+        self.copied.extend(csv.reader(io.StringIO(buffer.read())))
+
+
+def test_persisted_rows_keep_uploaded_floats(main, monkeypatch):
+    cursor = RecordingCursor()
+
+    @contextmanager
+    def fake_connection():
+        yield type("Connection", (), {"cursor": lambda self, **kwargs: cursor})()
+
+    monkeypatch.setattr(main, "db_connection", fake_connection)
+    df = pd.DataFrame({"id": ["a", "b"], "fare": [8.05, 71.2833]})
+    results = main.build_classification_results(df, np.array(["x", "y"]), np.array([0.1, 0.48826206894655605]), id_column="id")
+
+    summary = main.persist_classification(results, None, "titanic", {"id": "model-1"}, "upload.csv")
+
+    assert summary["totalRecords"] == 2
+    stored = [json.loads(row[2]) for row in cursor.copied]
+    assert [row["data"] for row in stored] == ['{"id":"a","fare":8.05}', '{"id":"b","fare":71.2833}']
+    assert [row["confidence"] for row in stored] == [0.1, 0.48826206894655605]
+    assert [row["modelId"] for row in stored] == ["model-1", "model-1"]
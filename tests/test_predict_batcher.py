@@ -0,0 +1,41 @@
+"""Micro-batching of concurrent /predict calls."""
+
+import asyncio
+
+
+def fake_scorer(model_name, model_info, records, requests):
+    if any(record.get("bad") for record in records):
+        raise ValueError("bad record")
+    return [[{"predictedClass": record["value"]} for record in records[start:start + count]] for start, count, _, _ in requests]
+
+
+def run_calls(batcher, calls):
+    async def run():
+        return await asyncio.gather(
+            *(batcher.predict("churn", {"version": "v1"}, records, False, None) for records in calls),
+            return_exceptions=True
+        )
+    return asyncio.run(run())
+
+
+def test_concurrent_calls_share_a_batch(main, monkeypatch):
+    monkeypatch.setattr(main, "score_record_batch", fake_scorer)
+    batcher = main.PredictBatcher(window_ms=50, max_batch_size=100)
+
+    results = run_calls(batcher, [[{"value": "a"}], [{"value": "b"}, {"value": "c"}]])
+
+    assert results == [[{"predictedClass": "a"}], [{"predictedClass": "b"}, {"predictedClass": "c"}]]
+    assert batcher.stats()["batches"] == 1
+    assert batcher.stats()["records"] == 3
+
+
+def test_failing_call_does_not_fail_its_batch(main, monkeypatch):
+    monkeypatch.setattr(main, "score_record_batch", fake_scorer)
+    batcher = main.PredictBatcher(window_ms=50, max_batch_size=100)
+
+    first, bad, last = run_calls(batcher, [[{"value": "a"}], [{"bad": True}], [{"value": "c"}]])
+
+    assert first == [{"predictedClass": "a"}]
+    assert last == [{"predictedClass": "c"}]
+    assert isinstance(bad, ValueError)
+    assert batcher.stats()["isolatedBatches"] == 1
@@ -0,0 +1,66 @@
+"""Model registry reloads and deletion without a live database."""
+
+import pytest
+
+from conftest import make_frame
+from test_api import classify, train
+
+
+@pytest.fixture(autouse=True)
+def registry(main, monkeypatch):
+    """Let each test replace the registry without leaking its entries into later tests."""
+    monkeypatch.setattr(main, "models_metadata", dict(main.models_metadata))
+
+
+@pytest.fixture
+def published(main, monkeypatch):
+    events = []
+    monkeypatch.setattr(main, "publish_model_event", lambda *args: events.append(args))
+    return events
+
+
+def test_failed_reload_keeps_the_registry(main, client, model_name, monkeypatch):
+    train(client, model_name, make_frame(300, seed=1))
+
+    def unreachable(*args, **kwargs):
+        raise ConnectionError("database unreachable")
+
+    monkeypatch.setattr(main, "load_models_from_db", unreachable)
+    with pytest.raises(ConnectionError):
+        main.initialize_models_from_db()
+
+    assert model_name in main.models_metadata
+    assert client.post("/api/initialize").status_code == 500
+    assert classify(client, model_name, make_frame(10, seed=2)).status_code == 200
+
+
+def test_reload_keeps_unsaved_models_and_their_cache(main, client, model_name, monkeypatch):
+    train(client, model_name, make_frame(300, seed=3))
+    classify(client, model_name, make_frame(10, seed=4))
+    saved = {"modelName": "saved", "id": "saved-id", "version": "v1", "featureColumns": [], "classes": []}
+    monkeypatch.setattr(main, "load_models_from_db", lambda *args, **kwargs: {"saved": dict(saved)})
+
+    main.initialize_models_from_db()
+
+    assert main.models_metadata["saved"] == saved
+    assert model_name in main.models_metadata
+    assert model_name in main.model_cache.stats()["models"]
+
+
+def test_delete_leaves_the_model_when_no_row_was_removed(main, client, model_name, monkeypatch, published):
+    train(client, model_name, make_frame(300, seed=5))
+    monkeypatch.setattr(main, "delete_model_from_database", lambda name: False)
+
+    assert client.delete(f"/api/models/{model_name}").status_code == 404
+    assert model_name in main.models_metadata
+    assert ("deleted", model_name) not in published
+
+
+def test_delete_drops_the_model_after_its_row(main, client, model_name, monkeypatch, published):
+    train(client, model_name, make_frame(300, seed=6))
+    monkeypatch.setattr(main, "delete_model_from_database", lambda name: True)
+
+    assert client.delete(f"/api/models/{model_name}").status_code == 200
+    assert model_name not in main.models_metadata
+    assert published[-1] == ("deleted", model_name)
+    assert classify(client, model_name, make_frame(10, seed=7)).status_code == 404
@@ -0,0 +1,110 @@
+"""K-fold and hold-out validation: fold assignment, count-derived fold models and /train metrics."""
+
+import json
+
+import numpy as np
+import pytest
+from sklearn.naive_bayes import CategoricalNB
+
+from conftest import FEATURE_COLUMNS, make_frame, to_csv
+
+
+def class_codes(rows, n_classes=3, seed=0):
+    return np.random.default_rng(seed).integers(0, n_classes, size=rows)
+
+
+def test_kfold_is_stratified(main):
+    # Every full block of VALIDATION_BLOCK_ROWS * folds rows of a class splits evenly across folds.
+    block_size = main.VALIDATION_BLOCK_ROWS * 5
+    y = np.random.default_rng(0).permutation(np.repeat([0, 1, 2], [10 * block_size, 3 * block_size + 7, block_size]))
+    fold = main.CrossValidator("kfold", folds=5, seed=1).assign(y, 3)
+
+    for label, full_rows in ((0, 10 * block_size), (1, 3 * block_size), (2, block_size)):
+        sizes = np.bincount(fold[y == label], minlength=5)
+        assert sizes.min() >= full_rows // 5
+        assert sizes.sum() == (y == label).sum()
+
+
+def test_holdout_fraction(main):
+    y = class_codes(3000)
+    fold = main.CrossValidator("holdout", holdout_fraction=0.25, seed=1).assign(y, 3)
+
+    assert set(np.unique(fold)) == {-1, 0}
+    for label in range(3):
+        assert abs((fold[y == label] == 0).mean() - 0.25) < 0.01
+
+
+@pytest.mark.parametrize("method", ["kfold", "holdout"])
+def test_folds_do_not_depend_on_batches(main, method):
+    y = class_codes(5000)
+    whole = main.CrossValidator(method, seed=7).assign(y, 3)
+
+    validator = main.CrossValidator(method, seed=7)
+    batched = np.concatenate([validator.assign(batch, 3) for batch in np.array_split(y, [700, 701, 3000])])
+    validator.replay()
+    replayed = np.concatenate([validator.assign(batch, 3) for batch in np.array_split(y, 4)])
+
+    np.testing.assert_array_equal(batched, whole)
+    np.testing.assert_array_equal(replayed, whole)
+    assert not np.array_equal(main.CrossValidator(method, seed=8).assign(y, 3), whole)
+
+
+def test_fold_models_match_refit(main):
+    df = make_frame(3000, seed=2)
+    encoder = main.CategoricalEncoder.fit(df, FEATURE_COLUMNS)
+    codes, _ = encoder.transform(df)
+    y = df["label"].map({"high": 0, "low": 1, "mid": 2}).to_numpy()
+    model = CategoricalNB(min_categories=encoder.n_categories).fit(codes, y)
+
+    validator = main.CrossValidator("kfold", folds=4, seed=3)
+    fold = validator.assign(y, 3)
+    validator.count(fold, y, 3, [(codes[:, position], n) for position, n in enumerate(encoder.n_categories)])
+    predictors = validator.predictors(model)
+
+    for index, predictor in enumerate(predictors):
+        rows = fold == index
+        refit = CategoricalNB(min_categories=encoder.n_categories).fit(codes[~rows], y[~rows])
+        np.testing.assert_array_equal(predictor.predict(codes[rows])["indices"], refit.predict(codes[rows]))
+        np.testing.assert_allclose(predictor.predict_proba(codes[rows]), refit.predict_proba(codes[rows]), rtol=1e-5, atol=1e-6)
+
+
+@pytest.mark.parametrize("method", ["kfold", "holdout"])
+def test_chunked_training_validates_like_in_memory(client, model_name, method):
+    content = to_csv(make_frame(3000, seed=4))
+
+    def train(**fields):
+        response = client.post(
+            "/api/train",
+            files={"file": ("train.csv", content, "text/csv")},
+            data={
+                "model_name": model_name,
+                "target_column": "label",
+                "id_column": "id",
+                "feature_columns": json.dumps(FEATURE_COLUMNS),
+                "validation": method,
+                "folds": "4",
+                "validation_seed": "5",
+                **fields
+            }
+        )
+        assert response.status_code == 200, response.text
+        return response.json()["metrics"]
+
+    in_memory = train()
+    chunked = train(chunked="true", chunk_size="700")
+
+    assert chunked == in_memory
+    assert in_memory["validation"]["method"] == method
+    assert in_memory["validation"]["folds"] == (4 if method == "kfold" else 1)
+    assert sum(fold["rows"] for fold in in_memory["validation"]["foldMetrics"]) == (
+        3000 if method == "kfold" else 600
+    )
+
+
+def test_train_rejects_invalid_validation(client, model_name):
+    response = client.post(
+        "/api/train",
+        files={"file": ("train.csv", to_csv(make_frame(100)), "text/csv")},
+        data={"model_name": model_name, "target_column": "label", "validation": "kfold", "folds": "1"}
+    )
+    assert response.status_code == 400